@@ -0,0 +1,410 @@
+"""
+Load test of the API: drives the whole FastAPI app of main.py with concurrent traffic, a mix of the
+endpoints with arguments drawn from the distributions of the datasets (popular games, developers and
+years are asked for more often), and reports:
+- throughput, and the number and rate of errors (by status code) of each endpoint
+- latency percentiles and histograms, overall and per endpoint
+- a timeline with the throughput, latency, errors and memory (RSS) of each interval
+
+The app is called in-process through its ASGI interface (default), or over HTTP against a running server
+(--url, e.g. a local uvicorn). Traffic is closed loop (--concurrency clients sending back to back) or open
+loop at a fixed rate (--rps, at most --concurrency requests in flight). In open loop, latency is measured
+from the time a request was due, so a server that falls behind shows it in the latency.
+
+The report is written to a JSON file, which can be kept as a baseline: a later run given --baseline fails
+(exit code 1) if it is worse than the baseline by more than --margin:
+
+    python -m benchmarks.load_test --duration 30 --concurrency 32 --save-baseline tmp/load_baseline.json
+    python -m benchmarks.load_test --duration 30 --concurrency 32 --baseline tmp/load_baseline.json --margin 0.25
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --rps 200 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import quote
+import numpy as np
+
+# Share of the requests of each endpoint in the traffic mix (relative weights)
+DEFAULT_MIX = {'PlayTimeGenre': 1, 'UserForGenre': 1, 'UsersRecommend': 1, 'UsersWorstDeveloper': 1,
+               'sentiment_analysis': 1, 'recomendacion_juego': 1}
+
+# Upper bounds of the latency histogram buckets, in milliseconds (log-spaced, 8 per decade, from 0.1 ms to 100 s)
+HISTOGRAM_BOUNDS_MS = np.round(np.geomspace(0.1, 100_000, 49), 4)
+
+# Metrics compared with the baseline, and whether a higher value is a regression
+_GATED_METRICS = {'throughput_rps': False, 'p50_ms': True, 'p99_ms': True}
+
+# Configuration that must match the baseline for the comparison to be meaningful
+_COMPARABLE_CONFIG = ('target', 'duration_s', 'concurrency', 'rps', 'mix', 'seed', 'response_cache')
+
+# Error rate always tolerated over the baseline one (e.g. a single timeout in a short run)
+_ERROR_RATE_TOLERANCE = 0.001
+
+
+class _Distribution:
+    """Values drawn with probability proportional to their weight (inverse transform of the cumulative weights)."""
+
+    def __init__(self, values, weights):
+        self.values = np.asarray(values)
+        cumulative = np.cumsum(np.asarray(weights, dtype=np.float64))
+        self._cdf = cumulative / cumulative[-1]
+
+    def draw(self, rng):
+        return self.values[min(int(np.searchsorted(self._cdf, rng.random(), 'right')), len(self.values) - 1)]
+
+
+class TrafficGenerator:
+    """
+    Draws the requests of the load test: the endpoint from the mix, and its argument from the distribution
+    of the values in the datasets.
+
+    - genres: by number of games of the genre
+    - years: by number of reviews posted in the year
+    - developers: by number of reviews of their games
+    - game ids: by number of reviews of the game (plus one, so games without reviews are asked for too)
+
+    Values that can't be sent as a path parameter (e.g. developer names with a '/') are left out.
+    """
+
+    def __init__(self, data, mix=DEFAULT_MIX, seed=0):
+        from datasets.encoding import decoded
+
+        self._rng = np.random.default_rng(seed)
+        self._endpoints = _Distribution(list(mix), list(mix.values()))
+
+        genres = data.genre_matrix.vocabulary
+        games_per_genre = np.asarray(data.genre_matrix.matrix.sum(axis=0)).ravel()
+        playtime_genres = np.isin(genres, data.playtime_aggregates.genres)
+        self.genres = _Distribution(genres[playtime_genres], games_per_genre[playtime_genres])
+
+        reviews_per_year = data.df1['posted_year'].value_counts()
+        years = np.asarray(data.review_rollups.years)
+        self.years = _Distribution(years, reviews_per_year.reindex(years, fill_value=0).to_numpy() + 1)
+
+        reviews_per_developer = data.sentiment_index.counts.sum(axis=1)
+        reviews_per_developer = reviews_per_developer[~reviews_per_developer.index.astype(str).str.contains('/')]
+        self.developers = _Distribution(reviews_per_developer.index.to_numpy(), reviews_per_developer.to_numpy())
+
+        ids = decoded(data.df2['id'])
+        reviews_per_game = decoded(data.df1['item_id']).value_counts()
+        ids = ids[~ids.astype(str).str.contains('/')]
+        self.ids = _Distribution(ids.to_numpy(), reviews_per_game.reindex(ids.to_numpy(), fill_value=0).to_numpy() + 1)
+
+    def next(self):
+        """Returns the next request, as (endpoint, method, url, json body)."""
+        endpoint = str(self._endpoints.draw(self._rng))
+        if endpoint in ('PlayTimeGenre', 'UserForGenre'):
+            argument = self.genres.draw(self._rng)
+        elif endpoint in ('UsersRecommend', 'UsersWorstDeveloper'):
+            argument = self.years.draw(self._rng)
+        elif endpoint == 'sentiment_analysis':
+            argument = self.developers.draw(self._rng)
+        elif endpoint == 'recomendacion_juego':
+            argument = self.ids.draw(self._rng)
+        else:
+            raise ValueError(f"Unknown endpoint '{endpoint}' in the traffic mix, expected one of {list(DEFAULT_MIX)}")
+        return endpoint, 'GET', f"/{endpoint}/{quote(str(argument), safe='')}", None
+
+
+class LoadStats:
+    """
+    Latency, status and completion time of every request of a load test, and the memory samples, from
+    which the report is computed at the end.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.start = time.perf_counter()
+        self._requests = {}
+        self.memory = []
+        self.dropped = 0
+
+    def record(self, endpoint, seconds, status):
+        # status is the HTTP status code, or the exception type name if the request failed
+        self._requests.setdefault(endpoint, []).append((time.perf_counter() - self.start, seconds, status))
+
+    def record_memory(self, rss_mb):
+        self.memory.append((time.perf_counter() - self.start, rss_mb))
+
+    def report(self, elapsed):
+        """Returns the report (see the module docstring) of the requests recorded in elapsed seconds."""
+        records = {endpoint: np.array([(end, seconds) for end, seconds, _ in requests]) for endpoint, requests in self._requests.items()}
+        statuses = {endpoint: [status for _, _, status in requests] for endpoint, requests in self._requests.items()}
+
+        endpoints = {endpoint: _latency_summary(records[endpoint][:, 1], statuses[endpoint], elapsed) for endpoint in sorted(records)}
+        all_records = np.concatenate(list(records.values())) if records else np.empty((0, 2))
+        all_statuses = [status for endpoint in records for status in statuses[endpoint]]
+        summary = _latency_summary(all_records[:, 1], all_statuses, elapsed)
+        summary['dropped'] = self.dropped
+
+        # Per interval: requests completed in it, their errors and latency, and the last memory sample
+        timeline = []
+        ok = np.array([status == 200 for status in all_statuses], dtype=bool)
+        window = (all_records[:, 0] // self.interval).astype(np.int64)
+        memory = np.array(self.memory) if self.memory else np.empty((0, 2))
+        for index in range(int(np.ceil(elapsed / self.interval))):
+            in_window = window == index
+            latencies = all_records[in_window, 1] * 1000
+            samples = memory[memory[:, 0] < (index + 1) * self.interval, 1] if len(memory) else []
+            timeline.append({'t_s': round((index + 1) * self.interval, 3), 'requests': int(in_window.sum()),
+                             'errors': int((in_window & ~ok).sum()),
+                             'throughput_rps': round(float(in_window.sum()) / self.interval, 1),
+                             'p50_ms': round(float(np.percentile(latencies, 50)), 3) if len(latencies) else None,
+                             'p99_ms': round(float(np.percentile(latencies, 99)), 3) if len(latencies) else None,
+                             'rss_mb': float(samples[-1]) if len(samples) else None})
+
+        rss = [rss_mb for _, rss_mb in self.memory if rss_mb is not None]
+        memory_summary = {'start_rss_mb': rss[0] if rss else None, 'end_rss_mb': rss[-1] if rss else None,
+                          'peak_rss_mb': max(rss) if rss else None}
+        return {'summary': summary, 'endpoints': endpoints, 'timeline': timeline, 'memory': memory_summary}
+
+
+def _latency_summary(seconds, statuses, elapsed):
+    # Throughput, errors (by status) and latency percentiles / histogram of a set of requests
+    latencies = np.asarray(seconds, dtype=np.float64) * 1000
+    errors = int(sum(status != 200 for status in statuses))
+    summary = {'requests': len(latencies), 'errors': errors, 'error_rate': round(errors / len(latencies), 6) if len(latencies) else 0.0,
+               'statuses': {str(status): int(count) for status, count in zip(*np.unique(np.array(statuses, dtype=str), return_counts=True))},
+               'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0}
+    if len(latencies):
+        summary.update({f'p{name}_ms': round(float(np.percentile(latencies, q)), 3) for name, q in (('50', 50), ('90', 90), ('99', 99), ('999', 99.9))})
+        summary.update({'mean_ms': round(float(latencies.mean()), 3), 'max_ms': round(float(latencies.max()), 3)})
+    # Only the buckets with requests, as (upper bound in ms, count); the last one also counts the slower requests
+    counts = np.bincount(np.minimum(np.searchsorted(HISTOGRAM_BOUNDS_MS, latencies), len(HISTOGRAM_BOUNDS_MS) - 1),
+                         minlength=len(HISTOGRAM_BOUNDS_MS))
+    summary['histogram'] = [[float(bound), int(count)] for bound, count in zip(HISTOGRAM_BOUNDS_MS, counts) if count]
+    return summary
+
+
+async def run_load(send, traffic, duration, concurrency, rps=0, interval=1.0, memory=None):
+    """
+    Sends the traffic for duration seconds and returns the LoadStats.
+
+    Parameters:
+    -----------
+    send : async callable
+        Sends a (method, url, json body) request and returns the HTTP status code
+    traffic : TrafficGenerator
+        Requests to send
+    duration : float
+        Seconds of traffic
+    concurrency : int
+        Number of clients sending back to back (closed loop), or maximum number of requests in flight (open loop)
+    rps : float
+        Requests per second of the open loop (0: closed loop). Requests due while concurrency requests are
+        in flight are dropped (counted in the report)
+    interval : float
+        Seconds per interval of the timeline and between memory samples
+    memory : async callable, optional
+        Returns the current RSS in MB of the process serving the requests
+    """
+    stats = LoadStats(interval)
+    deadline = stats.start + duration
+
+    async def _send(request, due):
+        endpoint, method, url, body = request
+        try:
+            status = await send(method, url, body)
+        except Exception as e:
+            status = type(e).__name__
+        stats.record(endpoint, time.perf_counter() - due, status)
+
+    async def _client():
+        while time.perf_counter() < deadline:
+            await _send(traffic.next(), time.perf_counter())
+
+    async def _open_loop():
+        in_flight = set()
+        for i in range(int(duration * rps)):
+            due = stats.start + i / rps
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            if len(in_flight) >= concurrency:
+                stats.dropped += 1
+                continue
+            task = asyncio.ensure_future(_send(traffic.next(), due))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+    async def _sample_memory():
+        while True:
+            stats.record_memory(await memory())
+            await asyncio.sleep(interval)
+
+    sampler = asyncio.ensure_future(_sample_memory()) if memory is not None else None
+    try:
+        if rps > 0:
+            await _open_loop()
+        else:
+            await asyncio.gather(*[_client() for _ in range(concurrency)])
+    finally:
+        if sampler is not None:
+            sampler.cancel()
+            stats.record_memory(await memory())
+    return stats
+
+
+def check_baseline(baseline, report, margin):
+    """
+    Returns the regressions of report against baseline (empty if there are none): throughput, p50 and p99
+    latency (overall and per endpoint) and peak RSS worse than the baseline by more than margin (e.g. 0.2
+    = 20%), or an error rate above the baseline one by more than margin (plus a small tolerance).
+    """
+    regressions = []
+    scopes = [('overall', baseline['summary'], report['summary'])]
+    scopes += [(endpoint, baseline['endpoints'][endpoint], stats) for endpoint, stats in report['endpoints'].items()
+               if endpoint in baseline['endpoints']]
+    for scope, base, current in scopes:
+        for metric, higher_is_worse in _GATED_METRICS.items():
+            old, new = base.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            if (new > old * (1 + margin)) if higher_is_worse else (new < old * (1 - margin)):
+                regressions.append(f"{scope} {metric}: {old} -> {new} (margin {margin:.0%})")
+        if current['error_rate'] > base['error_rate'] * (1 + margin) + _ERROR_RATE_TOLERANCE:
+            regressions.append(f"{scope} error_rate: {base['error_rate']} -> {current['error_rate']}")
+
+    old, new = baseline['memory'].get('peak_rss_mb'), report['memory'].get('peak_rss_mb')
+    if old is not None and new is not None and new > old * (1 + margin):
+        regressions.append(f"peak_rss_mb: {old} -> {new} (margin {margin:.0%})")
+    return regressions
+
+
+def format_report(report):
+    """Returns a human readable summary of the report: a table of the endpoints and the overall latency histogram."""
+    lines = [f"{'endpoint':<24}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for endpoint, stats in [*report['endpoints'].items(), ('overall', report['summary'])]:
+        lines.append(f"{endpoint:<24}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput_rps']:>10}"
+                     f"{stats.get('p50_ms', '-'):>10}{stats.get('p99_ms', '-'):>10}{stats.get('max_ms', '-'):>10}")
+    if report['summary']['dropped']:
+        lines.append(f"dropped (more than --concurrency requests in flight): {report['summary']['dropped']}")
+
+    lines.append("\nlatency histogram (overall)")
+    histogram = report['summary']['histogram']
+    largest = max((count for _, count in histogram), default=1)
+    for bound, count in histogram:
+        lines.append(f"  <= {bound:>10.3f} ms {count:>8} {'#' * max(1, round(40 * count / largest))}")
+
+    memory = report['memory']
+    lines.append(f"\nRSS: start {memory['start_rss_mb']} MB, end {memory['end_rss_mb']} MB, peak {memory['peak_rss_mb']} MB")
+    return '\n'.join(lines)
+
+
+async def _run(args, mix):
+    import httpx
+    from datasets.data_loader import get_data
+    from utils.profiling import process_memory
+
+    data = get_data()
+    warm_up_start = time.perf_counter()
+    if args.url is None:
+        # Load all the tables / models first, so the test measures the requests and not the first loads
+        data.warm_up()
+        transport = httpx.ASGITransport(app=_app(), raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url='http://load-test', timeout=args.timeout)
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits)
+    warm_up_s = round(time.perf_counter() - warm_up_start, 4) if args.url is None else None
+    traffic = TrafficGenerator(data, mix, args.seed)
+
+    async with client:
+        async def _send(method, url, body):
+            return (await client.request(method, url, json=body)).status_code
+
+        async def _memory():
+            if args.url is None:
+                return process_memory()['rss_mb']
+            # The server reports the memory of its own process
+            try:
+                return (await client.get('/metrics')).json()['process']['rss_mb']
+            except Exception:
+                return None
+
+        stats = await run_load(_send, traffic, args.duration, args.concurrency, args.rps, args.interval, _memory)
+    report = stats.report(args.duration)
+    report['config'] = {'target': args.url or 'asgi', 'duration_s': args.duration, 'concurrency': args.concurrency,
+                        'rps': args.rps, 'mix': mix, 'seed': args.seed, 'warm_up_s': warm_up_s,
+                        'response_cache': args.url is not None or os.environ.get('RESPONSE_CACHE_BACKEND') != 'none',
+                        'commit': _git_commit(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                        'python': platform.python_version()}
+    return report
+
+
+def _app():
+    from main import app
+    return app
+
+
+def _git_commit():
+    from benchmarks.run_benchmarks import _git_commit
+    return _git_commit()
+
+
+def _parse_mix(text):
+    # "PlayTimeGenre=1,recomendacion_juego=4" -> {'PlayTimeGenre': 1.0, 'recomendacion_juego': 4.0}
+    mix = {}
+    for item in text.split(','):
+        endpoint, _, weight = item.partition('=')
+        if endpoint.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{endpoint.strip()}', expected one of {list(DEFAULT_MIX)}")
+        mix[endpoint.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the API with a realistic mix of the endpoints")
+    parser.add_argument('--url', help="Base URL of a running server (default: the app of main.py, in-process)")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds of traffic")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent clients (closed loop) or maximum requests in flight (--rps)")
+    parser.add_argument('--rps', type=float, default=0, help="Requests per second (open loop); 0 sends back to back")
+    parser.add_argument('--mix', type=_parse_mix, default=DEFAULT_MIX, help="Endpoint weights, e.g. 'PlayTimeGenre=1,recomendacion_juego=4'")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the traffic")
+    parser.add_argument('--interval', type=float, default=1.0, help="Seconds per interval of the timeline")
+    parser.add_argument('--timeout', type=float, default=30, help="Seconds before a request fails")
+    parser.add_argument('--no-response-cache', action='store_true', help="Disable the response cache of the in-process app")
+    parser.add_argument('--output', type=Path, help="JSON file for the report (default: tmp/benchmarks/load_<commit>.json)")
+    parser.add_argument('--baseline', type=Path, help="Report of a previous run: exit with code 1 if this run is worse by more than --margin")
+    parser.add_argument('--margin', type=float, default=0.2, help="Tolerated regression against the baseline (0.2 = 20%%)")
+    parser.add_argument('--save-baseline', type=Path, help="Also write the report to this file, to use as --baseline later")
+    args = parser.parse_args()
+
+    # The configuration is read when the app is imported
+    if args.no_response_cache:
+        os.environ['RESPONSE_CACHE_BACKEND'] = 'none'
+    if args.url is None:
+        os.environ.setdefault('DATA_WARM_UP', 'false')
+
+    report = asyncio.run(_run(args, args.mix))
+    print(format_report(report))
+
+    from benchmarks.run_benchmarks import BENCHMARK_DIR
+    output = args.output or BENCHMARK_DIR / f"load_{report['config']['commit'] or 'unknown'}.json"
+    for path in filter(None, [output, args.save_baseline]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"Report written to {path}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        # Runs with a different traffic are not comparable (e.g. the throughput of an open loop is its --rps)
+        for key in _COMPARABLE_CONFIG:
+            if baseline['config'].get(key) != report['config'][key]:
+                print(f"WARNING {key} differs from the baseline: {baseline['config'].get(key)} -> {report['config'][key]}")
+        regressions = check_baseline(baseline, report, args.margin)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression against {args.baseline} (margin {args.margin:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+Benchmark suite of the loader and the API endpoints.
+
+For each scale (1x, 10x, 100x the original datasets by default) it generates synthetic Parquet files,
+then, in a fresh process, measures:
+- the time of each phase of the loader (Parquet reads, feature build, TF-IDF fit, similarity index,
+  aggregates), with the model cache disabled
+- the time of the offline build of the collaborative index, in one process and in one per CPU
+- the p50 / p99 latency and throughput of each endpoint, called through the ASGI app
+- the peak RSS of the process
+
+Results are written to a JSON file, so they can be compared across commits:
+
+    python -m benchmarks.run_benchmarks --scales 1 10 --output results.json
+    python -m benchmarks.run_benchmarks --scales 1 --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
+from config import TEMP_DIR, BASE_DIR
+
+BENCHMARK_DIR = Path(TEMP_DIR) / 'benchmarks'
+
+
+@contextmanager
+def _timed(phases, name):
+    start = time.perf_counter()
+    yield
+    phases[name] = round(time.perf_counter() - start, 4)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux (bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _measure_loader():
+    """
+    Times each phase of the loader separately and installs the loaded data as the registry of the API.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from datasets import data_loader
+    from datasets.similarity import build_topk_index
+
+    data = data_loader.DataRegistry()
+    phases = {}
+    with _timed(phases, 'read_user_reviews'):
+        df1 = data.df1
+    with _timed(phases, 'read_steam_games'):
+        df2 = data.df2
+    with _timed(phases, 'read_user_items'):
+        df3 = data.df3
+    with _timed(phases, 'feature_build'):
+        features = data_loader._CombFeatures(df2)
+    with _timed(phases, 'tfidf_fit'):
+        tfidf_vectorizer = TfidfVectorizer(**data_loader.TFIDF_PARAMS)
+        tfidf_matrix = tfidf_vectorizer.fit_transform(features)
+    with _timed(phases, 'similarity_index'):
+        index = build_topk_index(tfidf_matrix)
+
+    # The rest of the registry reuses the model built above
+    data = data_loader.DataRegistry({**data_loader._LOADERS,
+                                     'df1': lambda _: df1, 'df2': lambda _: df2, 'df3': lambda _: df3,
+                                     'tfidf': lambda _: (tfidf_vectorizer, tfidf_matrix), 'cosine_sim': lambda _: index})
+    for name in ['playtime_aggregates', 'review_rollups', 'sentiment_index', 'game_rows']:
+        with _timed(phases, name):
+            data.get(name)
+    data_loader.registry = data
+
+    rows = {'user_reviews': len(df1), 'steam_games': len(df2), 'user_items': len(df3)}
+    return data, rows, phases
+
+
+def _measure_collaborative_build(data):
+    """
+    Times the build of the collaborative top-k index with a single process and with one process per CPU
+    (the games x users vectors are built once, outside the timings).
+    """
+    from datasets.collaborative import build_item_vectors, build_item_similarity_index
+
+    item_vectors = build_item_vectors(data.user_libraries)
+    timings = {}
+    for workers in sorted({1, os.cpu_count()}):
+        with _timed(timings, f'workers_{workers}_s'):
+            build_item_similarity_index(item_vectors, workers=workers)
+    timings['speedup'] = round(timings['workers_1_s'] / timings[f'workers_{os.cpu_count()}_s'], 2)
+    return timings
+
+
+def _endpoint_requests(data, n_requests, seed=0):
+    """
+    Returns, per endpoint, the list of (method, url, json body) requests to send, with arguments drawn
+    from the values present in the data.
+    """
+    rng = np.random.default_rng(seed)
+    genres = rng.choice(data.playtime_aggregates.genres, n_requests)
+    years = rng.choice(data.review_rollups.years, n_requests)
+    developers = rng.choice(data.sentiment_index.counts.index.to_numpy(), n_requests)
+    ids = rng.choice(data.df2['id'].to_numpy(), n_requests)
+    return {
+        'PlayTimeGenre': [('GET', f'/PlayTimeGenre/{genre}', None) for genre in genres],
+        'UserForGenre': [('GET', f'/UserForGenre/{genre}', None) for genre in genres],
+        'UsersRecommend': [('GET', f'/UsersRecommend/{year}', None) for year in years],
+        'UsersWorstDeveloper': [('GET', f'/UsersWorstDeveloper/{year}', None) for year in years],
+        'sentiment_analysis': [('GET', f'/sentiment_analysis/{developer}', None) for developer in developers],
+        'sentiment_analysis_bulk': [('POST', '/sentiment_analysis', rng.choice(developers, 20).tolist()) for _ in range(n_requests)],
+        'recomendacion_juego': [('GET', f'/recomendacion_juego/{id}', None) for id in ids],
+        'recomendacion_juego_batch': [('POST', '/recomendacion_juego', rng.choice(ids, 20).tolist()) for _ in range(n_requests)],
+    }
+
+
+async def _measure_endpoints(requests_by_endpoint):
+    """
+    Sends the requests of each endpoint sequentially through the ASGI app, returning latency
+    percentiles, throughput and errors per endpoint.
+    """
+    import httpx
+    from main import app
+
+    results = {}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        for endpoint, requests in requests_by_endpoint.items():
+            latencies = []
+            errors = 0
+            start = time.perf_counter()
+            for method, url, body in requests:
+                request_start = time.perf_counter()
+                response = await client.request(method, url, json=body)
+                latencies.append(time.perf_counter() - request_start)
+                errors += response.status_code != 200
+            elapsed = time.perf_counter() - start
+            results[endpoint] = {'requests': len(requests), 'errors': errors,
+                                 'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 3),
+                                 'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 3),
+                                 'throughput_rps': round(len(requests) / elapsed, 1)}
+    return results
+
+
+def _run_scale(n_requests):
+    # Runs inside the child process of a scale, DATA_DIR points to the scaled datasets
+    data, rows, phases = _measure_loader()
+    rss_after_load = _peak_rss_mb()
+    collaborative_build = _measure_collaborative_build(data)
+    endpoints = asyncio.run(_measure_endpoints(_endpoint_requests(data, n_requests)))
+    return {'rows': rows, 'loader_phases_s': phases, 'loader_total_s': round(sum(phases.values()), 4),
+            'peak_rss_after_load_mb': rss_after_load, 'collaborative_build': collaborative_build,
+            'endpoints': endpoints, 'peak_rss_mb': _peak_rss_mb()}
+
+
+def run_benchmarks(scales, n_requests):
+    """
+    Runs the benchmarks of each scale in a separate process (so loader cost and peak RSS aren't
+    affected by the previous scale) and returns the results.
+    """
+    from benchmarks.synthetic_data import write_scaled_datasets
+
+    results = {'commit': _git_commit(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'python': platform.python_version(), 'requests_per_endpoint': n_requests, 'scales': {}}
+    for scale in scales:
+        data_dir = write_scaled_datasets(scale, BENCHMARK_DIR / f'data_scale_{scale}')
+        # Measure the work itself: no model artifact cache, no response cache, no background warm-up
+        env = {**os.environ, 'DATA_DIR': str(data_dir), 'MODEL_CACHE_ENABLED': 'false',
+               'RESPONSE_CACHE_BACKEND': 'none', 'DATA_WARM_UP': 'false'}
+        child = subprocess.run([sys.executable, '-m', 'benchmarks.run_benchmarks', '--child', '--requests', str(n_requests)],
+                               cwd=BASE_DIR, env=env, capture_output=True, text=True)
+        if child.returncode != 0:
+            raise RuntimeError(f"Benchmark of scale {scale} failed:\n{child.stderr}")
+        results['scales'][str(scale)] = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"scale {scale}x: loader {results['scales'][str(scale)]['loader_total_s']} s, "
+              f"peak RSS {results['scales'][str(scale)]['peak_rss_mb']} MB", file=sys.stderr)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(baseline, current):
+    """
+    Returns one line per metric present in both results, with the ratio current / baseline
+    (above 1 means slower or more memory).
+    """
+    lines = []
+    for scale, result in current['scales'].items():
+        base = baseline['scales'].get(scale)
+        if base is None:
+            continue
+        metrics = [('loader_total_s', base['loader_total_s'], result['loader_total_s']),
+                   ('peak_rss_mb', base['peak_rss_mb'], result['peak_rss_mb'])]
+        metrics += [(f'collaborative_build.{name}', base['collaborative_build'][name], value)
+                    for name, value in result.get('collaborative_build', {}).items()
+                    if name.endswith('_s') and name in base.get('collaborative_build', {})]
+        metrics += [(f'{endpoint}.p99_ms', base['endpoints'][endpoint]['p99_ms'], stats['p99_ms'])
+                    for endpoint, stats in result['endpoints'].items() if endpoint in base['endpoints']]
+        for name, old, new in metrics:
+            ratio = new / old if old else float('inf')
+            lines.append(f"{scale}x {name}: {old} -> {new} ({ratio:.2f}x)")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of the data loader and the API endpoints")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help="Dataset scales to benchmark")
+    parser.add_argument('--requests', type=int, default=200, help="Requests sent to each endpoint")
+    parser.add_argument('--output', type=Path, help="JSON file for the results (default: tmp/benchmarks/results_<commit>.json)")
+    parser.add_argument('--compare', type=Path, help="JSON results of a previous run to compare with")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_run_scale(args.requests)))
+        return
+
+    results = run_benchmarks(args.scales, args.requests)
+    output = args.output or BENCHMARK_DIR / f"results_{results['commit'] or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding='utf-8')
+    print(f"Results written to {output}")
+
+    if args.compare:
+        for line in compare_results(json.loads(args.compare.read_text(encoding='utf-8')), results):
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
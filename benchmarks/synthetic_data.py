@@ -0,0 +1,80 @@
+import shutil
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from config import PARQUET_FILES
+
+# Rows generated per reviewing user when the user_items file isn't available to be scaled
+_ITEMS_PER_USER = 20
+
+
+def _synthetic_user_items(df1, df2, seed=0):
+    """
+    Builds a user_items table (user_id, item_id, item_name, playtime_forever) from the users of the reviews
+    and the games catalog, for environments where Clean_australian_users_items.parquet isn't available.
+    """
+    rng = np.random.default_rng(seed)
+    users = df1['user_id'].unique()
+    n_rows = len(users) * _ITEMS_PER_USER
+    games = rng.integers(0, len(df2), n_rows)
+    return pd.DataFrame({'user_id': np.repeat(users, _ITEMS_PER_USER),
+                         'item_id': df2['id'].to_numpy()[games],
+                         'item_name': df2['app_name'].to_numpy()[games],
+                         # About a third of the owned games are never played, like in the real data
+                         'playtime_forever': np.where(rng.random(n_rows) < 0.3, 0, rng.integers(1, 5000, n_rows)).astype('float64')})
+
+
+def _replicate(df, scale, id_columns):
+    """
+    Concatenates scale copies of df. From the second copy on, the values of id_columns get a copy
+    suffix, so the copies are new games / users rather than duplicates.
+    """
+    copies = [df]
+    for copy in range(1, scale):
+        df_copy = df.copy()
+        for column in id_columns:
+            df_copy[column] = df_copy[column] + f'x{copy}'
+        copies.append(df_copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def write_scaled_datasets(scale, data_dir):
+    """
+    Writes the three Parquet datasets scaled scale times into data_dir, with the same layout as
+    DATA_DIR (data_dir/Clean_Parquet_Data_Steam/*.parquet). Files already generated are reused.
+
+    Parameters:
+    -----------
+    scale : int
+        Number of copies of the original data (1 = original size)
+    data_dir : str or Path
+        Directory used as DATA_DIR when benchmarking this scale
+
+    Returns:
+    --------
+    Path
+        data_dir
+    """
+    data_dir = Path(data_dir)
+    target = {name: data_dir / path.parent.name / path.name for name, path in PARQUET_FILES.items()}
+    if all(path.exists() for path in target.values()):
+        return data_dir
+    target['user_items'].parent.mkdir(parents=True, exist_ok=True)
+
+    df1 = pd.read_parquet(PARQUET_FILES['user_reviews'])
+    df2 = pd.read_parquet(PARQUET_FILES['steam_games'])
+    if PARQUET_FILES['user_items'].exists():
+        df3 = pd.read_parquet(PARQUET_FILES['user_items'])
+    else:
+        df3 = _synthetic_user_items(df1, df2)
+
+    if scale == 1 and PARQUET_FILES['user_items'].exists():
+        for name, path in PARQUET_FILES.items():
+            shutil.copyfile(path, target[name])
+        return data_dir
+
+    _replicate(df1, scale, ['user_id', 'item_id']).to_parquet(target['user_reviews'], index=False)
+    _replicate(df2, scale, ['id']).to_parquet(target['steam_games'], index=False)
+    # Several row groups, like a large file written by the ETL
+    _replicate(df3, scale, ['user_id', 'item_id']).to_parquet(target['user_items'], index=False, row_group_size=500_000)
+    return data_dir
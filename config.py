@@ -9,7 +9,8 @@ DATA_DIR = os.environ.get('DATA_DIR', os.path.join(BASE_DIR, 'datasets'))
 LOG_DIR = os.environ.get('LOG_DIR', os.path.join(BASE_DIR, 'misc', 'logs'))
 TEMP_DIR = os.environ.get('TEMP_DIR', os.path.join(BASE_DIR, 'tmp'))
 
-# Definir rutas específicas usando pathlib
+# Definir rutas específicas usando pathlib. Cada ruta puede ser un archivo Parquet o un directorio con varios
+# archivos Parquet (opcionalmente particionado estilo Hive, p. ej. user_items/part=0/archivo.parquet)
 PARQUET_FILES = {
     'user_reviews': Path(DATA_DIR) / 'Clean_Parquet_Data_Steam' / 'Clean_australian_user_reviews_FE.parquet',
     'steam_games': Path(DATA_DIR) / 'Clean_Parquet_Data_Steam' / 'Clean_output_steam_games.parquet',
@@ -17,4 +18,167 @@ PARQUET_FILES = {
 }
 
 LOG_FILE = Path(LOG_DIR) / 'main.py.log'
-TEMP_OUTPUT = Path(TEMP_DIR) / 'output.tmp'
+
+# Esquema de cada tabla: columnas que se leen (las demás no se cargan) con su tipo, y filtros de filas que
+# se aplican durante la lectura (los grupos de filas que no pueden cumplirlos, según sus estadísticas, no
+# se leen). Tipos: 'category' = texto codificado como diccionario, 'game_id' / 'user_id' = id de juego /
+# usuario con códigos compartidos entre tablas (se leen como texto si COMPACT_STORAGE está desactivado);
+# el resto son tipos de pandas. 'years': columnas de año (enteros, nulos si la fecha no tiene el formato)
+# que se derivan al cargar la tabla de una columna de fechas, con su formato explícito
+TABLE_SCHEMAS = {
+    'user_reviews': {
+        'columns': {'user_id': 'user_id', 'posted': 'category', 'item_id': 'game_id', 'recommend': 'bool',
+                    'sentiment_analysis': 'int8'},
+        'years': {'posted_year': ('posted', 'Posted %B %d, %Y.')},
+        'filters': [],
+    },
+    'steam_games': {
+        'columns': {'id': 'game_id', 'app_name': 'str', 'genres': 'category', 'specs': 'category',
+                    'developer': 'category', 'release_date': 'str'},
+        'years': {'release_year': ('release_date', '%Y-%m-%d')},
+        'filters': [],
+    },
+    'user_items': {
+        'columns': {'user_id': 'user_id', 'item_id': 'game_id', 'item_name': 'category', 'playtime_forever': 'float64'},
+        # Solo los registros de juegos que el usuario jugó (playtime > 0)
+        'filters': [('playtime_forever', '>', 0)],
+    },
+}
+
+# Modelo de recomendación: cantidad de vecinos que se guardan por juego y tamaño de los bloques
+# de filas con los que se calcula la similitud (limita el pico de memoria)
+SIMILARITY_TOP_K = int(os.environ.get('SIMILARITY_TOP_K', 20))
+SIMILARITY_BLOCK_SIZE = int(os.environ.get('SIMILARITY_BLOCK_SIZE', 1024))
+# Procesos que calculan los bloques de similitud en paralelo, sobre memoria compartida (0 = uno por CPU,
+# 1 = en el mismo proceso)
+SIMILARITY_WORKERS = int(os.environ.get('SIMILARITY_WORKERS', 0))
+
+# Cantidad de posiciones que se precalculan por año para UsersRecommend y UsersWorstDeveloper
+REVIEW_ROLLUP_TOP_N = int(os.environ.get('REVIEW_ROLLUP_TOP_N', 10))
+
+# Cargar en segundo plano todas las tablas y modelos al iniciar la API (de lo contrario se cargan
+# la primera vez que se usan)
+DATA_WARM_UP = os.environ.get('DATA_WARM_UP', 'true').lower() == 'true'
+# Threads con los que se cargan en paralelo las tablas y modelos independientes entre sí (0 = uno por
+# CPU, 1 = carga secuencial)
+DATA_LOAD_WORKERS = int(os.environ.get('DATA_LOAD_WORKERS', 0))
+
+# Caché en disco de los artefactos del modelo de recomendación (vocabulario TF-IDF, matriz TF-IDF e
+# índice de vecinos), para no reconstruirlos en cada inicio mientras los datos de entrada no cambien
+MODEL_CACHE_DIR = Path(TEMP_DIR) / 'model_cache'
+MODEL_CACHE_ENABLED = os.environ.get('MODEL_CACHE_ENABLED', 'true').lower() == 'true'
+# Versiones (claves de datos + configuración) que se conservan en la caché: al guardar una nueva se borran
+# las usadas hace más tiempo (el modelo de contenido y el colaborativo tienen cada uno su propia clave)
+MODEL_CACHE_MAX_KEYS = int(os.environ.get('MODEL_CACHE_MAX_KEYS', 4))
+
+# Modo de memoria compartida para varios workers de uvicorn: un proceso carga los datos y los publica en
+# SHARED_DATA_DIR (en memoria, /dev/shm, si existe), y los workers se adjuntan a ellos sin copiarlos.
+# SHARED_DATA_ATTACH_DIR lo define el proceso que lanza los workers, no se debe definir manualmente
+SHARED_DATA_DIR = os.environ.get('SHARED_DATA_DIR', '/dev/shm/steam_api' if os.path.isdir('/dev/shm') else os.path.join(TEMP_DIR, 'shared_data'))
+SHARED_DATA_ATTACH_DIR = os.environ.get('SHARED_DATA_ATTACH_DIR')
+
+# Caché de respuestas de los endpoints: 'memory' (LRU en el proceso), 'file' (sustituto local de una caché
+# compartida entre workers, en RESPONSE_CACHE_DIR) o 'none' (desactivada)
+RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+RESPONSE_CACHE_DIR = Path(TEMP_DIR) / 'response_cache'
+
+# Configuración por endpoint: cantidad máxima de respuestas guardadas y segundos de validez (TTL)
+RESPONSE_CACHE = {
+    'PlayTimeGenre': {'max_entries': 64, 'ttl': 3600},
+    'UserForGenre': {'max_entries': 64, 'ttl': 3600},
+    'UsersRecommend': {'max_entries': 64, 'ttl': 3600},
+    'UsersWorstDeveloper': {'max_entries': 64, 'ttl': 3600},
+    'sentiment_analysis': {'max_entries': 4096, 'ttl': 3600},
+    'recomendacion_juego': {'max_entries': 8192, 'ttl': 3600},
+    'recomendacion_juego_colaborativa': {'max_entries': 8192, 'ttl': 3600},
+    'recomendacion_usuario': {'max_entries': 8192, 'ttl': 3600},
+    'search': {'max_entries': 8192, 'ttl': 3600},
+}
+
+# Pools de ejecución de los endpoints: los endpoints costosos ('heavy') y las consultas simples ('light')
+# se ejecutan en pools de threads separados, para que los primeros no bloqueen a los segundos. Cuando un
+# pool tiene max_workers tareas en ejecución y max_queue en espera, las nuevas solicitudes se rechazan
+# de inmediato (HTTP 503) en lugar de acumularse
+EXECUTION_POOLS = {
+    'heavy': {'max_workers': int(os.environ.get('HEAVY_POOL_WORKERS', 4)), 'max_queue': int(os.environ.get('HEAVY_POOL_QUEUE', 64))},
+    'light': {'max_workers': int(os.environ.get('LIGHT_POOL_WORKERS', 16)), 'max_queue': int(os.environ.get('LIGHT_POOL_QUEUE', 512))},
+}
+
+# Pool en el que se ejecuta cada endpoint
+ENDPOINT_POOLS = {
+    'PlayTimeGenre': 'heavy',
+    'UserForGenre': 'heavy',
+    'UsersRecommend': 'heavy',
+    'UsersWorstDeveloper': 'heavy',
+    'sentiment_analysis': 'light',
+    'sentiment_analysis_bulk': 'heavy',
+    'recomendacion_juego': 'light',
+    'recomendacion_juego_batch': 'heavy',
+    'recomendacion_juego_colaborativa': 'light',
+    'recomendacion_usuario': 'light',
+    'search': 'light',
+}
+
+# Almacenamiento compacto de las tablas en memoria: las columnas de texto con muchos valores repetidos se
+# codifican como diccionario (códigos enteros), y los ids de juegos comparten códigos entre tablas
+COMPACT_STORAGE = os.environ.get('COMPACT_STORAGE', 'true').lower() == 'true'
+
+# Ingesta por lotes de user_items (la tabla más grande): se lee por grupos de filas / lotes de a lo sumo
+# USER_ITEMS_BATCH_SIZE filas, que se acumulan directamente en los agregados de tiempo de juego, sin cargar
+# la tabla completa en memoria (df3 solo se carga si se pide explícitamente)
+USER_ITEMS_STREAMING = os.environ.get('USER_ITEMS_STREAMING', 'true').lower() == 'true'
+USER_ITEMS_BATCH_SIZE = int(os.environ.get('USER_ITEMS_BATCH_SIZE', 65536))
+
+# Recarga de los datos sin reiniciar la API: cada DATA_RELOAD_INTERVAL segundos se revisa la fecha de
+# modificación de los archivos Parquet y, si cambiaron, se construye en segundo plano una nueva versión de
+# los datos (solo se reconstruyen las tablas y modelos que dependen de los archivos modificados) que luego
+# reemplaza a la actual. 0 desactiva la revisión (la recarga se puede pedir igual con POST /admin/reload)
+DATA_RELOAD_INTERVAL = float(os.environ.get('DATA_RELOAD_INTERVAL', 30))
+
+# Actualización incremental del modelo de recomendación cuando cambian los juegos durante una recarga: solo
+# se transforman los juegos nuevos o modificados con el vocabulario existente y solo se actualizan las listas
+# de vecinos afectadas. Cuando los juegos actualizados desde el último ajuste completo superan la fracción
+# RECOMMENDER_REFIT_DRIFT del catálogo, el vectorizador TF-IDF se ajusta de nuevo desde cero
+RECOMMENDER_INCREMENTAL = os.environ.get('RECOMMENDER_INCREMENTAL', 'true').lower() == 'true'
+RECOMMENDER_REFIT_DRIFT = float(os.environ.get('RECOMMENDER_REFIT_DRIFT', 0.2))
+
+# Modo de recomendación de /recomendacion_juego: 'exact' (índice precalculado con los vecinos exactos de
+# cada juego, su construcción es O(N^2)) o 'approximate' (índice de vecinos aproximados, ANN, que se
+# consulta por pedido; para catálogos muy grandes). Cada pedido puede elegir el modo con ?mode=
+RECOMMENDATION_MODE = os.environ.get('RECOMMENDATION_MODE', 'exact')
+
+# Índice de vecinos aproximados (ANN), local y sin servicios externos. 'ivf': los vectores TF-IDF se
+# reducen a 'dimensions' dimensiones (SVD) y se agrupan en 'n_lists' listas (k-means, 0 = unas raíz(N));
+# cada consulta busca solo en las 'n_probe' listas más cercanas. Más listas consultadas = mejor recall
+# pero mayor latencia (el recall se mide con GET /admin/ann_recall)
+ANN_INDEX = {
+    'backend': os.environ.get('ANN_BACKEND', 'ivf'),
+    'dimensions': int(os.environ.get('ANN_DIMENSIONS', 64)),
+    'n_lists': int(os.environ.get('ANN_LISTS', 0)),
+    'n_probe': int(os.environ.get('ANN_PROBE', 16)),
+}
+
+# Recomendador colaborativo ítem-ítem (/recomendacion_juego_colaborativa): dos juegos son similares si los
+# juegan los mismos usuarios (tiempo de juego de user_items). Se guardan los COLLABORATIVE_TOP_K vecinos de
+# cada juego; las similitudes se calculan en bloques de COLLABORATIVE_BLOCK_SIZE juegos, repartidos entre
+# COLLABORATIVE_WORKERS procesos sobre memoria compartida (0 = uno por CPU, 1 = en el mismo proceso).
+# COLLABORATIVE_CONTENT_WEIGHT: peso por defecto de la similitud por contenido (TF-IDF) en la mezcla
+# híbrida (0 = solo colaborativo, 1 = solo contenido)
+COLLABORATIVE_TOP_K = int(os.environ.get('COLLABORATIVE_TOP_K', 20))
+COLLABORATIVE_BLOCK_SIZE = int(os.environ.get('COLLABORATIVE_BLOCK_SIZE', 2048))
+COLLABORATIVE_WORKERS = int(os.environ.get('COLLABORATIVE_WORKERS', 0))
+COLLABORATIVE_CONTENT_WEIGHT = float(os.environ.get('COLLABORATIVE_CONTENT_WEIGHT', 0.0))
+
+# Recomendaciones por usuario (/recomendacion_usuario): se precalculan las USER_RECOMMENDATIONS_TOP_N mejores
+# recomendaciones de los USER_RECOMMENDATIONS_PRECOMPUTED_USERS usuarios con más juegos jugados (los más
+# costosos de calcular), en bloques de USER_RECOMMENDATIONS_BLOCK_SIZE usuarios; las de los demás usuarios
+# se calculan en cada pedido
+USER_RECOMMENDATIONS_PRECOMPUTED_USERS = int(os.environ.get('USER_RECOMMENDATIONS_PRECOMPUTED_USERS', 1000))
+USER_RECOMMENDATIONS_TOP_N = int(os.environ.get('USER_RECOMMENDATIONS_TOP_N', 20))
+USER_RECOMMENDATIONS_BLOCK_SIZE = int(os.environ.get('USER_RECOMMENDATIONS_BLOCK_SIZE', 256))
+
+# Búsqueda por nombre de juegos, desarrolladoras y géneros (/search y búsqueda aproximada en los demás
+# endpoints): similitud mínima (0 a 1, proporción de caracteres en común) para aceptar un nombre con errores
+# de tipeo, y cantidad de resultados por defecto de /search
+SEARCH_FUZZY_THRESHOLD = float(os.environ.get('SEARCH_FUZZY_THRESHOLD', 0.8))
+SEARCH_RESULTS = int(os.environ.get('SEARCH_RESULTS', 10))
@@ -0,0 +1,384 @@
+import numpy as np
+import pandas as pd
+from config import REVIEW_ROLLUP_TOP_N
+from datasets.encoding import build_multi_hot, decoded
+
+
+class PlaytimeAggregates:
+    """
+    Playtime totals precomputed once from df2 (games) and df3 (user playtime), with genres exploded.
+
+    Attributes:
+    -----------
+    by_genre_year : Series
+        Minutes played indexed by (genre, release_year)
+    by_genre_user_year : Series
+        Minutes played indexed by (genre, user_id, release_year)
+    """
+
+    def __init__(self, by_genre_user_year):
+        self.by_genre_user_year = by_genre_user_year.sort_index()
+        self.by_genre_year = self.by_genre_user_year.groupby(level=['genre', 'release_year'], observed=True).sum()
+
+        # Precompute the answers of the endpoints, so a request is a dictionary lookup
+        self._top_year = {genre: int(years.idxmax()[1])
+                          for genre, years in self.by_genre_year.groupby(level='genre', observed=True)}
+        by_genre_user = self.by_genre_user_year.groupby(level=['genre', 'user_id'], observed=True).sum()
+        self._top_user = {genre: users.idxmax()[1] for genre, users in by_genre_user.groupby(level='genre', observed=True)}
+
+    @property
+    def genres(self):
+        return list(self._top_year)
+
+    def _check_genre(self, genre):
+        if genre not in self._top_year:
+            raise ValueError(f"The genre '{genre}' is not found in the dataset")
+
+    def year_with_most_playtime(self, genre):
+        """
+        Returns the release year whose games accumulate the most minutes played for the genre.
+        """
+        self._check_genre(genre)
+        return self._top_year[genre]
+
+    def user_with_most_playtime(self, genre):
+        """
+        Returns the user with the most minutes played for the genre, and that user's minutes
+        played per release year (Series indexed by release_year, most recent year first).
+        """
+        self._check_genre(genre)
+        user_id = self._top_user[genre]
+        playtime_by_year = self.by_genre_user_year.loc[(genre, user_id)]
+        return user_id, playtime_by_year.sort_index(ascending=False)
+
+
+def _explode_genres(df2, genres=None):
+    """
+    Returns one row per (game id, genre) with the release year of the game (df2['release_year'], parsed
+    when the table is loaded). Games without a release year are dropped, as they can't be attributed to a year.
+
+    The pairs are taken from the games x genres matrix (genres, built from df2['genres'] if not given),
+    so no string is split per game, and 'genre' is returned dictionary-encoded.
+    """
+    genres = build_multi_hot(df2['genres']) if genres is None else genres
+    release_year = df2['release_year'].to_numpy(dtype='float64', na_value=np.nan)
+
+    rows, genre_codes = genres.pairs()
+    dated = ~np.isnan(release_year[rows])
+    rows, genre_codes = rows[dated], genre_codes[dated]
+    return pd.DataFrame({'id': df2['id'].take(rows).array,
+                         'genre': pd.Categorical.from_codes(genre_codes, categories=genres.vocabulary),
+                         'release_year': release_year[rows].astype('int32')})
+
+
+def _sum_playtime(games_by_genre, df3):
+    """Sums the minutes played of df3 (or a chunk of it) per (genre, user_id, release_year)."""
+    played = df3[['item_id', 'user_id', 'playtime_forever']].merge(games_by_genre, left_on='item_id', right_on='id')
+    return played.groupby(['genre', 'user_id', 'release_year'], observed=True)['playtime_forever'].sum()
+
+
+def build_playtime_aggregates(df2, df3, genres=None):
+    """
+    Builds the playtime aggregates used by the PlayTimeGenre and UserForGenre endpoints.
+
+    Parameters:
+    -----------
+    df2 : DataFrame
+        Game information data
+    df3 : DataFrame
+        User playtime statistics
+    genres : MultiHot, optional
+        Genres of the games of df2, built from df2['genres'] if not given
+
+    Returns:
+    --------
+    PlaytimeAggregates
+        Playtime per (genre, release_year) and per (genre, user_id, release_year)
+    """
+    return PlaytimeAggregates(_sum_playtime(_explode_genres(df2, genres), df3))
+
+
+def build_playtime_aggregates_streaming(df2, batches, genres=None):
+    """
+    Builds the same playtime aggregates as build_playtime_aggregates, folding the user playtime statistics
+    in batch by batch, so only one batch of df3 and the running totals are in memory at a time.
+
+    Each batch is joined with the games and summed on integer codes (df2 row, genre, user, release year),
+    so the cost per batch doesn't depend on the number of games / users. Game and user ids encoded with
+    shared categories (compact storage mode) are used through their codes directly.
+
+    Parameters:
+    -----------
+    df2 : DataFrame
+        Game information data
+    batches : iterable of DataFrame
+        Batches of the user playtime statistics (with the item_id, user_id and playtime_forever columns)
+    genres : MultiHot, optional
+        Genres of the games of df2, built from df2['genres'] if not given
+
+    Returns:
+    --------
+    PlaytimeAggregates
+        Playtime per (genre, release_year) and per (genre, user_id, release_year)
+    """
+    genres = build_multi_hot(df2['genres']) if genres is None else genres
+    release_year = df2['release_year'].to_numpy(dtype='float64', na_value=np.nan)
+    years, year_codes = np.unique(release_year[~np.isnan(release_year)].astype('int32'), return_inverse=True)
+    game_year = np.full(len(df2), -1, dtype=np.int64)
+    game_year[~np.isnan(release_year)] = year_codes
+    # Games without a release year have no genres here: they can't be attributed to a year
+    game_genres = genres.matrix.multiply((game_year >= 0)[:, None].astype(np.int8)).tocsr()
+    game_genres.eliminate_zeros()
+
+    game_rows = _GameRows(df2['id'])
+    users = _UserCodes()
+    partials, pending_rows = [], 0
+    for batch in batches:
+        rows = game_rows.rows(batch['item_id'])
+        found = np.flatnonzero(rows >= 0)
+        # One (batch row, genre) pair per genre of the game of each row
+        pairs = game_genres[rows[found]].tocoo()
+        batch_rows = found[pairs.row]
+        # (genre, release_year, user) packed in one int64 key: (genre * years + year) in the high 32 bits
+        keys = ((pairs.col.astype(np.int64) * len(years) + game_year[rows[batch_rows]]) << 32) | users.codes(batch['user_id'])[batch_rows]
+        partials.append(_fold_playtime([pd.Series(batch['playtime_forever'].to_numpy()[batch_rows], index=keys)]))
+        pending_rows += len(partials[-1])
+        # Fold the partial sums together once they outgrow the running totals, so memory stays bounded
+        # by the size of the result while each row is regrouped only a few times
+        if len(partials) > 1 and pending_rows > len(partials[0]):
+            partials = [_fold_playtime(partials)]
+            pending_rows = 0
+
+    totals = _fold_playtime(partials) if partials else pd.Series([], index=np.array([], dtype=np.int64), dtype=np.float64)
+    # Back from the packed codes to labels
+    keys = totals.index.to_numpy()
+    genre_year, user_codes = keys >> 32, keys & 0xFFFFFFFF
+    index = pd.MultiIndex(levels=[genres.vocabulary, users.categories, pd.Index(years, dtype='int32')],
+                          codes=[genre_year // len(years), user_codes, genre_year % len(years)],
+                          names=['genre', 'user_id', 'release_year'])
+    return PlaytimeAggregates(pd.Series(totals.to_numpy(), index=index, name='playtime_forever'))
+
+
+def _fold_playtime(partials):
+    # Sums partial playtime totals per packed (genre, release_year, user) key
+    totals = pd.concat(partials) if len(partials) > 1 else partials[0]
+    return totals.groupby(level=0, sort=False).sum()
+
+
+class _GameRows:
+    """Row in df2 of the game of each item id (-1 if the game is not in df2)."""
+
+    def __init__(self, ids):
+        self._dtype = ids.dtype
+        if isinstance(ids.dtype, pd.CategoricalDtype):
+            # Shared categories: a take by code (first row if an id were repeated)
+            codes = ids.cat.codes.to_numpy()
+            self._row_of_code = np.full(len(ids.dtype.categories) + 1, -1, dtype=np.int64)
+            self._row_of_code[codes[::-1]] = np.arange(len(ids))[::-1]
+        self._index = pd.Index(decoded(ids))
+
+    def rows(self, item_ids):
+        if item_ids.dtype is self._dtype and isinstance(self._dtype, pd.CategoricalDtype):
+            return self._row_of_code[item_ids.cat.codes.to_numpy()]  # Code -1 (missing) maps to the last entry, -1
+        return self._index.get_indexer(decoded(item_ids))
+
+
+class _UserCodes:
+    """Integer codes of user ids consistent across batches, with the categories they stand for."""
+
+    def __init__(self):
+        self._dtype = None
+        self.categories = pd.Index([], dtype='str')
+
+    def codes(self, user_ids):
+        if isinstance(user_ids.dtype, pd.CategoricalDtype) and (self._dtype is None or user_ids.dtype is self._dtype):
+            if self._dtype is None and not len(self.categories):
+                self._dtype, self.categories = user_ids.dtype, user_ids.dtype.categories
+            if user_ids.dtype is self._dtype:
+                return user_ids.cat.codes.to_numpy()
+        # Ids without shared categories: codes of the users seen so far, new users are appended
+        user_ids = decoded(user_ids)
+        new_users = pd.Index(user_ids.unique()).difference(self.categories)
+        if len(new_users):
+            self._dtype = None
+            self.categories = self.categories.append(new_users)
+        return self.categories.get_indexer(user_ids)
+
+
+class ReviewRollups:
+    """
+    Review counts per posting year, precomputed once from df1 (reviews) and df2 (games).
+
+    Attributes:
+    -----------
+    good_reviews : Series
+        Number of good reviews (recommended, with neutral or positive sentiment) indexed by (year, item_id)
+    bad_reviews : Series
+        Number of bad reviews (not recommended, with negative sentiment) indexed by (year, developer)
+    """
+
+    def __init__(self, good_reviews, bad_reviews, app_names, top_n=REVIEW_ROLLUP_TOP_N):
+        self.good_reviews = good_reviews
+        self.bad_reviews = bad_reviews
+        self.top_n = top_n
+        self._app_names = app_names
+        self._top_games = {}
+        self._worst_developers = {}
+        self._rank_years(good_reviews.index.unique(level='year'))
+
+    def _rank_years(self, years):
+        """Ranks the top-N games and developers of the given years (only those are recomputed)."""
+        for year in years:
+            # Most good / bad reviews first, ties broken by item_id / developer so rankings are deterministic
+            games = self.good_reviews.loc[year].reset_index()
+            games = games.sort_values(by=['good_review', 'item_id'], ascending=[False, True])
+            self._top_games[int(year)] = self._app_names.loc[games['item_id'].head(self.top_n)].tolist()
+
+            developers = self.bad_reviews.loc[year].reset_index()
+            developers = developers.sort_values(by=['bad_review', 'developer'], ascending=[False, True])
+            self._worst_developers[int(year)] = developers['developer'].head(self.top_n).tolist()
+
+    @property
+    def years(self):
+        return sorted(self._top_games)
+
+    def most_recommended_games(self, year, n=3):
+        """
+        Returns the names of the n games with the most good reviews posted in the given year.
+        """
+        return self._ranked(self._top_games, year, n)
+
+    def least_recommended_developers(self, year, n=3):
+        """
+        Returns the n developers whose games got the most bad reviews posted in the given year.
+        """
+        return self._ranked(self._worst_developers, year, n)
+
+    def _ranked(self, rankings, year, n):
+        if n > self.top_n:
+            raise ValueError(f"Requested {n} positions but only the top {self.top_n} are precomputed")
+        if len(rankings.get(year, [])) < n:
+            raise ValueError(f"There are not enough reviews posted in {year} to rank {n} positions")
+        return rankings[year][:n]
+
+    def add_reviews(self, new_reviews, df2):
+        """
+        Incrementally adds new reviews (e.g. a new year of data) to the rollups. Only the counts and
+        rankings of the years present in new_reviews are updated.
+
+        Parameters:
+        -----------
+        new_reviews : DataFrame
+            New user reviews, with the same columns as df1
+        df2 : DataFrame
+            Game information data
+        """
+        good_reviews, bad_reviews, app_names = _count_reviews(new_reviews, df2)
+        self.good_reviews = self.good_reviews.add(good_reviews, fill_value=0).astype('int64').sort_index()
+        self.bad_reviews = self.bad_reviews.add(bad_reviews, fill_value=0).astype('int64').sort_index()
+        self._app_names = self._app_names.combine_first(app_names)
+        self._rank_years(good_reviews.index.unique(level='year'))
+
+
+def _count_reviews(df1, df2):
+    """
+    Counts good reviews per (year, item_id) and bad reviews per (year, developer). The year is df1['posted_year'],
+    parsed from 'posted' (e.g. "Posted November 5, 2011.") when the table is loaded; reviews without a year
+    (e.g. "Posted March 3.") are left out.
+    """
+    reviews = df1[['posted_year', 'item_id', 'recommend', 'sentiment_analysis']].dropna(subset=['posted_year'])
+    reviews = reviews.rename(columns={'posted_year': 'year'}).astype({'year': 'Int32'})
+
+    # Only reviews of games present in df2 can be ranked, as their name / developer is needed
+    reviews = reviews.merge(df2[['id', 'app_name', 'developer']], left_on='item_id', right_on='id')
+
+    reviews['good_review'] = (reviews['recommend'] == True) & (reviews['sentiment_analysis'].isin([1, 2]))
+    reviews['bad_review'] = (reviews['recommend'] == False) & (reviews['sentiment_analysis'] == 0)
+
+    good_reviews = reviews.groupby(['year', 'item_id'], observed=True)['good_review'].sum()
+    bad_reviews = reviews.groupby(['year', 'developer'], observed=True)['bad_review'].sum()
+    app_names = reviews.drop_duplicates('item_id').set_index('item_id')['app_name']
+    return good_reviews, bad_reviews, app_names
+
+
+def build_review_rollups(df1, df2):
+    """
+    Builds the per-year review rollups used by the UsersRecommend and UsersWorstDeveloper endpoints.
+
+    Parameters:
+    -----------
+    df1 : DataFrame
+        User reviews data
+    df2 : DataFrame
+        Game information data
+
+    Returns:
+    --------
+    ReviewRollups
+        Good review counts per (year, item_id) and bad review counts per (year, developer), ranked per year
+    """
+    return ReviewRollups(*_count_reviews(df1, df2))
+
+
+class SentimentIndex:
+    """
+    Number of reviews per sentiment (0 = negative, 1 = neutral, 2 = positive) for each developer,
+    precomputed once from df1 (reviews) and df2 (games).
+
+    Attributes:
+    -----------
+    counts : DataFrame
+        Indexed by developer, with the 'negative', 'neutral' and 'positive' review counts as columns
+    """
+
+    def __init__(self, counts):
+        self.counts = counts
+
+    def sentiment_counts(self, developer):
+        """
+        Returns the (negative, neutral, positive) review counts of the developer's games.
+        """
+        if developer not in self.counts.index:
+            raise ValueError(f"The developer company '{developer}' is not found in the dataset")
+        negative, neutral, positive = self.counts.loc[developer]
+        return int(negative), int(neutral), int(positive)
+
+    def bulk_sentiment_counts(self, developers):
+        """
+        Returns a dictionary with the (negative, neutral, positive) review counts of each developer.
+        """
+        rows = self.bulk_sentiment_count_columns(developers)
+        return {developer: tuple(int(count) for count in row) for developer, row in zip(developers, rows)}
+
+    def bulk_sentiment_count_columns(self, developers):
+        """
+        Returns the (negative, neutral, positive) review counts of the developers as an array with one row
+        per developer, in the given order.
+        """
+        missing = [developer for developer in developers if developer not in self.counts.index]
+        if missing:
+            raise ValueError(f"The developer companies {missing} are not found in the dataset")
+        return self.counts.loc[list(developers)].to_numpy()
+
+
+def build_sentiment_index(df1, df2):
+    """
+    Builds the developer sentiment index used by the sentiment_analysis endpoints.
+
+    Parameters:
+    -----------
+    df1 : DataFrame
+        User reviews data
+    df2 : DataFrame
+        Game information data
+
+    Returns:
+    --------
+    SentimentIndex
+        Review counts per developer and sentiment
+    """
+    reviews = df1[['item_id', 'sentiment_analysis']].merge(df2[['id', 'developer']], left_on='item_id', right_on='id')
+    counts = pd.crosstab(reviews['developer'], reviews['sentiment_analysis'])
+    counts = counts.reindex(columns=[0, 1, 2], fill_value=0)
+    counts.columns = ['negative', 'neutral', 'positive']
+    return SentimentIndex(counts)
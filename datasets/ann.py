@@ -0,0 +1,196 @@
+import time
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+from config import ANN_INDEX
+from datasets.similarity import exact_top_n
+
+
+class IVFIndex:
+    """
+    Approximate nearest-neighbor index of the games (inverted file index), queried on demand instead of
+    precomputing the neighbors of every game.
+
+    The TF-IDF vectors are reduced to a few dense dimensions (truncated SVD) and clustered with k-means.
+    Each game is stored in the list of its cluster. A query only looks at the games of the n_probe
+    clusters closest to the game, and ranks those candidates by their exact TF-IDF cosine similarity.
+    Building is O(N x lists) instead of the O(N^2) of the exact index, and a query costs
+    O(n_probe x N / lists): more probed lists give a better recall at the cost of latency.
+
+    Attributes:
+    -----------
+    tfidf_matrix : sparse matrix
+        L2-normalized TF-IDF vectors of the games, used to rank the candidates
+    vectors : ndarray (float32, shape N x dimensions)
+        Reduced, L2-normalized vectors of the games
+    centroids : ndarray (float32, shape lists x dimensions)
+        Center of each cluster
+    list_offsets : ndarray (int64, shape lists + 1)
+        The games of list l are list_rows[list_offsets[l]:list_offsets[l + 1]]
+    list_rows : ndarray (int32, shape N)
+        Row positions of the games, grouped by list
+    n_probe : int
+        Number of lists searched per query
+    """
+
+    def __init__(self, tfidf_matrix, vectors, centroids, list_offsets, list_rows, n_probe=ANN_INDEX['n_probe']):
+        self.tfidf_matrix = tfidf_matrix
+        self.vectors = vectors
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.n_probe = n_probe
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.vectors.nbytes + self.centroids.nbytes + self.list_offsets.nbytes + self.list_rows.nbytes
+
+    def most_similar(self, idx, n=5):
+        """
+        Returns the row positions and scores of the n games most similar to the game at row idx (approximately:
+        only among the games of the n_probe closest lists).
+
+        Parameters:
+        -----------
+        idx : int
+            Row position of the game in df2
+        n : int
+            Number of neighbors to return
+
+        Returns:
+        --------
+        tuple
+            (ndarray of row positions, ndarray of similarity scores)
+        """
+        neighbors, scores = self.most_similar_batch([idx], n)
+        return neighbors[0], scores[0]
+
+    def most_similar_batch(self, rows, n=5):
+        """
+        Returns the row positions and scores of the n games most similar to each of the games at rows. The
+        lists to probe are chosen for all the games at once.
+
+        Returns:
+        --------
+        tuple
+            (ndarray of row positions, ndarray of similarity scores), both of shape len(rows) x n (at most N - 1)
+        """
+        rows = np.asarray(rows)
+        n = min(n, len(self) - 1)
+        n_probe = min(self.n_probe, len(self.centroids))
+        probes = np.argpartition(-(self.vectors[rows] @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+
+        neighbors = np.empty((len(rows), n), dtype=np.int32)
+        scores = np.empty((len(rows), n), dtype=np.float32)
+        for i, (row, lists) in enumerate(zip(rows, probes)):
+            candidates = np.concatenate([self.list_rows[self.list_offsets[l]:self.list_offsets[l + 1]] for l in lists])
+            candidates = candidates[candidates != row]
+            if len(candidates) < n:
+                # Too few games in the probed lists: search the whole catalog
+                candidates = np.delete(np.arange(len(self), dtype=np.int32), row)
+            candidate_scores = (self.tfidf_matrix[candidates] @ self.tfidf_matrix[row].T).toarray().ravel()
+            # Descending score, ties by row position (as the exact index)
+            order = np.lexsort((candidates, -candidate_scores))[:n]
+            neighbors[i], scores[i] = candidates[order], candidate_scores[order]
+        return neighbors, scores
+
+
+def build_ivf_index(tfidf_matrix, dimensions=ANN_INDEX['dimensions'], n_lists=ANN_INDEX['n_lists'],
+                    n_probe=ANN_INDEX['n_probe'], random_state=0):
+    """
+    Builds an IVFIndex over the TF-IDF vectors of the games.
+
+    Parameters:
+    -----------
+    tfidf_matrix : sparse matrix
+        L2-normalized TF-IDF vectors of the games (one row per game in df2)
+    dimensions : int
+        Number of dimensions of the reduced vectors (at most the number of terms - 1)
+    n_lists : int
+        Number of clusters / lists (0: about sqrt(N))
+    n_probe : int
+        Number of lists searched per query
+    random_state : int
+        Seed of the SVD and k-means, so the index is reproducible
+
+    Returns:
+    --------
+    IVFIndex
+    """
+    n_games, n_terms = tfidf_matrix.shape
+    n_lists = min(n_lists or int(np.sqrt(n_games)), n_games)
+
+    # Dense low-dimensional vectors, normalized so the dot product with the centroids ranks by cosine
+    dimensions = min(dimensions, n_terms - 1)
+    vectors = normalize(TruncatedSVD(dimensions, random_state=random_state).fit_transform(tfidf_matrix)).astype(np.float32)
+
+    kmeans = MiniBatchKMeans(n_clusters=n_lists, batch_size=4096, n_init=1, random_state=random_state).fit(vectors)
+    centroids = normalize(kmeans.cluster_centers_).astype(np.float32)
+
+    # Inverted lists: the games sorted by list, and where each list starts
+    labels = kmeans.labels_
+    list_rows = np.argsort(labels, kind='stable').astype(np.int32)
+    list_offsets = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=n_lists)))).astype(np.int64)
+    return IVFIndex(tfidf_matrix, vectors, centroids, list_offsets, list_rows, n_probe)
+
+
+# Approximate nearest-neighbor backends, by name (ANN_INDEX['backend'])
+ANN_BACKENDS = {
+    'ivf': build_ivf_index,
+}
+
+def build_ann_index(tfidf_matrix, config=ANN_INDEX):
+    """
+    Builds the approximate nearest-neighbor index of the backend configured in config['backend'], with the
+    rest of config as its parameters.
+    """
+    options = {name: value for name, value in config.items() if name != 'backend'}
+    return ANN_BACKENDS[config['backend']](tfidf_matrix, **options)
+
+
+def evaluate_recall(index, tfidf_matrix, n=5, sample_size=200, random_state=0):
+    """
+    Measures the recall and latency of an approximate index against the exact neighbors, computed from the
+    TF-IDF matrix, for a random sample of games.
+
+    Recall counts the returned neighbors that score at least as much as the exact n-th neighbor, so a
+    different choice among tied games is not a miss.
+
+    Parameters:
+    -----------
+    index : IVFIndex
+        Approximate index to evaluate
+    tfidf_matrix : sparse matrix
+        L2-normalized TF-IDF vectors of the games
+    n : int
+        Number of neighbors per game
+    sample_size : int
+        Number of games queried
+    random_state : int
+        Seed of the sample
+
+    Returns:
+    --------
+    dict
+        'recall' (between 0 and 1), and mean milliseconds per game of the approximate and exact queries
+    """
+    rows = np.random.default_rng(random_state).choice(len(index), min(sample_size, len(index)), replace=False)
+
+    start = time.perf_counter()
+    for row in rows:
+        index.most_similar(row, n)
+    approximate_ms = (time.perf_counter() - start) * 1000 / len(rows)
+    _, approximate_scores = index.most_similar_batch(rows, n)
+
+    start = time.perf_counter()
+    _, exact_scores = exact_top_n(tfidf_matrix, rows, n)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(rows)
+
+    # A small tolerance, as scores are stored in single precision
+    hits = (approximate_scores >= exact_scores[:, -1:] - 1e-6).sum()
+    return {'n': n, 'sample_size': len(rows), 'recall': round(float(hits / exact_scores.size), 4),
+            'approximate_ms': round(approximate_ms, 4), 'exact_ms': round(exact_ms, 4)}
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from config import MODEL_CACHE_DIR, MODEL_CACHE_MAX_KEYS
+from datasets.similarity import TopKSimilarityIndex
+from datasets.ann import IVFIndex
+from datasets.collaborative import ItemItemRecommender
+
+
+def artifact_key(input_files, feature_config):
+    """
+    Returns a key that identifies a set of model artifacts: a hash of the content of the input files
+    and of the configuration used to build the features / model. If any of them changes, so does the key.
+
+    Parameters:
+    -----------
+    input_files : list of Path
+        Files the artifacts are built from (e.g. the games Parquet file)
+    feature_config : dict
+        JSON serializable description of how the artifacts are built
+
+    Returns:
+    --------
+    str
+        Hexadecimal SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for path in input_files:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    digest.update(json.dumps(feature_config, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _ann_name(config):
+    # Artifact name of an ANN index: a hash of the configuration it's built with. n_probe is only used by
+    # the queries, so changing it doesn't rebuild the index
+    return f"ann_index-{artifact_key([], {name: value for name, value in config.items() if name != 'n_probe'})[:12]}"
+
+
+class ArtifactCache:
+    """
+    On-disk cache of model artifacts stored as .npy files, one directory per (key, artifact name).
+
+    Arrays are loaded memory-mapped, so later process starts (and additional workers) share the pages
+    of the cached files through the OS page cache instead of rebuilding and copying them.
+
+    Each key is a version of the data and configuration, so only the max_keys most recently used keys are
+    kept: the others are deleted when an artifact is stored under a new key.
+    """
+
+    def __init__(self, root=MODEL_CACHE_DIR, max_keys=MODEL_CACHE_MAX_KEYS):
+        self.root = Path(root)
+        self.max_keys = max_keys
+
+    def _path(self, key, name):
+        return self.root / key / name
+
+    def _touch(self, key):
+        # The modification time of the key directory is its last use
+        try:
+            os.utime(self.root / key)
+        except OSError:
+            pass
+
+    def prune(self, keep=()):
+        """
+        Deletes the least recently used keys beyond max_keys (never the ones in keep), returning them.
+        Processes that memory-mapped their files keep using them until they unmap them.
+        """
+        if not self.root.is_dir():
+            return []
+        keys = sorted((path for path in self.root.iterdir() if path.is_dir()), key=lambda path: path.stat().st_mtime, reverse=True)
+        stale = [path for path in keys[self.max_keys:] if path.name not in keep]
+        for path in stale:
+            shutil.rmtree(path, ignore_errors=True)
+        return [path.name for path in stale]
+
+    def load_arrays(self, key, name):
+        """
+        Returns (arrays, metadata) for the cached artifact, or None if it isn't cached.
+        """
+        path = self._path(key, name)
+        if not (path / 'meta.json').exists():
+            return None
+        self._touch(key)
+        meta = json.loads((path / 'meta.json').read_text(encoding='utf-8'))
+        arrays = {array_name: np.load(path / f'{array_name}.npy', mmap_mode='r') for array_name in meta['arrays']}
+        return arrays, meta['metadata']
+
+    def save_arrays(self, key, name, arrays, metadata=None):
+        """
+        Stores the arrays (and JSON serializable metadata) of an artifact. The files are written to a
+        temporary directory that is then renamed, so readers never see a partially written artifact.
+        """
+        path = self._path(key, name)
+        new_key = not path.parent.exists()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._touch(key)
+        tmp_path = Path(tempfile.mkdtemp(prefix=f'.{name}-', dir=path.parent))
+        try:
+            for array_name, array in arrays.items():
+                np.save(tmp_path / f'{array_name}.npy', np.ascontiguousarray(array))
+            # meta.json is written last, it marks the artifact as complete
+            meta = {'arrays': list(arrays), 'metadata': metadata or {}}
+            (tmp_path / 'meta.json').write_text(json.dumps(meta), encoding='utf-8')
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another process stored the same artifact first, keep that one
+            if not (path / 'meta.json').exists():
+                raise
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        if new_key:
+            self.prune(keep={key})
+
+    def load_tfidf(self, key):
+        """
+        Returns the cached (TfidfVectorizer, TF-IDF matrix), or None if they aren't cached.
+        """
+        cached = self.load_arrays(key, 'tfidf')
+        if cached is None:
+            return None
+        arrays, metadata = cached
+
+        # Rebuild the fitted vectorizer from its vocabulary and idf weights, so new documents can be transformed
+        tfidf_vectorizer = TfidfVectorizer(**metadata['params'])
+        tfidf_vectorizer.vocabulary_ = {term: int(column) for term, column in zip(metadata['terms'], arrays['term_columns'])}
+        tfidf_vectorizer.idf_ = np.asarray(arrays['idf'])
+        # Rows of the last full fit and rows transformed incrementally since then (see _update_tfidf)
+        tfidf_vectorizer.n_fit_rows_ = metadata.get('fit_rows', metadata['shape'][0])
+        tfidf_vectorizer.n_updated_rows_ = metadata.get('updated_rows', 0)
+
+        tfidf_matrix = sp.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=tuple(metadata['shape']))
+        return tfidf_vectorizer, tfidf_matrix
+
+    def save_tfidf(self, key, tfidf_vectorizer, tfidf_matrix, params=None):
+        """
+        Stores the fitted TfidfVectorizer (vocabulary and idf weights) and the TF-IDF matrix (CSR arrays).
+        """
+        terms = list(tfidf_vectorizer.vocabulary_)
+        arrays = {'term_columns': np.array([tfidf_vectorizer.vocabulary_[term] for term in terms], dtype=np.int64),
+                  'idf': tfidf_vectorizer.idf_,
+                  'data': tfidf_matrix.data, 'indices': tfidf_matrix.indices, 'indptr': tfidf_matrix.indptr}
+        metadata = {'terms': terms, 'shape': list(tfidf_matrix.shape), 'params': params or {},
+                    'fit_rows': int(getattr(tfidf_vectorizer, 'n_fit_rows_', tfidf_matrix.shape[0])),
+                    'updated_rows': int(getattr(tfidf_vectorizer, 'n_updated_rows_', 0))}
+        self.save_arrays(key, 'tfidf', arrays, metadata)
+
+    def load_similarity_index(self, key):
+        """
+        Returns the cached TopKSimilarityIndex (memory-mapped), or None if it isn't cached.
+        """
+        cached = self.load_arrays(key, 'similarity_index')
+        if cached is None:
+            return None
+        arrays, _ = cached
+        return TopKSimilarityIndex(arrays['neighbors'], arrays['scores'])
+
+    def save_similarity_index(self, key, index):
+        """
+        Stores the neighbor and score arrays of a TopKSimilarityIndex.
+        """
+        self.save_arrays(key, 'similarity_index', {'neighbors': index.neighbors, 'scores': index.scores})
+
+    def load_ann_index(self, key, tfidf_matrix, config):
+        """
+        Returns the cached IVFIndex built with config (memory-mapped, over the given TF-IDF matrix, probing
+        config['n_probe'] lists), or None if it isn't cached.
+        """
+        cached = self.load_arrays(key, _ann_name(config))
+        if cached is None:
+            return None
+        arrays, _ = cached
+        return IVFIndex(tfidf_matrix, arrays['vectors'], arrays['centroids'], arrays['list_offsets'], arrays['list_rows'], config['n_probe'])
+
+    def save_ann_index(self, key, index, config):
+        """
+        Stores the arrays of an IVFIndex built with config (the TF-IDF matrix is stored with save_tfidf),
+        replacing the index of any other build configuration under the same key.
+        """
+        arrays = {'vectors': index.vectors, 'centroids': index.centroids, 'list_offsets': index.list_offsets, 'list_rows': index.list_rows}
+        name = _ann_name(config)
+        self.save_arrays(key, name, arrays)
+        for path in (self.root / key).glob('ann_index-*'):
+            if path.name != name:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def load_collaborative(self, key):
+        """
+        Returns the cached ItemItemRecommender (memory-mapped), or None if it isn't cached.
+        """
+        cached = self.load_arrays(key, 'collaborative')
+        if cached is None:
+            return None
+        arrays, metadata = cached
+        item_vectors = sp.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=tuple(metadata['shape']))
+        return ItemItemRecommender(item_vectors, TopKSimilarityIndex(arrays['neighbors'], arrays['scores']))
+
+    def save_collaborative(self, key, recommender):
+        """
+        Stores the games x users matrix (CSR arrays) and the neighbor index of an ItemItemRecommender.
+        """
+        item_vectors = recommender.item_vectors
+        arrays = {'data': item_vectors.data, 'indices': item_vectors.indices, 'indptr': item_vectors.indptr,
+                  'neighbors': recommender.index.neighbors, 'scores': recommender.index.scores}
+        self.save_arrays(key, 'collaborative', arrays, {'shape': list(item_vectors.shape)})
@@ -0,0 +1,276 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+from config import COLLABORATIVE_TOP_K, COLLABORATIVE_BLOCK_SIZE, COLLABORATIVE_WORKERS
+from datasets.aggregates import _GameRows, _UserCodes
+from datasets.shared_data import shared_memory_directory, share_array
+from datasets.similarity import TopKSimilarityIndex, top_k_from_sparse_block
+
+
+class ItemItemRecommender:
+    """
+    Item-item collaborative filtering model built from the playtime of the users (implicit feedback): two
+    games are similar when the same users play them, regardless of their genres or specs.
+
+    Each game is represented by its vector of log playtimes over the users, and the similarity of two games
+    is the cosine of their vectors. The top-k most similar games of each game are precomputed, with
+    the same layout as the content-based index.
+
+    Attributes:
+    -----------
+    item_vectors : csr_matrix (float32, shape N x users)
+        L2-normalized log(1 + minutes played) of each game (rows in df2 order) by each user. Games nobody
+        played have an empty row
+    index : TopKSimilarityIndex
+        Most similar games of each game. Games co-played with fewer than k games have their remaining
+        neighbors set to -1, with a score of 0
+    """
+
+    def __init__(self, item_vectors, index):
+        self.item_vectors = item_vectors
+        self.index = index
+
+    def __len__(self):
+        return self.item_vectors.shape[0]
+
+    @property
+    def k(self):
+        return self.index.k
+
+    @property
+    def nbytes(self):
+        return self.item_vectors.data.nbytes + self.item_vectors.indices.nbytes + self.item_vectors.indptr.nbytes + self.index.nbytes
+
+    def most_similar(self, idx, n=5):
+        """
+        Returns the row positions and scores of the (at most) n games most played by the same users as the
+        game at row idx. Fewer than n are returned if fewer games share players with it.
+        """
+        neighbors, scores = self.index.most_similar(idx, n)
+        found = neighbors >= 0
+        return neighbors[found], scores[found]
+
+    def scores(self, idx, rows):
+        """Returns the collaborative similarity of the game at row idx with each of the games at rows."""
+        return (self.item_vectors[rows] @ self.item_vectors[idx].T).toarray().ravel()
+
+
+class UserLibraries:
+    """
+    Games played by each user, from the user playtime statistics (user_items only has the games with
+    playtime > 0), as a sparse users x games matrix: the library of a user is a row slice, with no scan of
+    the table.
+
+    Attributes:
+    -----------
+    playtime : csr_matrix (float64, shape users x N)
+        Minutes played by each user of each game (columns in df2 order)
+    user_ids : Index
+        Id of the user of each row
+    """
+
+    def __init__(self, playtime, user_ids):
+        self.playtime = playtime
+        self.user_ids = user_ids
+
+    def __len__(self):
+        return self.playtime.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.playtime.data.nbytes + self.playtime.indices.nbytes + self.playtime.indptr.nbytes
+
+    def row(self, user_id):
+        """Returns the row of the user, raising a ValueError if the user has no played games."""
+        row = self.user_ids.get_indexer([user_id])[0]
+        if row < 0 or self.playtime.indptr[row] == self.playtime.indptr[row + 1]:
+            raise ValueError(f"The user '{user_id}' has no played games in the dataset")
+        return row
+
+    def weights(self):
+        """
+        Returns the playtimes dampened with a log, log(1 + minutes played), so a few very long sessions don't
+        dominate the similarity of a game or the taste of a user.
+        """
+        weights = self.playtime.copy()
+        weights.data = np.log1p(weights.data)
+        return weights
+
+
+def build_user_libraries(ids, batches):
+    """
+    Builds the UserLibraries of the games of df2 from the user playtime statistics, batch by batch (only the
+    (user, game row, playtime) triplets are kept, not the batches).
+
+    Parameters:
+    -----------
+    ids : Series
+        Ids of the games, in df2 order (df2['id'])
+    batches : iterable of DataFrame
+        Batches of the user playtime statistics (with the item_id, user_id and playtime_forever columns).
+        Game and user ids encoded with shared categories are used through their codes directly
+
+    Returns:
+    --------
+    UserLibraries
+    """
+    game_rows, users = _GameRows(ids), _UserCodes()
+    rows, user_codes, playtime = [], [], []
+    for batch in batches:
+        batch_rows, batch_users = game_rows.rows(batch['item_id']), users.codes(batch['user_id'])
+        # Only games of df2 (and known users) can be recommended
+        found = np.flatnonzero((batch_rows >= 0) & (batch_users >= 0) & (batch['playtime_forever'].to_numpy() > 0))
+        rows.append(batch_rows[found])
+        user_codes.append(batch_users[found])
+        playtime.append(batch['playtime_forever'].to_numpy()[found])
+
+    shape = (len(users.categories), len(ids))
+    if not rows:
+        return UserLibraries(sp.csr_matrix(shape, dtype=np.float64), users.categories)
+    # Playtimes of the same (user, game) are summed
+    matrix = sp.csr_matrix((np.concatenate(playtime), (np.concatenate(user_codes), np.concatenate(rows))), shape=shape)
+    matrix.sum_duplicates()
+    return UserLibraries(matrix, users.categories)
+
+
+def build_item_vectors(libraries):
+    """
+    Returns the games x users matrix of log playtimes, L2-normalized per game (float32, CSR, rows in df2 order).
+    """
+    return normalize(libraries.weights().T.tocsr()).astype(np.float32)
+
+
+# Shared item / user vectors and output arrays of a collaborative worker process (see _init_collaborative_worker)
+_worker_arrays = {}
+
+def _init_collaborative_worker(directory, shape):
+    # Runs once in each worker process: maps the games x users matrix, its transpose (read only) and the output
+    # arrays (written in place by the blocks) from the shared memory directory
+    arrays = {path.stem: np.load(path, mmap_mode='r+' if path.stem in ('neighbors', 'scores') else 'r') for path in Path(directory).glob('*.npy')}
+    _worker_arrays['item_vectors'] = sp.csr_matrix((arrays['item_data'], arrays['item_indices'], arrays['item_indptr']), shape=shape)
+    _worker_arrays['user_vectors'] = sp.csr_matrix((arrays['user_data'], arrays['user_indices'], arrays['user_indptr']), shape=shape[::-1])
+    _worker_arrays['neighbors'], _worker_arrays['scores'] = arrays['neighbors'], arrays['scores']
+
+def _collaborative_block(start, end, k):
+    # Computes the top-k of the games start:end in a worker process, into the shared output arrays
+    block_scores = _worker_arrays['item_vectors'][start:end] @ _worker_arrays['user_vectors']
+    _worker_arrays['neighbors'][start:end], _worker_arrays['scores'][start:end] = top_k_from_sparse_block(block_scores, np.arange(start, end), k)
+
+def _build_item_similarity_index_parallel(item_vectors, user_vectors, k, block_size, workers):
+    """
+    Same as build_item_similarity_index, with the blocks of games computed by a pool of worker processes (as
+    _build_topk_index_parallel): the item / user vectors and the neighbor / score arrays are memory-mapped
+    from shared memory by all the processes, so neither the input nor the results are copied between them.
+    """
+    n_games = item_vectors.shape[0]
+    with shared_memory_directory('steam_api-collaborative-') as directory:
+        for prefix, matrix in (('item', item_vectors), ('user', user_vectors)):
+            for name in ('data', 'indices', 'indptr'):
+                share_array(directory, f'{prefix}_{name}', getattr(matrix, name))
+        neighbors = share_array(directory, 'neighbors', shape=(n_games, k), dtype=np.int32)
+        scores = share_array(directory, 'scores', shape=(n_games, k), dtype=np.float32)
+
+        # Worker processes are spawned (not forked), as the API process runs other threads
+        starts = list(range(0, n_games, block_size))
+        with ProcessPoolExecutor(max_workers=min(workers, len(starts)), mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_collaborative_worker, initargs=(str(directory), item_vectors.shape)) as pool:
+            list(pool.map(_collaborative_block, starts, [min(start + block_size, n_games) for start in starts], [k] * len(starts)))
+        return TopKSimilarityIndex(np.array(neighbors), np.array(scores))
+
+def build_item_similarity_index(item_vectors, k=COLLABORATIVE_TOP_K, block_size=COLLABORATIVE_BLOCK_SIZE,
+                                workers=COLLABORATIVE_WORKERS):
+    """
+    Builds the top-k index of the collaborative similarities, as blocked sparse matrix products.
+
+    Each block of games is multiplied with the transposed matrix (a sparse block: only the games that share
+    players are stored, so memory doesn't grow with block_size x N) and its top-k is selected. The blocks
+    are independent: with several workers, they are computed by a pool of processes over shared memory (the
+    sparse products hold the GIL, so threads wouldn't run them in parallel).
+
+    Parameters:
+    -----------
+    item_vectors : csr_matrix
+        L2-normalized games x users matrix (see build_item_vectors)
+    k : int
+        Number of neighbors to keep per game
+    block_size : int
+        Number of games whose similarities are computed at once
+    workers : int
+        Number of processes computing blocks (0: one per CPU, 1: in this process)
+
+    Returns:
+    --------
+    TopKSimilarityIndex
+    """
+    n_games = item_vectors.shape[0]
+    k = min(k, n_games - 1)
+    item_vectors = sp.csr_matrix(item_vectors)
+    user_vectors = item_vectors.T.tocsr()
+    workers = workers or os.cpu_count()
+    if workers > 1 and n_games > block_size:
+        return _build_item_similarity_index_parallel(item_vectors, user_vectors, k, block_size, workers)
+
+    neighbors = np.empty((n_games, k), dtype=np.int32)
+    scores = np.empty((n_games, k), dtype=np.float32)
+    for start in range(0, n_games, block_size):
+        end = min(start + block_size, n_games)
+        neighbors[start:end], scores[start:end] = top_k_from_sparse_block(item_vectors[start:end] @ user_vectors, np.arange(start, end), k)
+    return TopKSimilarityIndex(neighbors, scores)
+
+
+def build_item_item_recommender(libraries, k=COLLABORATIVE_TOP_K, block_size=COLLABORATIVE_BLOCK_SIZE,
+                                workers=COLLABORATIVE_WORKERS):
+    """
+    Builds the ItemItemRecommender of the games of df2 from the UserLibraries (see build_item_similarity_index
+    for the parameters).
+    """
+    item_vectors = build_item_vectors(libraries)
+    return ItemItemRecommender(item_vectors, build_item_similarity_index(item_vectors, k, block_size, workers))
+
+
+def hybrid_most_similar(recommender, tfidf_matrix, content_neighbors, idx, n=5, content_weight=0.5):
+    """
+    Returns the n games most similar to the game at row idx by a blend of the collaborative and content
+    similarities: (1 - content_weight) x collaborative + content_weight x content.
+
+    The candidates are the collaborative neighbors plus the given content neighbors of the game, and both
+    scores are computed exactly for all of them, so a game that is close on both counts ranks first even
+    if it is only among the neighbors of one of them.
+
+    Parameters:
+    -----------
+    recommender : ItemItemRecommender
+        Collaborative model
+    tfidf_matrix : sparse matrix
+        L2-normalized TF-IDF vectors of the games (content model)
+    content_neighbors : ndarray of int
+        Row positions of the content-based neighbors of the game
+    idx : int
+        Row position of the game in df2
+    n : int
+        Number of games to return
+    content_weight : float
+        Weight of the content similarity, between 0 (collaborative only) and 1 (content only)
+
+    Returns:
+    --------
+    tuple
+        (ndarray of row positions, ndarray of blended scores), at most n, games with a blended score of 0 left out
+    """
+    if not 0 <= content_weight <= 1:
+        raise ValueError(f"content_weight must be between 0 and 1, got {content_weight}")
+    collaborative_neighbors, _ = recommender.most_similar(idx, recommender.k)
+    candidates = np.union1d(collaborative_neighbors, content_neighbors).astype(np.int64)
+    candidates = candidates[candidates != idx]
+
+    content_scores = (tfidf_matrix[candidates] @ tfidf_matrix[idx].T).toarray().ravel()
+    scores = (1 - content_weight) * recommender.scores(idx, candidates) + content_weight * content_scores
+
+    # Descending score, ties by row position (as the neighbor indexes)
+    order = np.lexsort((candidates, -scores))[:n]
+    order = order[scores[order] > 0]
+    return candidates[order], scores[order]
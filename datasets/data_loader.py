@@ -1,73 +1,760 @@
+import copy
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
 import pandas as pd
+import sklearn
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from config import PARQUET_FILES
+from config import (PARQUET_FILES, TABLE_SCHEMAS, MODEL_CACHE_ENABLED, SIMILARITY_TOP_K, SHARED_DATA_ATTACH_DIR, COMPACT_STORAGE,
+                    USER_ITEMS_STREAMING, USER_ITEMS_BATCH_SIZE, RECOMMENDER_INCREMENTAL, RECOMMENDER_REFIT_DRIFT,
+                    RECOMMENDATION_MODE, ANN_INDEX, COLLABORATIVE_TOP_K, DATA_LOAD_WORKERS)
+import scipy.sparse as sp
+from datasets.similarity import build_topk_index, update_topk_index
+from datasets.ann import build_ann_index
+from datasets.collaborative import build_user_libraries, build_item_item_recommender
+from datasets.user_recommendations import build_user_recommender
+from datasets.search import build_search_index
+from datasets.artifact_cache import ArtifactCache, artifact_key
+from datasets.shared_data import shared_data_loaders
+from datasets.aggregates import build_playtime_aggregates, build_playtime_aggregates_streaming, build_review_rollups, build_sentiment_index
+from datasets.encoding import encode_column, decoded, build_multi_hot, parse_year
+from datasets.parquet_reader import parquet_files, read_parquet_table, iter_parquet_batches
+from utils.helpers import logger
+
+########################################################################################################
+# Loaders of the tables and derived models. Each one receives the registry, so it can ask for the
+# other tables / models it depends on (which are then loaded on demand as well)
+########################################################################################################
+
+# Schema dtypes of the key columns shared by several tables, and the registry entry with their categories
+_SHARED_KEYS = {'game_id': 'game_ids', 'user_id': 'user_ids'}
+
+def _read_table(data, name):
+    """
+    Reads the table with the columns, dtypes and row filters declared in TABLE_SCHEMAS. Only those columns
+    are read, and the filters are applied while reading (row groups that can't match are skipped).
+
+    In compact storage mode, 'category' columns are dictionary-encoded (integer codes plus the distinct
+    values), and 'game_id' / 'user_id' columns are encoded with the ids shared by all the tables, so joins
+    between tables compare integer codes. Otherwise they are read as strings.
+    """
+    schema = TABLE_SCHEMAS[name]
+    # Encoded columns are read as Parquet dictionaries, so each distinct string is materialized once
+    df = read_parquet_table(PARQUET_FILES[name], list(schema['columns']), schema['filters'],
+                            dictionary_columns=_encoded_columns(schema['columns']))
+    return _apply_schema(data, df, schema['columns'], schema.get('years', {}))
+
+def _iter_table(data, name, columns=None, batch_size=USER_ITEMS_BATCH_SIZE):
+    """
+    Same as _read_table, but yields the table in DataFrames of at most batch_size rows (optionally with only
+    some of the columns of the schema), so the whole table is never in memory at once.
+    """
+    schema = TABLE_SCHEMAS[name]
+    dtypes = {column: dtype for column, dtype in schema['columns'].items() if columns is None or column in columns}
+    years = {column: source for column, source in schema.get('years', {}).items() if source[0] in dtypes}
+    # Shared ids are read as strings and looked up in the (hashed) shared categories: the Parquet dictionary
+    # of a batch can be as large as all the ids, and re-encoding it for every batch would cost more
+    dictionary_columns = [column for column in _encoded_columns(dtypes) if dtypes[column] not in _SHARED_KEYS]
+    for df in iter_parquet_batches(PARQUET_FILES[name], list(dtypes), schema['filters'],
+                                   dictionary_columns=dictionary_columns, batch_size=batch_size):
+        yield _apply_schema(data, df, dtypes, years)
+
+def _encoded_columns(dtypes):
+    return [column for column, dtype in dtypes.items() if dtype == 'category' or dtype in _SHARED_KEYS] if COMPACT_STORAGE else []
+
+def _apply_schema(data, df, dtypes, years=None):
+    encoded = _encoded_columns(dtypes)
+    for column, dtype in dtypes.items():
+        if column in encoded:
+            df[column] = encode_column(df[column], data.get(_SHARED_KEYS[dtype]) if dtype in _SHARED_KEYS else None)
+        elif dtype != 'category' and dtype not in _SHARED_KEYS:
+            df[column] = df[column].astype(dtype)
+    # Normalization: dates are parsed once here, with their explicit format, into compact year columns, so
+    # neither the aggregates nor the endpoints parse or match date strings
+    for column, (source, date_format) in (years or {}).items():
+        df[column] = parse_year(df[source], date_format)
+    return df
+
+def _shared_key_dtype(key_dtype):
+    # Categorical dtype with the sorted distinct values of all the columns of the given key dtype, in all
+    # the tables. The columns are read as Parquet dictionaries (an int32 index per row plus each distinct
+    # value once), and only their distinct values are kept (a missing input is skipped, its table can't
+    # be loaded anyway)
+    values = []
+    for name, schema in TABLE_SCHEMAS.items():
+        columns = [column for column, dtype in schema['columns'].items() if dtype == key_dtype]
+        if columns and parquet_files(PARQUET_FILES[name]):
+            df = read_parquet_table(PARQUET_FILES[name], columns, dictionary_columns=columns)
+            values += [pd.Series(df[column].cat.categories) for column in columns]
+    return pd.CategoricalDtype(pd.Index(pd.concat(values).unique() if values else [], dtype='str').sort_values())
+
+def _load_game_ids(data):
+    # Game ids shared by df1.item_id, df2.id and df3.item_id, so joins between them compare integer codes
+    return _shared_key_dtype('game_id')
+
+def _load_user_ids(data):
+    # User ids shared by df1.user_id and df3.user_id
+    return _shared_key_dtype('user_id')
+
+def _load_user_reviews(data):
+    # Load user reviews data
+    return _read_table(data, 'user_reviews')
+
+def _load_steam_games(data):
+    # Load game information data
+    return _read_table(data, 'steam_games')
+
+def _load_user_items(data):
+    # Load user playtime statistics with filtering to reduce memory usage
+    # Only records where users have played the game (playtime > 0) are read, see TABLE_SCHEMAS
+    return _read_table(data, 'user_items')
+
+def _CombFeatures(df2):
+    """
+    Creates a combined feature representation of games by concatenating multiple attributes.
+
+    Returns:
+    --------
+    Series
+        Combined text features for each game
+    """
+    total_rows = len(df2)
+    start_row = 0
+    # We're using the full dataset now, but keeping the structure for potential future partitioning
+    end_row = total_rows - 1  # Previously divided by 10 (//10) for memory constraints
+
+    df = pd.DataFrame()
+    # Combine relevant features into a single text representation
+    df['combined_features'] = decoded(df2['genres']) + ' ' + decoded(df2['specs']) + ' ' + decoded(df2['developer']) + ' ' + decoded(df2['id'])
+    return df.loc[start_row:end_row, 'combined_features']
+
+# Parameters of the TF-IDF vectorizer of the recommendation model
+TFIDF_PARAMS = {}
+
+def _recommender_cache_key(data):
+    # The recommender artifacts depend on the games Parquet file(s) and on how features / model are built
+    feature_config = {'features': "genres + specs + developer + id", 'tfidf_params': TFIDF_PARAMS,
+                      'top_k': SIMILARITY_TOP_K, 'sklearn': sklearn.__version__, 'schema': TABLE_SCHEMAS['steam_games']}
+    return artifact_key(parquet_files(PARQUET_FILES['steam_games']), feature_config)
+
+def _build_catalog_changes(data):
+    # For each game of df2, its row position in the df2 of the previous snapshot if its features didn't
+    # change (-1 if it's new or changed), so the recommender can be updated instead of rebuilt. None if
+    # there is no previous snapshot (e.g. when the API starts). df2 is always asked for, so the changes are
+    # computed again whenever df2 changes
+    df2, previous_df2 = data.df2, data.previous('df2')
+    if previous_df2 is None or previous_df2 is df2:
+        return None
+    previous_features = _CombFeatures(previous_df2)
+    previous_rows = pd.Series(np.arange(len(previous_features)), index=previous_features.to_numpy())
+    previous_rows = previous_rows[~previous_rows.index.duplicated()]
+    rows = previous_rows.reindex(_CombFeatures(df2).to_numpy()).fillna(-1).to_numpy(dtype=np.int64, copy=True)
+    # A repeated game is matched once, the other copies are treated as new
+    rows[pd.Series(rows).duplicated().to_numpy() & (rows >= 0)] = -1
+    return rows
+
+def _update_tfidf(previous, previous_rows, features):
+    """
+    Updates the TF-IDF matrix of the previous catalog: the rows of the unchanged games are kept, and only
+    the new / changed games are transformed with the existing vocabulary and idf weights (terms that are
+    not in the vocabulary are ignored until the next full fit). Returns None when the rows updated since
+    the last full fit exceed RECOMMENDER_REFIT_DRIFT of the catalog, so the vectorizer is fit again.
+    """
+    tfidf_vectorizer, tfidf_matrix = previous
+    kept, changed = np.flatnonzero(previous_rows >= 0), np.flatnonzero(previous_rows < 0)
+    # Added / changed games plus removed ones
+    updated_rows = getattr(tfidf_vectorizer, 'n_updated_rows_', 0) + len(changed) + (tfidf_matrix.shape[0] - len(kept))
+    fit_rows = getattr(tfidf_vectorizer, 'n_fit_rows_', tfidf_matrix.shape[0])
+    if updated_rows > RECOMMENDER_REFIT_DRIFT * fit_rows:
+        return None
+
+    # Stack the kept rows and the transformed ones, then put them in the order of the current catalog
+    stacked = sp.vstack([tfidf_matrix[previous_rows[kept]], tfidf_vectorizer.transform(features.iloc[changed])], format='csr')
+    order = np.empty(len(previous_rows), dtype=np.int64)
+    order[kept], order[changed] = np.arange(len(kept)), len(kept) + np.arange(len(changed))
+
+    # Same vocabulary (shared, read only), with its own drift counters
+    tfidf_vectorizer = copy.copy(tfidf_vectorizer)
+    tfidf_vectorizer.n_fit_rows_, tfidf_vectorizer.n_updated_rows_ = fit_rows, updated_rows
+    return tfidf_vectorizer, stacked[order]
+
+def _build_tfidf(data):
+    # Reuse the vectorizer and TF-IDF matrix of a previous start if the input hasn't changed
+    if MODEL_CACHE_ENABLED:
+        cached = ArtifactCache().load_tfidf(data.recommender_cache_key)
+        if cached is not None:
+            return cached
+
+    # When the games change while the API runs, transform only the new / changed games (O(changed)) with
+    # the vectorizer of the previous snapshot, unless the catalog drifted too much from its fit
+    updated = None
+    if RECOMMENDER_INCREMENTAL and data.previous('tfidf') is not None and data.catalog_changes is not None:
+        updated = _update_tfidf(data.previous('tfidf'), data.catalog_changes, _CombFeatures(data.df2))
+    if updated is not None:
+        tfidf_vectorizer, tfidf_matrix = updated
+    else:
+        # Initialize TF-IDF vectorizer and transform the combined features
+        # Note: We're using the dynamically generated features from CombFeatures()
+        # rather than a pre-existing column in df2
+        tfidf_vectorizer = TfidfVectorizer(**TFIDF_PARAMS)
+        tfidf_matrix = tfidf_vectorizer.fit_transform(_CombFeatures(data.df2))
+        tfidf_vectorizer.n_fit_rows_, tfidf_vectorizer.n_updated_rows_ = tfidf_matrix.shape[0], 0
+
+    if MODEL_CACHE_ENABLED:
+        ArtifactCache().save_tfidf(data.recommender_cache_key, tfidf_vectorizer, tfidf_matrix, TFIDF_PARAMS)
+    return tfidf_vectorizer, tfidf_matrix
+
+def _build_similarity_index(data):
+    # Reuse (memory-mapped) the neighbor index of a previous start if the input hasn't changed
+    if MODEL_CACHE_ENABLED:
+        cached = ArtifactCache().load_similarity_index(data.recommender_cache_key)
+        if cached is not None:
+            return cached
+
+    tfidf_vectorizer, tfidf_matrix = data.tfidf
+    previous_tfidf, previous_index = data.previous('tfidf'), data.previous('cosine_sim')
+    if (previous_index is not None and previous_tfidf is not None and data.catalog_changes is not None
+            and tfidf_vectorizer.vocabulary_ is previous_tfidf[0].vocabulary_):
+        # The TF-IDF matrix was updated with the same vocabulary: only the neighbor lists affected by the
+        # new / changed / removed games are updated, O(changed x N) instead of O(N^2)
+        index = update_topk_index(previous_index, tfidf_matrix, data.catalog_changes)
+    else:
+        # Calculate cosine similarity between all game pairs, keeping only the top-k neighbors of each game.
+        # The similarities are computed in blocks of rows over the sparse TF-IDF matrix, so the full
+        # N x N matrix is never materialized
+        index = build_topk_index(tfidf_matrix)
+
+    if MODEL_CACHE_ENABLED:
+        ArtifactCache().save_similarity_index(data.recommender_cache_key, index)
+    return index
+
+def _build_ann_index(data):
+    # Approximate neighbor index of the games, for catalogs too large for the exact top-k index. Reused
+    # (memory-mapped) from a previous start if the input and the ANN build configuration haven't changed (n_probe
+    # only applies to the queries)
+    _, tfidf_matrix = data.tfidf
+    if MODEL_CACHE_ENABLED:
+        cached = ArtifactCache().load_ann_index(data.recommender_cache_key, tfidf_matrix, ANN_INDEX)
+        if cached is not None:
+            return cached
+
+    index = build_ann_index(tfidf_matrix, ANN_INDEX)
+
+    if MODEL_CACHE_ENABLED:
+        ArtifactCache().save_ann_index(data.recommender_cache_key, index, ANN_INDEX)
+    return index
+
+def _build_user_libraries(data):
+    # Games played by each user, as a users x games playtime matrix, so the library of a user is a row slice.
+    # In streaming mode, it's built batch by batch instead of loading df3
+    if USER_ITEMS_STREAMING:
+        batches = _iter_table(data, 'user_items', columns=['user_id', 'item_id', 'playtime_forever'])
+    else:
+        batches = [data.df3]
+    return build_user_libraries(data.df2['id'], batches)
+
+def _build_user_recommender(data):
+    # Recommendations per user from the content-based neighbors of the games of the user
+    return build_user_recommender(data.user_libraries, data.cosine_sim)
+
+def _build_user_recommender_collaborative(data):
+    # Recommendations per user from the collaborative neighbors of the games of the user
+    return build_user_recommender(data.user_libraries, data.collaborative.index)
+
+def _collaborative_cache_key(data):
+    # The collaborative model depends on the user playtime and games Parquet file(s) and on how it is built
+    model_config = {'weights': "log1p(playtime_forever), L2-normalized per game", 'top_k': COLLABORATIVE_TOP_K,
+                    'schema': {name: TABLE_SCHEMAS[name] for name in ('user_items', 'steam_games')}}
+    return artifact_key(parquet_files(PARQUET_FILES['user_items']) + parquet_files(PARQUET_FILES['steam_games']), model_config)
+
+def _build_collaborative(data):
+    # Item-item collaborative model (games played by the same users). Reused (memory-mapped) from a
+    # previous start if the input hasn't changed
+    if MODEL_CACHE_ENABLED:
+        cached = ArtifactCache().load_collaborative(data.collaborative_cache_key)
+        if cached is not None:
+            return cached
+
+    recommender = build_item_item_recommender(data.user_libraries)
+
+    if MODEL_CACHE_ENABLED:
+        ArtifactCache().save_collaborative(data.collaborative_cache_key, recommender)
+    return recommender
+
+def _build_game_rows(data):
+    # Hash index from game id to its row position in df2 (first occurrence if an id were repeated),
+    # so looking up a game doesn't scan the whole 'id' column
+    game_rows = pd.Series(np.arange(len(data.df2)), index=decoded(data.df2['id']))
+    return game_rows[~game_rows.index.duplicated()]
+
+def _build_genre_matrix(data):
+    # Genres of each game as a sparse games x genres 0/1 matrix (rows in df2 order)
+    return build_multi_hot(data.df2['genres'])
+
+def _build_spec_matrix(data):
+    # Specs of each game as a sparse games x specs 0/1 matrix (rows in df2 order)
+    return build_multi_hot(data.df2['specs'])
+
+def _build_search_index(data):
+    # Inverted / prefix index of the game names, developers and genres, for the search endpoint and the
+    # case insensitive, fuzzy name lookups of the other endpoints
+    return build_search_index(data.df2, data.genre_matrix)
+
+def _build_playtime_aggregates(data):
+    # Playtime per genre and release year (and per user), built once so the genre endpoints are lookups.
+    # In streaming mode, user_items is folded into the aggregates batch by batch instead of loading df3
+    if USER_ITEMS_STREAMING:
+        batches = _iter_table(data, 'user_items', columns=['user_id', 'item_id', 'playtime_forever'])
+        return build_playtime_aggregates_streaming(data.df2, batches, data.genre_matrix)
+    return build_playtime_aggregates(data.df2, data.df3, data.genre_matrix)
+
+def _build_review_rollups(data):
+    # Good / bad review counts per posting year, ranked once so the review endpoints are lookups
+    return build_review_rollups(data.df1, data.df2)
+
+def _build_sentiment_index(data):
+    # Review counts per developer and sentiment, so sentiment_analysis doesn't join df1 with df2 per request
+    return build_sentiment_index(data.df1, data.df2)
+
+# Name under which each table / model is available in the registry, and the function that builds it
+_LOADERS = {
+    'game_ids': _load_game_ids,
+    'user_ids': _load_user_ids,
+    'df1': _load_user_reviews,
+    'df2': _load_steam_games,
+    'df3': _load_user_items,
+    'recommender_cache_key': _recommender_cache_key,
+    'catalog_changes': _build_catalog_changes,
+    'tfidf': _build_tfidf,
+    'cosine_sim': _build_similarity_index,
+    'ann_index': _build_ann_index,
+    'collaborative_cache_key': _collaborative_cache_key,
+    'collaborative': _build_collaborative,
+    'user_libraries': _build_user_libraries,
+    'user_recommender': _build_user_recommender,
+    'user_recommender_collaborative': _build_user_recommender_collaborative,
+    'game_rows': _build_game_rows,
+    'genre_matrix': _build_genre_matrix,
+    'spec_matrix': _build_spec_matrix,
+    'playtime_aggregates': _build_playtime_aggregates,
+    'review_rollups': _build_review_rollups,
+    'sentiment_index': _build_sentiment_index,
+    'search_index': _build_search_index,
+}
+
+# Tables / models that warm_up doesn't load: they are only loaded if accessed. In streaming mode no
+# aggregate needs the whole user_items table in memory, and only the neighbor index of the configured
+# recommendation mode is built up front (per-user recommendations need the exact index)
+_ON_DEMAND = (({'df3'} if USER_ITEMS_STREAMING else set())
+              | ({'cosine_sim', 'user_recommender'} if RECOMMENDATION_MODE == 'approximate' else {'ann_index'}))
+
+# Input tables (PARQUET_FILES) each loader reads directly from disk. The other dependencies of a loader
+# (tables / models it asks the registry for) are recorded while it runs
+_TABLE_SOURCES = {
+    'game_ids': {name for name, schema in TABLE_SCHEMAS.items() if 'game_id' in schema['columns'].values()},
+    'user_ids': {name for name, schema in TABLE_SCHEMAS.items() if 'user_id' in schema['columns'].values()},
+    'df1': {'user_reviews'},
+    'df2': {'steam_games'},
+    'df3': {'user_items'},
+    'recommender_cache_key': {'steam_games'},
+    'playtime_aggregates': {'user_items'},
+    'collaborative_cache_key': {'user_items', 'steam_games'},
+    'user_libraries': {'user_items'},
+}
+
+# Tables / models each loader asks the registry for, declared so warm_up can run the loads as a pipeline:
+# a stage starts as soon as the stages it depends on are loaded, and independent stages (e.g. the three
+# Parquet reads, or the aggregates and the recommender index) run at the same time. Only used to schedule
+# the loads: a dependency missing here is still loaded on demand (and recorded) when the loader asks for it
+_STAGE_DEPENDENCIES = {
+    'df1': {'game_ids', 'user_ids'},
+    'df2': {'game_ids'},
+    'df3': {'game_ids', 'user_ids'},
+    'catalog_changes': {'df2'},
+    'tfidf': {'recommender_cache_key', 'catalog_changes', 'df2'},
+    'cosine_sim': {'recommender_cache_key', 'catalog_changes', 'tfidf'},
+    'ann_index': {'recommender_cache_key', 'tfidf'},
+    'collaborative': {'collaborative_cache_key', 'user_libraries'},
+    'user_libraries': {'game_ids', 'user_ids', 'df2'} | ({'df3'} if not USER_ITEMS_STREAMING else set()),
+    'user_recommender': {'user_libraries', 'cosine_sim'},
+    'user_recommender_collaborative': {'user_libraries', 'collaborative'},
+    'game_rows': {'df2'},
+    'genre_matrix': {'df2'},
+    'spec_matrix': {'df2'},
+    'playtime_aggregates': {'game_ids', 'user_ids', 'df2', 'genre_matrix'} | ({'df3'} if not USER_ITEMS_STREAMING else set()),
+    'review_rollups': {'df1', 'df2'},
+    'sentiment_index': {'df1', 'df2'},
+    'search_index': {'df2', 'genre_matrix'},
+}
+
+
+def _table_versions():
+    """
+    Returns a short identifier of the current version of each input table, based on the path, size and
+    modification time of its Parquet files (a missing input is part of the version too).
+    """
+    versions = {}
+    for name, path in sorted(PARQUET_FILES.items()):
+        files = parquet_files(path)
+        stats = [] if files else [(None, None)]
+        for file in files:
+            try:
+                stat = os.stat(file)
+                stats.append((str(file), stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                stats.append((str(file), None, None))
+        versions[name] = hashlib.sha1(repr(stats).encode('utf-8')).hexdigest()[:12]
+    return versions
+
+def _dataset_version(table_versions=None):
+    """
+    Returns a short identifier of the current version of the input Parquet files (of all the tables).
+    """
+    table_versions = table_versions if table_versions is not None else _table_versions()
+    return hashlib.sha1(repr(sorted(table_versions.items())).encode('utf-8')).hexdigest()[:12]
+
+def _same_value(previous, value):
+    # Rebuilt values that are cheap to compare and equal to the previous ones (e.g. the shared game ids
+    # when only the playtimes changed) keep the previous object, so what was built from them is reused too
+    if isinstance(previous, pd.CategoricalDtype) and isinstance(value, pd.CategoricalDtype):
+        return previous.categories.equals(value.categories)
+    return isinstance(previous, str) and previous == value
+
+
+# Per-thread bookkeeping of the loads in progress, used to time each loader separately and to record
+# the tables / models each one depends on
+_load_stack = threading.local()
+
+
+class DataRegistry:
+    """
+    Lazy registry of the tables and derived models used by the API.
+
+    Each table / model is loaded the first time it is accessed (e.g. registry.df2 or registry.get('df2'))
+    and kept in memory afterwards. Loading is thread safe: concurrent requests for the same name wait
+    for a single load, while unrelated names can load in parallel.
+
+    A registry is a snapshot of one version of the input files: the version attribute identifies them
+    (e.g. to invalidate cached responses when the data changes), and table_versions identifies the files
+    of each table. A registry created with the previous snapshot reuses the tables / models of it that
+    don't depend (directly or through other tables / models) on a table whose files changed, and only
+    rebuilds the rest. Names in on_demand are skipped by warm_up.
+
+    warm_up loads the tables / models as a pipeline of stages, running the independent ones in parallel
+    (see stage_dependencies), and keeps a report of it in pipeline.
+    """
+
+    def __init__(self, loaders=_LOADERS, version=None, on_demand=_ON_DEMAND, sources=_TABLE_SOURCES,
+                 table_versions=None, previous=None, stage_dependencies=_STAGE_DEPENDENCIES):
+        self._loaders = loaders
+        self._on_demand = on_demand
+        self._sources = sources
+        self._stage_dependencies = stage_dependencies
+        self._values = {}
+        self._dependencies = {}
+        self._locks = {name: threading.Lock() for name in loaders}
+        self.table_versions = table_versions if table_versions is not None else _table_versions()
+        self.version = version if version is not None else _dataset_version(self.table_versions)
+        self._previous = previous
+        # Tables whose files changed since the previous snapshot, and names taken from it without rebuilding
+        self.changed_tables = ({name for name, version in self.table_versions.items() if previous.table_versions.get(name) != version}
+                               if previous is not None else set(self.table_versions))
+        self.reused = set()
+        # Seconds spent loading each table / model: 'seconds' excludes the time spent loading (or waiting
+        # for another thread loading) its dependencies, 'total_seconds' includes it. 'start' and 'end' are
+        # seconds since the registry was created, and 'thread' the thread that loaded it
+        self.timings = {}
+        self._created = time.perf_counter()
+        # Report of the last warm_up: workers, wall time, and summed loading time of its stages
+        self.pipeline = {}
+
+    def get(self, name):
+        """
+        Returns the table / model registered under name, loading it first if needed.
+        """
+        if name not in self._values:
+            if name not in self._loaders:
+                raise KeyError(f"'{name}' is not a table or model of the data registry")
+
+            waiting = time.perf_counter()
+            with self._locks[name]:
+                # Another thread may have loaded it while this one was waiting for the lock
+                if name not in self._values:
+                    self._values[name] = self._timed_load(name)
+                    waiting = None
+            # Time spent waiting for another thread's load counts as loading a dependency
+            frames = getattr(_load_stack, 'frames', None)
+            if waiting is not None and frames:
+                frames[-1]['dependencies_seconds'] += time.perf_counter() - waiting
+
+        # The table / model being loaded by this thread (if any) depends on this one
+        frames = getattr(_load_stack, 'frames', None)
+        if frames:
+            frames[-1]['dependencies'].add(name)
+        return self._values[name]
+
+    def _timed_load(self, name):
+        # Each thread keeps a stack with the dependencies (and the time spent loading them) of the loads in progress
+        frames = _load_stack.__dict__.setdefault('frames', [])
+        frame = {'dependencies': set(), 'dependencies_seconds': 0.0}
+        frames.append(frame)
+        start = time.perf_counter()
+        try:
+            return self._reuse_or_load(name)
+        finally:
+            total = time.perf_counter() - start
+            frames.pop()
+            if frames:
+                frames[-1]['dependencies_seconds'] += total
+            self._dependencies[name] = frame['dependencies']
+            self.timings[name] = {'seconds': round(total - frame['dependencies_seconds'], 4), 'total_seconds': round(total, 4),
+                                  'start': round(start - self._created, 4), 'end': round(start + total - self._created, 4),
+                                  'thread': threading.current_thread().name}
+
+    def _reuse_or_load(self, name):
+        previous = self._previous
+        if previous is None or not previous.is_loaded(name):
+            return self._loaders[name](self)
+
+        # Reuse the previous table / model if none of its input files changed and all its dependencies are
+        # still the same objects (they are checked, and rebuilt if needed, first)
+        if (not self._sources.get(name, set()) & self.changed_tables
+                and all(self.get(dependency) is previous._values.get(dependency) for dependency in previous._dependencies.get(name, ()))):
+            self.reused.add(name)
+            return previous._values[name]
+
+        value = self._loaders[name](self)
+        if _same_value(previous._values[name], value):
+            self.reused.add(name)
+            return previous._values[name]
+        return value
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self.get(name)
+        except KeyError as e:
+            raise AttributeError(name) from e
+
+    def is_loaded(self, name):
+        return name in self._values
+
+    def loaded_objects(self):
+        """Returns a dictionary with the tables / models loaded so far."""
+        return dict(self._values)
+
+    def warm_up(self, names=None, workers=DATA_LOAD_WORKERS):
+        """
+        Loads the given tables / models (all of them but the on demand ones by default), so later accesses
+        don't pay the cost.
+
+        The loads run as a pipeline on a pool of threads: each one is started once the names it depends on
+        (among the given ones, see stage_dependencies) are loaded, so independent loads overlap (Parquet
+        reads and NumPy / SciPy builds release the GIL). The first error is raised once the loads in
+        progress finish.
+
+        Parameters:
+        -----------
+        names : list of str, optional
+            Tables / models to load
+        workers : int
+            Number of threads loading at once (0: one per CPU, 1: one after the other)
+        """
+        names = list(names or [name for name in self._loaders if name not in self._on_demand])
+        workers = workers or os.cpu_count()
+        start = time.perf_counter()
+        if workers <= 1:
+            for name in names:
+                self.get(name)
+        else:
+            remaining = {name: set(self._stage_dependencies.get(name, ())) & set(names) for name in names}
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="data-load") as pool:
+                running = {}
+                while remaining or running:
+                    # Start the stages whose dependencies are loaded
+                    for name in [name for name, dependencies in remaining.items() if not dependencies]:
+                        del remaining[name]
+                        running[pool.submit(self.get, name)] = name
+                    if not running:
+                        raise ValueError(f"Circular stage dependencies between {sorted(remaining)}")
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        loaded = running.pop(future)
+                        future.result()
+                        for dependencies in remaining.values():
+                            dependencies.discard(loaded)
+
+        self.pipeline = {'workers': workers, 'stages': len(names), 'wall_seconds': round(time.perf_counter() - start, 4),
+                         'stage_seconds': round(sum(self.timings[name]['seconds'] for name in names if name in self.timings), 4)}
+
+    def previous(self, name):
+        """
+        Returns the table / model of the previous snapshot while this one is being built (e.g. to update a
+        model instead of rebuilding it), or None if there is none or it wasn't loaded.
+        """
+        previous = self._previous
+        return previous._values.get(name) if previous is not None else None
+
+    def release_previous(self):
+        """
+        Drops the reference to the previous snapshot (once this one is built), so its memory is freed when
+        the requests still reading from it finish.
+        """
+        self._previous = None
+
+
+# Registry shared by the whole process. Nothing is read from disk until a table / model is accessed.
+# Worker processes launched in shared memory mode attach to the tables / models published by the
+# loader process instead of loading their own copies
+if SHARED_DATA_ATTACH_DIR:
+    registry = DataRegistry({**_LOADERS, **shared_data_loaders(SHARED_DATA_ATTACH_DIR)})
+else:
+    registry = DataRegistry()
+
+
+class DataReloader:
+    """
+    Reloads the data without restarting the API: builds a new snapshot (registry) of the tables whose
+    Parquet files changed, in the background, and then publishes it with an atomic swap. Requests in
+    flight finish on the snapshot they started with, new requests read from the new one.
+
+    A reload can be triggered explicitly (e.g. from an admin endpoint) or by watching the modification
+    time of the files. Only one reload runs at a time, and a failed reload keeps the current snapshot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()  # Held for the whole build of a snapshot
+        self._thread_lock = threading.Lock()  # Guards the background thread only, so trigger never waits on a build
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = {'reloads': 0, 'last_reload': None, 'last_error': None}
+
+    def reload(self):
+        """
+        Builds and publishes a new snapshot if the input files changed since the current one.
+
+        Returns:
+        --------
+        bool
+            True if a new snapshot was published, False if the files didn't change
+        """
+        global registry
+        if SHARED_DATA_ATTACH_DIR:
+            raise RuntimeError("Workers attached to shared data can't reload it, restart the API to reload the data")
+
+        with self._lock:
+            current = registry
+            table_versions = _table_versions()
+            if table_versions == current.table_versions:
+                return False
+
+            start = time.perf_counter()
+            try:
+                # Build everything the current snapshot has loaded (plus what warm_up loads), including the
+                # recommender index, before publishing it
+                snapshot = DataRegistry(table_versions=table_versions, previous=current)
+                snapshot.warm_up([name for name in _LOADERS if name not in _ON_DEMAND or current.is_loaded(name)])
+                snapshot.release_previous()
+            except Exception as e:
+                self._stats['last_error'] = f"{type(e).__name__}: {e}"
+                raise
+
+            registry = snapshot  # Atomic swap: get_data() returns the new snapshot from now on
+            self._stats['reloads'] += 1
+            self._stats['last_error'] = None
+            self._stats['last_reload'] = {'time': time.time(), 'seconds': round(time.perf_counter() - start, 4),
+                                          'version': snapshot.version, 'changed_tables': sorted(snapshot.changed_tables),
+                                          'rebuilt': sorted(name for name in snapshot.loaded_objects() if name not in snapshot.reused)}
+            return True
+
+    def _reload_logged(self):
+        try:
+            self.reload()
+        except Exception:
+            logger.exception("Data reload failed, the current data is kept")
+
+    def trigger(self):
+        """
+        Starts a reload in a background thread, unless one is already running.
+
+        Returns:
+        --------
+        bool
+            True if a reload was started
+        """
+        with self._thread_lock:
+            # A reload is running in the background, or in the foreground (reload / watch) holding the build lock
+            if (self._thread is not None and self._thread.is_alive()) or self._lock.locked():
+                return False
+            self._thread = threading.Thread(target=self._reload_logged, name="data-reload", daemon=True)
+            self._thread.start()
+            return True
+
+    def watch(self, interval):
+        """
+        Checks the modification time of the input files every interval seconds in a background thread,
+        and reloads the data when they change (until stop is called).
+        """
+        def _watch():
+            while not self._stop.wait(interval):
+                if _dataset_version() != registry.version:
+                    self._reload_logged()
+        self._stop.clear()
+        threading.Thread(target=_watch, name="data-watch", daemon=True).start()
+
+    def stop(self):
+        """Stops watching the input files."""
+        self._stop.set()
+
+    def stats(self):
+        """
+        Returns the version of the current snapshot, whether a reload is running, the number of reloads
+        and the details of the last one (tables changed and tables / models rebuilt), and the last error.
+        """
+        return {'version': registry.version, 'reloading': self._lock.locked(), **self._stats}
+
+
+# Reloader of the registry shared by the whole process
+reloader = DataReloader()
+
+def get_data():
+    """
+    Returns the data registry the endpoints read from.
+    """
+    return registry
 
 def _load_data():
     """
     Loads and processes Steam game data from Parquet files and builds a recommendation model.
-    
+
     This function:
     1. Loads three datasets: user reviews, game information, and user playtime statistics
     2. Applies filtering to optimize memory usage
-    3. Builds a game recommendation model using TF-IDF and cosine similarity
-    
+    3. Builds a game recommendation model using TF-IDF and a top-k cosine similarity index
+
+    The tables and the model are loaded as a pipeline (see DataRegistry.warm_up): the three Parquet files
+    are read at the same time, and the model is built as soon as the games are loaded. The time spent in
+    each phase (each table / model) is available afterwards in registry.timings, and the pipeline report
+    in registry.pipeline.
+
     Returns:
     --------
     tuple
         df1 (DataFrame): User reviews data
         df2 (DataFrame): Game information data
         df3 (DataFrame): User playtime statistics (filtered)
-        cosine_sim (ndarray): Cosine similarity matrix for game recommendations
+        cosine_sim (TopKSimilarityIndex): Top-k cosine similarity neighbors for game recommendations
     """
-    # Load user reviews data
-    df1 = pd.read_parquet(PARQUET_FILES['user_reviews'])
+    registry.warm_up(['df1', 'df2', 'df3', 'cosine_sim'])
+    return registry.df1, registry.df2, registry.df3, registry.cosine_sim
 
-    # Load game information data
-    df2 = pd.read_parquet(PARQUET_FILES['steam_games'])
-
-    # Load user playtime statistics with filtering to reduce memory usage
-    # Only include records where users have played the game (playtime > 0)
-    filters = [('playtime_forever', '>', 0)]
-    columns_to_keep = ['item_id', 'item_name', 'playtime_forever', 'user_id']
-    df3 = pd.read_parquet(PARQUET_FILES['user_items'],
-                        columns=columns_to_keep, filters=filters)
-
-    ########################################################################################################
-    # Build game recommendation model
-    ########################################################################################################
-    
-    def _CombFeatures():
-        """
-        Creates a combined feature representation of games by concatenating multiple attributes.
-                
-        Returns:
-        --------
-        Series
-            Combined text features for each game
-        """
-        total_rows = len(df2)
-        start_row = 0 
-        # We're using the full dataset now, but keeping the structure for potential future partitioning
-        end_row = total_rows - 1  # Previously divided by 10 (//10) for memory constraints
-        
-        df = pd.DataFrame()
-        # Combine relevant features into a single text representation
-        df['combined_features'] = df2['genres'] + ' ' + df2['specs'] + ' ' + df2['developer'] + ' ' + df2['id']
-        return df.loc[start_row:end_row, 'combined_features']
-
-    # Initialize TF-IDF vectorizer and transform the combined features
-    # Note: We're using the dynamically generated features from CombFeatures()
-    # rather than a pre-existing column in df2
-    tfidf_vectorizer = TfidfVectorizer()
-    tfidf_matrix = tfidf_vectorizer.fit_transform(_CombFeatures())
-
-    # Calculate cosine similarity between all game pairs
-    # This creates a square matrix where each element [i,j] represents 
-    # the similarity between game i and game j
-    cosine_sim = cosine_similarity(tfidf_matrix, tfidf_matrix)
-
-    return df1, df2, df3, cosine_sim
-
-# Make the loaded data available at module level for importing by other modules
-df1, df2, df3, cosine_sim = _load_data()
\ No newline at end of file
+def __getattr__(name):
+    # Keep 'from datasets.data_loader import df1, df2, df3, cosine_sim' (and the derived models) working
+    # for existing importers. The table / model is loaded from the registry on first access
+    if name in _LOADERS:
+        return registry.get(name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
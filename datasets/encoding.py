@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+def encode_column(series, categories=None):
+    """
+    Returns the column dictionary-encoded (pandas 'category' dtype: one integer code per row plus the
+    distinct values). Categories are sorted, so ordering and tie-breaking by the column stay the same
+    as with the strings.
+
+    Parameters:
+    -----------
+    series : Series
+        Column to encode (strings or already categorical, e.g. read as a Parquet dictionary)
+    categories : Index or CategoricalDtype, optional
+        Categories to encode with. Columns encoded with the same categories share their codes, so
+        joins between them compare integers. Values not in categories become missing. Passing the same
+        CategoricalDtype object for all of them also makes their dtypes compare equal without
+        comparing the categories
+
+    Returns:
+    --------
+    Series
+        Categorical column
+    """
+    if categories is None:
+        # Sort the distinct values themselves (not the dictionary order of an already categorical column)
+        values = series.cat.remove_unused_categories().cat.categories if isinstance(series.dtype, pd.CategoricalDtype) else series.dropna().unique()
+        categories = pd.Index(values).sort_values()
+    dtype = categories if isinstance(categories, pd.CategoricalDtype) else pd.CategoricalDtype(categories)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Only the dictionary is compared, and the codes are remapped with a take. (astype can't be used:
+        # unordered dtypes with the same categories in another order compare equal, and it would keep the codes)
+        codes = series.cat.set_categories(dtype.categories).cat.codes.to_numpy()
+        return pd.Series(pd.Categorical.from_codes(codes, dtype=dtype), index=series.index, name=series.name)
+    # Strings are looked up in the hash table of the categories
+    return series.astype(dtype)
+
+
+def decoded(series):
+    """Returns the column with its values (e.g. the strings) instead of categorical codes."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(series.cat.categories.dtype)
+    return series
+
+
+def map_values(series, func):
+    """
+    Applies func (which takes and returns a Series) to the values of the column. When the column is
+    dictionary-encoded, func only runs on the distinct values, and the result is taken by code.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return func(series)
+    mapped = func(pd.Series(series.cat.categories))
+    codes = series.cat.codes.to_numpy()
+    # Missing values (code -1) take the missing value of the result dtype
+    result = mapped.take(np.where(codes >= 0, codes, 0)).where(codes >= 0)
+    return pd.Series(result.array, index=series.index, name=series.name)
+
+
+def parse_year(series, format):
+    """
+    Returns the year of the dates of the column, parsed with an explicit strptime format (a vectorized parse,
+    instead of inferring the format value by value). Values that are missing or don't match the format are
+    missing in the result. Each distinct value is parsed once.
+
+    Parameters:
+    -----------
+    series : Series
+        Dates as text (strings or dictionary-encoded)
+    format : str
+        strptime format of the dates, e.g. '%Y-%m-%d'
+
+    Returns:
+    --------
+    Series
+        Years, as nullable 16-bit integers ('Int16')
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    return map_values(series, lambda dates: pd.to_datetime(dates, format=format, errors='coerce').dt.year.astype('Int16'))
+
+
+class MultiHot:
+    """
+    Set-valued column (e.g. genres "Action, Indie") stored as a sparse rows x tokens 0/1 matrix
+    instead of one string or list per row.
+
+    Attributes:
+    -----------
+    matrix : csr_matrix
+        matrix[row, token] is 1 if the row has the token
+    vocabulary : Index
+        Tokens, sorted, in column order
+    """
+
+    def __init__(self, matrix, vocabulary):
+        self.matrix = matrix
+        self.vocabulary = vocabulary
+
+    def rows_with(self, token):
+        """Returns the positions of the rows that have the token (empty if the token is unknown)."""
+        if token not in self.vocabulary:
+            return np.array([], dtype=np.int64)
+        return self.matrix[:, self.vocabulary.get_loc(token)].nonzero()[0]
+
+    def pairs(self):
+        """Returns the (row positions, token codes) of all the row / token pairs, ordered by row."""
+        matrix = self.matrix.tocoo()
+        return matrix.row.astype(np.int64), matrix.col.astype(np.int64)
+
+    def tokens(self, row):
+        """Returns the tokens of the row."""
+        return self.vocabulary[self.matrix.indices[self.matrix.indptr[row]:self.matrix.indptr[row + 1]]].tolist()
+
+
+def build_multi_hot(series, separator=', '):
+    """
+    Builds the MultiHot structure of a column of separated tokens. The string splitting only runs on
+    the distinct values of the column, which are much fewer than the rows.
+
+    Parameters:
+    -----------
+    series : Series
+        Column of strings such as "Action, Indie" (strings or categorical). Missing values have no tokens
+    separator : str
+        Separator of the tokens
+
+    Returns:
+    --------
+    MultiHot
+        rows x tokens 0/1 matrix and the vocabulary of tokens
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, values = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, values = pd.factorize(series)
+        values = pd.Index(values)
+
+    # values x tokens matrix, built from the split distinct values
+    tokens = pd.Series(values, dtype=object).str.split(separator).explode()
+    tokens = tokens[tokens.notna() & (tokens != '')]
+    vocabulary = pd.Index(tokens.unique()).sort_values()
+    by_value = sp.csr_matrix((np.ones(len(tokens), dtype=np.int8), (tokens.index.to_numpy(), vocabulary.get_indexer(tokens))),
+                             shape=(len(values), len(vocabulary)))
+    by_value.sum_duplicates()
+    by_value.data[:] = 1  # A token repeated in a value counts once
+
+    # rows x tokens matrix: a row take of the values x tokens matrix. Missing values (code -1) get an empty row
+    present = codes >= 0
+    selector = sp.csr_matrix((np.ones(present.sum(), dtype=np.int8), (np.flatnonzero(present), codes[present])),
+                             shape=(len(codes), len(values)))
+    matrix = (selector @ by_value).tocsr()
+    matrix.sort_indices()
+    return MultiHot(matrix, vocabulary)
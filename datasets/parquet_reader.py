@@ -0,0 +1,92 @@
+from pathlib import Path
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+def parquet_files(path):
+    """
+    Returns the Parquet files of an input: the file itself, or all the .parquet files under a directory
+    (multi-file or partitioned input), sorted. A missing input has no files.
+    """
+    path = Path(path)
+    if path.is_dir():
+        return sorted(path.rglob('*.parquet'))
+    return [path] if path.exists() else []
+
+
+def parquet_dataset(path, dictionary_columns=()):
+    """
+    Returns a pyarrow dataset over a Parquet file or a directory of Parquet files. Directories may be
+    partitioned Hive style (e.g. user_items/part=0/file.parquet), the partition keys become columns.
+
+    Parameters:
+    -----------
+    path : str or Path
+        Parquet file or directory
+    dictionary_columns : list of str
+        String columns read as dictionaries (integer codes plus distinct values) instead of one string per row
+
+    Returns:
+    --------
+    pyarrow.dataset.Dataset
+    """
+    file_format = ds.ParquetFileFormat(read_options=ds.ParquetReadOptions(dictionary_columns=list(dictionary_columns)))
+    return ds.dataset(path, format=file_format, partitioning='hive')
+
+
+def read_parquet_table(path, columns, filters=None, dictionary_columns=()):
+    """
+    Reads a Parquet file or directory into a DataFrame with projection and predicate pushdown: only the
+    given columns are decoded, and rows are filtered while reading. Row groups whose statistics (min / max)
+    can't match the filters are skipped without being read.
+
+    Parameters:
+    -----------
+    path : str or Path
+        Parquet file or directory
+    columns : list of str
+        Columns to read
+    filters : list of tuple, optional
+        Row filters in the pandas / pyarrow format, e.g. [('playtime_forever', '>', 0)]
+    dictionary_columns : list of str
+        String columns read as dictionaries (returned as pandas categoricals)
+
+    Returns:
+    --------
+    DataFrame
+    """
+    dataset = parquet_dataset(path, [column for column in dictionary_columns if column in columns])
+    table = dataset.to_table(columns=list(columns), filter=pq.filters_to_expression(filters) if filters else None)
+    return table.to_pandas()
+
+
+def iter_parquet_batches(path, columns, filters=None, dictionary_columns=(), batch_size=65536):
+    """
+    Reads a Parquet file or directory as a stream of DataFrames of at most batch_size rows, with the same
+    projection and predicate pushdown as read_parquet_table. Row groups are decoded one at a time, so
+    memory is bounded by the size of a row group / batch instead of the size of the table.
+
+    Parameters:
+    -----------
+    path : str or Path
+        Parquet file or directory
+    columns : list of str
+        Columns to read
+    filters : list of tuple, optional
+        Row filters in the pandas / pyarrow format, e.g. [('playtime_forever', '>', 0)]
+    dictionary_columns : list of str
+        String columns read as dictionaries (returned as pandas categoricals)
+    batch_size : int
+        Maximum number of rows per DataFrame
+
+    Yields:
+    -------
+    DataFrame
+    """
+    dataset = parquet_dataset(path, [column for column in dictionary_columns if column in columns])
+    # No read-ahead of batches / files: only the batch being processed is kept in memory
+    batches = dataset.to_batches(columns=list(columns), filter=pq.filters_to_expression(filters) if filters else None,
+                                 batch_size=batch_size, batch_readahead=0, fragment_readahead=0)
+    for batch in batches:
+        if batch.num_rows:
+            yield batch.to_pandas()
@@ -0,0 +1,332 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+import numpy as np
+import pandas as pd
+from config import SEARCH_FUZZY_THRESHOLD
+from datasets.encoding import decoded
+
+# Kinds of match of a search result, best first
+MATCH_TYPES = ('exact', 'prefix', 'token', 'fuzzy')
+
+# Larger than any character, so keys[searchsorted(prefix):searchsorted(prefix + _MAX_CHAR)] start with prefix
+_MAX_CHAR = '\U0010ffff'
+
+_SEPARATORS = re.compile(r'[\W_]+')
+
+# Entries sharing the most trigrams with a misspelled query that are compared with it character by character,
+# if they share at least this Dice coefficient of trigrams (names with a few typos share far more)
+_FUZZY_CANDIDATES = 5
+_FUZZY_MIN_DICE = 0.3
+
+
+def normalize_text(text):
+    """
+    Returns the search key of a text: lower case (casefold), without accents, and with the punctuation
+    replaced by single spaces, so "Half-Life²" and "half life 2" have the same key.
+    """
+    text = ''.join(char for char in unicodedata.normalize('NFKD', str(text)) if not unicodedata.combining(char))
+    return _SEPARATORS.sub(' ', text.casefold()).strip()
+
+
+def _trigrams(key):
+    # Character trigrams of the words of a key (padded with spaces, so word starts and ends count)
+    padded = f' {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _unique_counts(values):
+    # Distinct values (sorted) and their counts, with a sort (faster than np.unique on large integer arrays)
+    values = np.sort(values)
+    starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1]))) if len(values) else np.empty(0, dtype=np.int64)
+    return values[starts], np.diff(np.append(starts, len(values)))
+
+
+def _postings(entry_terms):
+    """
+    Builds an inverted index from the terms of each entry: the sorted vocabulary of terms, and the entries
+    of each term, concatenated in vocabulary order, so the entries of a range of terms (e.g. all the terms
+    with a prefix) are a single slice.
+
+    Returns:
+    --------
+    tuple
+        (vocabulary ndarray of str, indptr ndarray of int64, entries ndarray of int32): the entries of
+        vocabulary[t] are entries[indptr[t]:indptr[t + 1]], sorted
+    """
+    entry_terms = list(entry_terms)
+    terms = [term for terms in entry_terms for term in terms]
+    entries = np.repeat(np.arange(len(entry_terms), dtype=np.int64), [len(terms) for terms in entry_terms])
+    # Terms are hashed to codes, and only the distinct terms are sorted (as strings). The (term, entry) pairs
+    # are then sorted and deduplicated as integers
+    codes, vocabulary = pd.factorize(pd.Series(terms, dtype=object))
+    vocabulary = np.asarray(vocabulary, dtype=str)
+    order = np.argsort(vocabulary, kind='stable')
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.arange(len(order))
+    pairs, _ = _unique_counts(ranks[codes] * max(len(entry_terms), 1) + entries)
+    counts = np.bincount(pairs // max(len(entry_terms), 1), minlength=len(order))
+    indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    return vocabulary[order], indptr, (pairs % max(len(entry_terms), 1)).astype(np.int32)
+
+
+def _prefix_range(sorted_values, prefix):
+    # Positions [start, end) of the sorted values that start with prefix
+    return (int(np.searchsorted(sorted_values, prefix, 'left')),
+            int(np.searchsorted(sorted_values, prefix + _MAX_CHAR, 'left')))
+
+
+class FieldIndex:
+    """
+    Search index of the names of one field (e.g. the game names), for autocomplete and fuzzy lookups.
+
+    Entries are sorted by their normalized key, so the names equal to or starting with the query are a
+    contiguous range, found with a binary search. Words starting with each word of the query are found in
+    a sorted vocabulary of words the same way, and their entries are a single slice of the postings. Names
+    with typos are found by their shared character trigrams, and ranked by their edit similarity (ratio of
+    matching characters) with the query.
+
+    Attributes:
+    -----------
+    names : ndarray (object)
+        Name of each entry, as in the dataset, in key order
+    keys : ndarray (str)
+        Normalized key of each entry (see normalize_text), sorted
+    rows : ndarray (int64)
+        Row (e.g. in df2) of each entry, or its position in the values the index was built from
+    """
+
+    def __init__(self, names, rows=None):
+        names = pd.Series(names, dtype=object)
+        rows = np.arange(len(names), dtype=np.int64) if rows is None else np.asarray(rows, dtype=np.int64)
+        keys = names.map(normalize_text).to_numpy(dtype=str)
+        # Entries with an empty key (e.g. only punctuation) can't be searched
+        order = np.lexsort((rows, keys))
+        order = order[keys[order] != '']
+        self.names, self.keys, self.rows = names.to_numpy()[order], keys[order], rows[order]
+
+        self.words, self._word_indptr, self._word_entries = _postings(key.split() for key in self.keys)
+        trigrams = [_trigrams(key) for key in self.keys]
+        self.trigrams, self._trigram_indptr, self._trigram_entries = _postings(trigrams)
+        self._trigram_counts = np.array([len(entry) for entry in trigrams], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.keys, self.rows, self.words, self._word_indptr, self._word_entries, self.trigrams,
+                                              self._trigram_indptr, self._trigram_entries, self._trigram_counts))
+
+    def search(self, query, n=10, fuzzy_threshold=SEARCH_FUZZY_THRESHOLD, fuzzy=True):
+        """
+        Returns the (at most) n best entries for the query: names equal to it, then names starting with it,
+        then names with a word starting with each of its words, each group in key order. Only if there is
+        no such name, the names similar to it (typos), most similar first.
+
+        Parameters:
+        -----------
+        query : str
+            Text to search (any case, accents or punctuation)
+        n : int
+            Maximum number of entries
+        fuzzy_threshold : float
+            Minimum edit similarity (between 0 and 1) of the similar names
+        fuzzy : bool
+            Whether similar names are searched when there is no other match
+
+        Returns:
+        --------
+        tuple
+            (ndarray of entry positions, ndarray of match types, positions in MATCH_TYPES), best first
+        """
+        key = normalize_text(query)
+        if not key or n <= 0 or not len(self):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int8)
+
+        # Exact and prefix matches: a range of the sorted keys
+        start, end = _prefix_range(self.keys, key)
+        exact_end = int(np.searchsorted(self.keys, key, 'right'))
+        entries = [np.arange(start, min(exact_end, start + n))]
+        entries.append(np.arange(exact_end, min(end, exact_end + n - len(entries[0]))))
+        found = sum(len(part) for part in entries)
+
+        # Word prefix matches: entries with a word starting with each word of the query
+        if found < n:
+            matches = np.ones(len(self), dtype=bool)
+            for word in key.split():
+                word_start, word_end = _prefix_range(self.words, word)
+                has_word = np.zeros(len(self), dtype=bool)
+                has_word[self._word_entries[self._word_indptr[word_start]:self._word_indptr[word_end]]] = True
+                matches &= has_word
+            matches[start:end] = False
+            entries.append(np.flatnonzero(matches)[:n - found])
+            found += len(entries[-1])
+
+        # Similar names (typos)
+        if found == 0 and fuzzy:
+            entries.append(self.similar(key, fuzzy_threshold)[0][:n])
+
+        match_types = np.repeat(np.arange(len(entries), dtype=np.int8), [len(part) for part in entries])
+        return np.concatenate(entries).astype(np.int64), match_types
+
+    def similar(self, key, threshold=SEARCH_FUZZY_THRESHOLD):
+        """
+        Returns the entries whose key is similar to the normalized key (edit similarity of at least threshold),
+        most similar first. The candidates are the entries sharing the most character trigrams with the key
+        (Dice coefficient), so only a few keys are compared character by character.
+
+        Returns:
+        --------
+        tuple
+            (ndarray of entry positions, ndarray of edit similarities)
+        """
+        trigrams = np.array(sorted(_trigrams(key)), dtype=str)
+        positions = np.searchsorted(self.trigrams, trigrams)
+        positions = positions[(positions < len(self.trigrams)) & (self.trigrams[np.minimum(positions, len(self.trigrams) - 1)] == trigrams)]
+        # Entries sharing trigrams with the key, and how many (the cost depends on the postings, not on N)
+        candidates, shared = _unique_counts(np.concatenate([self._trigram_entries[self._trigram_indptr[t]:self._trigram_indptr[t + 1]]
+                                                            for t in positions] + [np.empty(0, dtype=np.int32)]))
+        dice = 2 * shared / (len(trigrams) + self._trigram_counts[candidates])
+        candidates, dice = candidates[dice >= _FUZZY_MIN_DICE], dice[dice >= _FUZZY_MIN_DICE]
+        if len(candidates) > _FUZZY_CANDIDATES:
+            candidates = np.sort(candidates[np.argpartition(-dice, _FUZZY_CANDIDATES - 1)[:_FUZZY_CANDIDATES]])
+
+        # Keys too short or too long to reach the threshold are not compared (2 x shorter / total length is
+        # an upper bound of the similarity). The matcher indexes the characters of the query once
+        lengths = np.char.str_len(self.keys[candidates])
+        candidates = candidates[2 * np.minimum(lengths, len(key)) >= threshold * (lengths + len(key))]
+        matcher = SequenceMatcher(None, b=key)
+        ratios = np.empty(len(candidates))
+        for i, candidate in enumerate(candidates):
+            matcher.set_seq1(self.keys[candidate])
+            ratios[i] = matcher.ratio()
+        found = ratios >= threshold
+        candidates, ratios = candidates[found], ratios[found]
+        order = np.lexsort((candidates, -ratios))
+        return candidates[order], ratios[order]
+
+    def find(self, value):
+        """Returns the position of the entry whose name is exactly value, or None if there is none."""
+        start, end = self._key_range(normalize_text(value))
+        exact = np.flatnonzero(self.names[start:end] == value)
+        return start + int(exact[0]) if len(exact) else None
+
+    def resolve(self, value, fuzzy_threshold=SEARCH_FUZZY_THRESHOLD, accept=None):
+        """
+        Returns the position of the entry a name refers to: the entry with exactly that name, or else the
+        first entry with the same key (case, accents and punctuation are ignored), or else the most similar
+        one if its edit similarity reaches fuzzy_threshold. None if there is no such entry.
+
+        If accept is given (a function of the name of an entry), only the entries it accepts are returned,
+        e.g. the names the caller has data for.
+        """
+        key = normalize_text(value)
+        if not key or not len(self):
+            return None
+        exact = self.find(value)
+        if exact is not None and (accept is None or accept(self.names[exact])):
+            return exact
+        start, end = self._key_range(key)
+        for position in range(start, end):
+            if accept is None or accept(self.names[position]):
+                return position
+        similar, _ = self.similar(key, fuzzy_threshold)
+        for position in similar:
+            if accept is None or accept(self.names[position]):
+                return int(position)
+        return None
+
+    def _key_range(self, key):
+        # Positions [start, end) of the entries with the key
+        return int(np.searchsorted(self.keys, key, 'left')), int(np.searchsorted(self.keys, key, 'right'))
+
+
+class SearchIndex:
+    """
+    In-memory search index of the games (app_name), developers and genres of df2, built once so the
+    search endpoint and the name lookups of the other endpoints don't scan the catalog.
+
+    Attributes:
+    -----------
+    fields : dict
+        FieldIndex of each field: 'game' (one entry per game, with its row in df2), 'developer' and 'genre'
+        (one entry per distinct value)
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    @property
+    def nbytes(self):
+        return sum(field.nbytes for field in self.fields.values())
+
+    def _field(self, field):
+        if field not in self.fields:
+            raise ValueError(f"Unknown search field '{field}', expected one of {list(self.fields)}")
+        return self.fields[field]
+
+    def search(self, query, n=10, fields=None):
+        """
+        Searches the query in the given fields (all by default), and returns the n best matches: by match
+        type first (see FieldIndex.search), then in the given order of the fields. Similar names (typos)
+        are only searched when no field has another match.
+
+        Returns:
+        --------
+        list of tuple
+            (field, match type, name, row) of each match, where row is the row of the game in df2 for the
+            'game' field (None for the others)
+        """
+        fields = list(self.fields) if fields is None else fields
+        matches = {field: self._field(field).search(query, n, fuzzy=False) for field in fields}
+        key = normalize_text(query)
+        if key and not any(len(entries) for entries, _ in matches.values()):
+            matches = {field: (similar[:n], np.full(len(similar[:n]), MATCH_TYPES.index('fuzzy'), dtype=np.int8))
+                       for field, (similar, _) in ((field, self.fields[field].similar(key)) for field in fields)}
+
+        results = []
+        for order, (field, (entries, match_types)) in enumerate(matches.items()):
+            index = self.fields[field]
+            results += [(match_type, order, position, field, index.names[entry], int(index.rows[entry]) if field == 'game' else None)
+                        for position, (entry, match_type) in enumerate(zip(entries, match_types))]
+        results.sort(key=lambda result: result[:3])
+        return [(field, MATCH_TYPES[match_type], name, row) for match_type, _, _, field, name, row in results[:n]]
+
+    def contains(self, field, value):
+        """Returns whether value is exactly one of the names of the field."""
+        return self._field(field).find(value) is not None
+
+    def resolve(self, field, value, accept=None):
+        """
+        Returns the name (or for 'game', the row in df2) a possibly misspelled name of the field refers to
+        (see FieldIndex.resolve, and accept there), or None if no name is close enough.
+        """
+        index = self._field(field)
+        entry = index.resolve(value, accept=accept)
+        if entry is None:
+            return None
+        return int(index.rows[entry]) if field == 'game' else index.names[entry]
+
+
+def build_search_index(df2, genres):
+    """
+    Builds the SearchIndex of the games, developers and genres.
+
+    Parameters:
+    -----------
+    df2 : DataFrame
+        Game information data (with the 'app_name' and 'developer' columns)
+    genres : MultiHot
+        Genres of each game (only its vocabulary is indexed)
+
+    Returns:
+    --------
+    SearchIndex
+    """
+    app_names = decoded(df2['app_name'])
+    games = app_names.notna().to_numpy()
+    developers = decoded(df2['developer']).dropna().unique()
+    return SearchIndex({'game': FieldIndex(app_names[games].to_numpy(), np.flatnonzero(games)),
+                        'developer': FieldIndex(developers),
+                        'genre': FieldIndex(genres.vocabulary.to_numpy())})
@@ -0,0 +1,132 @@
+import contextlib
+import io
+import json
+import mmap
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+import numpy as np
+
+# Buffers are aligned so NumPy / Arrow views over the shared memory are properly aligned
+_ALIGNMENT = 64
+
+
+class _SharedPickler(pickle.Pickler):
+    def reducer_override(self, obj):
+        # Memory-mapped arrays (e.g. from the artifact cache) are pickled as plain arrays, so their data
+        # goes out-of-band into the shared buffers like any other array
+        if isinstance(obj, np.memmap):
+            return np.asarray(obj).__reduce_ex__(5)
+        return NotImplemented
+
+
+def _write_object(directory, name, obj):
+    """
+    Pickles obj with protocol 5. The large data buffers (NumPy arrays, pandas / Arrow columns) are taken
+    out-of-band and written to '<name>.buf', only the small object skeleton goes to '<name>.pkl'.
+    Returns the (offset, size) of each buffer in '<name>.buf'.
+    """
+    buffers = []
+    skeleton = io.BytesIO()
+    _SharedPickler(skeleton, protocol=5, buffer_callback=buffers.append).dump(obj)
+    (directory / f'{name}.pkl').write_bytes(skeleton.getvalue())
+
+    layout = []
+    with open(directory / f'{name}.buf', 'wb') as f:
+        for buffer in buffers:
+            data = buffer.raw()
+            f.write(b'\0' * (-f.tell() % _ALIGNMENT))
+            layout.append((f.tell(), data.nbytes))
+            f.write(data)
+    return layout
+
+
+def publish_shared_data(registry, directory):
+    """
+    Materializes the tables / models loaded in the registry into memory-mappable files in directory
+    (typically under /dev/shm), so worker processes can attach to them without copying.
+
+    Parameters:
+    -----------
+    registry : DataRegistry
+        Registry whose loaded tables / models are published
+    directory : str or Path
+        Directory where the shared files are written
+
+    Returns:
+    --------
+    list
+        Names of the published tables / models
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    manifest = {name: _write_object(directory, name, obj) for name, obj in registry.loaded_objects().items()}
+
+    # The manifest is written last (atomically), it tells the workers the shared data is complete
+    tmp_manifest = directory / 'manifest.json.tmp'
+    tmp_manifest.write_text(json.dumps(manifest), encoding='utf-8')
+    os.replace(tmp_manifest, directory / 'manifest.json')
+    return list(manifest)
+
+
+def _attach_object(directory, name, layout):
+    """
+    Rebuilds a published object whose data buffers are read-only views over the memory-mapped '<name>.buf'.
+    """
+    buffers = []
+    if layout:
+        with open(directory / f'{name}.buf', 'rb') as f:
+            shared_memory = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        buffers = [shared_memory[offset:offset + size] for offset, size in layout]
+    return pickle.loads((directory / f'{name}.pkl').read_bytes(), buffers=buffers)
+
+
+def shared_data_loaders(directory):
+    """
+    Returns registry loaders that attach (zero-copy) to the tables / models published in directory.
+
+    Parameters:
+    -----------
+    directory : str or Path
+        Directory where publish_shared_data wrote the shared files
+
+    Returns:
+    --------
+    dict
+        Loader function for each published table / model name
+    """
+    directory = Path(directory)
+    manifest = json.loads((directory / 'manifest.json').read_text(encoding='utf-8'))
+    return {name: (lambda data, name=name, layout=layout: _attach_object(directory, name, layout))
+            for name, layout in manifest.items()}
+
+
+@contextlib.contextmanager
+def shared_memory_directory(prefix='steam_api-'):
+    """
+    Context manager with a temporary directory in shared memory (/dev/shm, if it exists), where the arrays
+    of a computation split across processes are stored with share_array. The directory is removed on exit.
+    """
+    directory = Path(tempfile.mkdtemp(prefix=prefix, dir='/dev/shm' if os.path.isdir('/dev/shm') else None))
+    try:
+        yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def share_array(directory, name, array=None, shape=None, dtype=None):
+    """
+    Stores array (or a new zero-filled array of the given shape and dtype) as '<name>.npy' in directory, and
+    returns it memory-mapped. Other processes map the same file with np.load(path, mmap_mode='r') (or 'r+'
+    to write their results to it) instead of receiving a pickled copy.
+    """
+    array = None if array is None else np.asarray(array)
+    shared = np.lib.format.open_memmap(Path(directory) / f'{name}.npy', mode='w+',
+                                       dtype=array.dtype if array is not None else dtype,
+                                       shape=array.shape if array is not None else shape)
+    if array is not None:
+        shared[...] = array
+    return shared
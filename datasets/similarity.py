@@ -0,0 +1,384 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import scipy.sparse as sp
+from sklearn.metrics.pairwise import linear_kernel
+from config import SIMILARITY_TOP_K, SIMILARITY_BLOCK_SIZE, SIMILARITY_WORKERS
+from datasets.shared_data import shared_memory_directory, share_array
+
+
+class TopKSimilarityIndex:
+    """
+    Compact nearest-neighbor index that keeps only the top-k most similar games per game.
+
+    Instead of a dense N x N cosine similarity matrix (quadratic memory), the index stores two
+    N x k arrays: the row positions of the k most similar games (self excluded), and their scores,
+    sorted from most to least similar.
+
+    Attributes:
+    -----------
+    neighbors : ndarray (int32, shape N x k)
+        Row positions (in df2) of the most similar games for each game
+    scores : ndarray (float32, shape N x k)
+        Cosine similarity of each neighbor, in descending order
+    """
+
+    def __init__(self, neighbors, scores):
+        self.neighbors = neighbors
+        self.scores = scores
+
+    def __len__(self):
+        return self.neighbors.shape[0]
+
+    @property
+    def shape(self):
+        # Logical shape of the similarity matrix the index stands for
+        return (len(self), len(self))
+
+    @property
+    def k(self):
+        return self.neighbors.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.neighbors.nbytes + self.scores.nbytes
+
+    def most_similar(self, idx, n=5):
+        """
+        Returns the row positions and scores of the n games most similar to the game at row idx.
+
+        Parameters:
+        -----------
+        idx : int
+            Row position of the game in df2
+        n : int
+            Number of neighbors to return (at most k)
+
+        Returns:
+        --------
+        tuple
+            (ndarray of row positions, ndarray of similarity scores)
+        """
+        if n > self.k:
+            raise ValueError(f"Requested {n} neighbors but the index only keeps the top {self.k}")
+        return self.neighbors[idx, :n], self.scores[idx, :n]
+
+    def most_similar_batch(self, rows, n=5):
+        """
+        Returns the row positions and scores of the n games most similar to each of the games at rows,
+        gathered in one vectorized operation.
+
+        Parameters:
+        -----------
+        rows : array-like of int
+            Row positions of the games in df2
+        n : int
+            Number of neighbors to return per game (at most k)
+
+        Returns:
+        --------
+        tuple
+            (ndarray of row positions, ndarray of similarity scores), both of shape len(rows) x n
+        """
+        if n > self.k:
+            raise ValueError(f"Requested {n} neighbors but the index only keeps the top {self.k}")
+        rows = np.asarray(rows)
+        return self.neighbors[rows, :n], self.scores[rows, :n]
+
+    def sparse_matrix(self):
+        """
+        Returns the index as a sparse N x N matrix (float32, CSR) with the scores of the neighbors of each game
+        in its row, so the scores of many games can be aggregated with sparse matrix products.
+        """
+        valid = self.neighbors >= 0
+        indptr = np.concatenate(([0], np.cumsum(valid.sum(axis=1))))
+        return sp.csr_matrix((self.scores[valid], self.neighbors[valid], indptr), shape=self.shape)
+
+    def __getitem__(self, idx):
+        # Backwards compatible access as if this were the dense matrix: cosine_sim[idx] returns a full
+        # similarity row, with zeros for the games that are not among the top-k neighbors
+        row = np.zeros(len(self), dtype=np.float32)
+        row[self.neighbors[idx]] = self.scores[idx]
+        row[idx] = 1.0
+        return row
+
+
+def _top_k_from_block(block_scores, row_positions, k):
+    """
+    Selects the k best scores of each row of a dense block of similarities, excluding self-similarity.
+
+    Ties are broken by row position, so results match a stable descending sort of the full row.
+    """
+    n_rows = block_scores.shape[0]
+
+    # Exclude each game from its own neighbor list
+    block_scores[np.arange(n_rows), row_positions] = -np.inf
+
+    # np.partition finds the k-th best score of each row in O(N), without sorting the whole row
+    kth_best = -np.partition(-block_scores, k - 1, axis=1)[:, k - 1]
+
+    # Keep every candidate scoring at least the k-th best (ties included). np.nonzero returns them
+    # grouped by row with ascending column, then they are ordered by descending score within each row
+    cand_rows, cand_cols = np.nonzero(block_scores >= kth_best[:, None])
+    cand_scores = block_scores[cand_rows, cand_cols]
+    order = np.lexsort((cand_cols, -cand_scores, cand_rows))
+    cand_rows, cand_cols, cand_scores = cand_rows[order], cand_cols[order], cand_scores[order]
+
+    # Take the first k candidates of each row
+    row_starts = np.concatenate(([0], np.cumsum(np.bincount(cand_rows, minlength=n_rows))[:-1]))
+    keep = (np.arange(len(cand_rows)) - row_starts[cand_rows]) < k
+
+    neighbors = cand_cols[keep].reshape(n_rows, k).astype(np.int32)
+    scores = cand_scores[keep].reshape(n_rows, k).astype(np.float32)
+    return neighbors, scores
+
+
+def _row_threshold_mask(values, rows, n_rows, k):
+    """
+    Returns which of the values (grouped by row, rows ascending) can be among the k best of their row: the
+    positive values scoring at least the (k + 1)-th best positive value of the row (self included).
+
+    The threshold of every row is found with a single segmented sort, with no loop over the rows: the
+    (row, float32 score) pairs are packed into uint64 keys (the bits of a positive float32 sort like its
+    value, and are inverted so the best comes first) and sorted, so the (k + 1)-th best of a row is at
+    offset k of its segment. Scores are compared in float32, so a few more values than needed may pass
+    (ties after rounding), but never fewer.
+    """
+    values32 = values.astype(np.float32)
+    positive = values32 > 0
+    counts = np.bincount(rows[positive], minlength=n_rows)
+    keys = (rows[positive].astype(np.uint64) << np.uint64(32)) | (~values32[positive].view(np.uint32)).astype(np.uint64)
+    keys.sort()
+
+    # Rows with at most k + 1 positive values keep all of them (threshold 0)
+    kth_best = np.zeros(n_rows, dtype=np.float32)
+    long_rows = np.flatnonzero(counts > k + 1)
+    kth_keys = keys[(np.cumsum(counts) - counts)[long_rows] + k]
+    kth_best[long_rows] = (~(kth_keys & np.uint64(0xFFFFFFFF)).astype(np.uint32)).view(np.float32)
+    return positive & (values32 >= kth_best[rows])
+
+
+def top_k_from_sparse_block(block_scores, row_positions, k):
+    """
+    Selects the k best scores of each row of a sparse block of scores (only the stored, positive entries are
+    candidates, e.g. the games that share players with a game), excluding the column row_positions[i] of
+    row i (self-similarity; -1 excludes nothing). Ties are broken by column, as in _top_k_from_block, and
+    rows with fewer than k candidates are padded with -1 (and a score of 0).
+    """
+    n_rows = block_scores.shape[0]
+    block_scores = block_scores.tocsr()
+    cand_rows = np.repeat(np.arange(n_rows), np.diff(block_scores.indptr))
+    keep = (block_scores.data > 0) & (block_scores.indices != row_positions[cand_rows])
+    keep &= _row_threshold_mask(block_scores.data, cand_rows, n_rows, k)
+    cand_rows, cand_cols, cand_scores = cand_rows[keep], block_scores.indices[keep], block_scores.data[keep]
+
+    # Order by row, then by descending score and ascending column, and take the first k of each row
+    order = np.lexsort((cand_cols, -cand_scores, cand_rows))
+    cand_rows, cand_cols, cand_scores = cand_rows[order], cand_cols[order], cand_scores[order]
+    row_starts = np.concatenate(([0], np.cumsum(np.bincount(cand_rows, minlength=n_rows))[:-1]))
+    rank = np.arange(len(cand_rows)) - row_starts[cand_rows]
+    keep = rank < k
+
+    neighbors = np.full((n_rows, k), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, k), dtype=np.float32)
+    neighbors[cand_rows[keep], rank[keep]] = cand_cols[keep]
+    scores[cand_rows[keep], rank[keep]] = cand_scores[keep]
+    return neighbors, scores
+
+
+# Shared TF-IDF matrix and output arrays of a similarity worker process (see _init_similarity_worker)
+_worker_arrays = {}
+
+def _init_similarity_worker(directory, shape):
+    # Runs once in each worker process: maps the TF-IDF matrix (read only) and the output arrays (written
+    # in place by the blocks) from the shared memory directory
+    arrays = {name: np.load(Path(directory) / f'{name}.npy', mmap_mode='r+' if name in ('neighbors', 'scores') else 'r')
+              for name in ('data', 'indices', 'indptr', 'neighbors', 'scores')}
+    _worker_arrays['tfidf_matrix'] = sp.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=shape)
+    _worker_arrays['neighbors'], _worker_arrays['scores'] = arrays['neighbors'], arrays['scores']
+
+def _similarity_block(start, end, k):
+    # Computes the top-k of the rows start:end in a worker process, into the shared output arrays
+    tfidf_matrix = _worker_arrays['tfidf_matrix']
+    block_scores = linear_kernel(tfidf_matrix[start:end], tfidf_matrix)
+    _worker_arrays['neighbors'][start:end], _worker_arrays['scores'][start:end] = _top_k_from_block(block_scores, np.arange(start, end), k)
+
+def _build_topk_index_parallel(tfidf_matrix, k, block_size, workers):
+    """
+    Same as build_topk_index, with the blocks of rows computed by a pool of worker processes. The TF-IDF
+    matrix and the neighbor / score arrays are memory-mapped from shared memory by all the processes, so
+    neither the input nor the results are copied between them.
+    """
+    n_games = tfidf_matrix.shape[0]
+    tfidf_matrix = sp.csr_matrix(tfidf_matrix)
+    with shared_memory_directory('steam_api-similarity-') as directory:
+        for name in ('data', 'indices', 'indptr'):
+            share_array(directory, name, getattr(tfidf_matrix, name))
+        neighbors = share_array(directory, 'neighbors', shape=(n_games, k), dtype=np.int32)
+        scores = share_array(directory, 'scores', shape=(n_games, k), dtype=np.float32)
+
+        # Worker processes are spawned (not forked), as the API process runs other threads
+        starts = list(range(0, n_games, block_size))
+        with ProcessPoolExecutor(max_workers=min(workers, len(starts)), mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_similarity_worker, initargs=(str(directory), tfidf_matrix.shape)) as pool:
+            list(pool.map(_similarity_block, starts, [min(start + block_size, n_games) for start in starts], [k] * len(starts)))
+        return TopKSimilarityIndex(np.array(neighbors), np.array(scores))
+
+def build_topk_index(tfidf_matrix, k=SIMILARITY_TOP_K, block_size=SIMILARITY_BLOCK_SIZE, workers=SIMILARITY_WORKERS):
+    """
+    Builds a TopKSimilarityIndex from a sparse TF-IDF matrix, processing it in blocks of rows.
+
+    Only a block_size x N slice of the similarity matrix exists at any time (per worker), so peak memory
+    is bounded by the block size instead of growing quadratically with the number of games. The blocks
+    are independent: with several workers, they are computed by a pool of processes over shared memory.
+
+    Parameters:
+    -----------
+    tfidf_matrix : sparse matrix
+        L2-normalized TF-IDF vectors of the games (one row per game in df2)
+    k : int
+        Number of neighbors to keep per game
+    block_size : int
+        Number of rows whose similarities are computed at once
+    workers : int
+        Number of processes computing blocks (0: one per CPU, 1: in this process)
+
+    Returns:
+    --------
+    TopKSimilarityIndex
+        The top-k neighbor index
+    """
+    n_games = tfidf_matrix.shape[0]
+    k = min(k, n_games - 1)
+    workers = workers or os.cpu_count()
+    if workers > 1 and n_games > block_size:
+        return _build_topk_index_parallel(tfidf_matrix, k, block_size, workers)
+
+    neighbors = np.empty((n_games, k), dtype=np.int32)
+    scores = np.empty((n_games, k), dtype=np.float32)
+
+    for start in range(0, n_games, block_size):
+        end = min(start + block_size, n_games)
+
+        # TfidfVectorizer L2-normalizes its rows, so the dot product is the cosine similarity
+        block_scores = linear_kernel(tfidf_matrix[start:end], tfidf_matrix)
+        neighbors[start:end], scores[start:end] = _top_k_from_block(block_scores, np.arange(start, end), k)
+
+    return TopKSimilarityIndex(neighbors, scores)
+
+
+def exact_top_n(tfidf_matrix, rows, n, block_size=SIMILARITY_BLOCK_SIZE):
+    """
+    Computes the n most similar games of each of the games at rows directly from the TF-IDF matrix, as a
+    batched matrix product followed by a partition-based top-n selection. Used when more neighbors are
+    requested than the top-k index keeps.
+
+    Parameters:
+    -----------
+    tfidf_matrix : sparse matrix
+        L2-normalized TF-IDF vectors of the games
+    rows : array-like of int
+        Row positions of the games in df2
+    n : int
+        Number of neighbors to return per game
+    block_size : int
+        Number of rows whose similarities are computed at once
+
+    Returns:
+    --------
+    tuple
+        (ndarray of row positions, ndarray of similarity scores), both of shape len(rows) x n
+    """
+    rows = np.asarray(rows)
+    n = min(n, tfidf_matrix.shape[0] - 1)
+    neighbors = np.empty((len(rows), n), dtype=np.int32)
+    scores = np.empty((len(rows), n), dtype=np.float32)
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start:start + block_size]
+        block_scores = linear_kernel(tfidf_matrix[block_rows], tfidf_matrix)
+        neighbors[start:start + block_size], scores[start:start + block_size] = _top_k_from_block(block_scores, block_rows, n)
+    return neighbors, scores
+
+
+def _pair_scores(tfidf_matrix, rows, neighbors, chunk_size=64):
+    """
+    Returns the similarity of each game at rows with each of its neighbors (len(rows) x k), recomputed with
+    the same product as build_topk_index (so scores are bit for bit the same, and ties are broken the same
+    way), over small chunks of rows and their distinct neighbors.
+    """
+    scores = np.empty(neighbors.shape, dtype=np.float64)
+    for start in range(0, len(rows), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        columns, positions = np.unique(neighbors[chunk], return_inverse=True)
+        chunk_scores = linear_kernel(tfidf_matrix[rows[chunk]], tfidf_matrix[columns])
+        scores[chunk] = np.take_along_axis(chunk_scores, positions.reshape(neighbors[chunk].shape), axis=1)
+    return scores
+
+
+def update_topk_index(index, tfidf_matrix, previous_rows, k=SIMILARITY_TOP_K, block_size=SIMILARITY_BLOCK_SIZE):
+    """
+    Updates a TopKSimilarityIndex after games were added, changed or removed, without recomputing the
+    similarities between the games that didn't change (their TF-IDF vectors, and so their scores, are the
+    same as long as the vocabulary is).
+
+    - New and changed games get their top-k computed against the whole catalog: O(changed x N)
+    - Unchanged games whose neighbor list has a removed / changed game get it recomputed the same way
+    - The other unchanged games merge their previous top-k with the scores against the new / changed
+      games (a new game can only enter a top-k by beating its k-th score)
+
+    Parameters:
+    -----------
+    index : TopKSimilarityIndex
+        Index of the previous catalog
+    tfidf_matrix : sparse matrix
+        L2-normalized TF-IDF vectors of the current catalog, transformed with the same vocabulary as index
+    previous_rows : ndarray of int
+        For each game of the current catalog, its row position in the previous one (-1 if new or changed)
+    k : int
+        Number of neighbors to keep per game
+    block_size : int
+        Number of rows whose similarities are computed at once
+
+    Returns:
+    --------
+    TopKSimilarityIndex
+        The top-k neighbor index of the current catalog
+    """
+    n_games = tfidf_matrix.shape[0]
+    k = min(k, n_games - 1)
+    if k != index.k:
+        return build_topk_index(tfidf_matrix, k, block_size)
+
+    changed = np.flatnonzero(previous_rows < 0)
+    kept = np.flatnonzero(previous_rows >= 0)
+
+    # Previous neighbor lists with the row positions of the current catalog (-1 for removed / changed games)
+    current_rows = np.full(len(index), -1, dtype=np.int64)
+    current_rows[previous_rows[kept]] = kept
+    kept_neighbors = current_rows[index.neighbors[previous_rows[kept]]]
+    valid = (kept_neighbors >= 0).all(axis=1)
+
+    neighbors = np.empty((n_games, k), dtype=np.int32)
+    scores = np.empty((n_games, k), dtype=np.float32)
+
+    # Games whose neighbors must be computed against the whole catalog
+    recompute = np.concatenate((changed, kept[~valid]))
+    if len(recompute):
+        neighbors[recompute], scores[recompute] = exact_top_n(tfidf_matrix, recompute, k, block_size)
+
+    # The other games: candidates are their previous neighbors plus all the new / changed games
+    merge, merge_neighbors = kept[valid], kept_neighbors[valid]
+    for start in range(0, len(merge), block_size):
+        block = slice(start, start + block_size)
+        block_rows = merge[block]
+        candidates = np.hstack((merge_neighbors[block], np.broadcast_to(changed, (len(block_rows), len(changed)))))
+        candidate_scores = np.hstack((_pair_scores(tfidf_matrix, block_rows, merge_neighbors[block]),
+                                      linear_kernel(tfidf_matrix[block_rows], tfidf_matrix[changed])))
+        # Order each row by descending score, ties by row position (as build_topk_index), and keep the first k
+        order = np.lexsort((candidates, -candidate_scores))[:, :k]
+        neighbors[block_rows] = np.take_along_axis(candidates, order, axis=1)
+        scores[block_rows] = np.take_along_axis(candidate_scores, order, axis=1)
+
+    return TopKSimilarityIndex(neighbors, scores)
@@ -0,0 +1,147 @@
+import numpy as np
+import scipy.sparse as sp
+from config import USER_RECOMMENDATIONS_PRECOMPUTED_USERS, USER_RECOMMENDATIONS_TOP_N, USER_RECOMMENDATIONS_BLOCK_SIZE
+from datasets.similarity import top_k_from_sparse_block
+
+
+class UserRecommender:
+    """
+    Recommends games to a user from the games the user plays: each game of the library votes for its
+    neighbors in a game similarity index with their similarity, weighted by log(1 + minutes played) of the
+    game, and the games with the most votes that the user doesn't play yet are recommended.
+
+    For any number of users at once this is the sparse product (users x games library weights) x (games x
+    games neighbor scores), computed from the neighbors of the played games only, so the cost depends on
+    the size of the libraries and not on the number of users / games. The recommendations of the most
+    active users (the largest libraries, the most expensive to score) are precomputed.
+
+    Attributes:
+    -----------
+    libraries : UserLibraries
+        Games played by each user
+    neighbor_matrix : csr_matrix (float32, shape N x N)
+        Scores of the neighbors of each game (see TopKSimilarityIndex.sparse_matrix)
+    precomputed_rows : ndarray (int64)
+        Sorted rows (in libraries) of the users whose recommendations are precomputed
+    precomputed_neighbors : ndarray (int32, shape len(precomputed_rows) x top_n)
+        Row positions (in df2) of the recommended games of those users, best first (-1 if fewer)
+    precomputed_scores : ndarray (float32, shape len(precomputed_rows) x top_n)
+        Score of each of those recommendations
+    """
+
+    def __init__(self, libraries, neighbor_matrix, precomputed_rows=None, precomputed_neighbors=None, precomputed_scores=None):
+        self.libraries = libraries
+        self.neighbor_matrix = neighbor_matrix
+        self.precomputed_rows = np.empty(0, dtype=np.int64) if precomputed_rows is None else precomputed_rows
+        self.precomputed_neighbors = np.empty((0, 0), dtype=np.int32) if precomputed_neighbors is None else precomputed_neighbors
+        self.precomputed_scores = np.empty((0, 0), dtype=np.float32) if precomputed_scores is None else precomputed_scores
+
+    @property
+    def top_n(self):
+        return self.precomputed_neighbors.shape[1]
+
+    @property
+    def nbytes(self):
+        return (self.neighbor_matrix.data.nbytes + self.neighbor_matrix.indices.nbytes + self.neighbor_matrix.indptr.nbytes
+                + self.precomputed_rows.nbytes + self.precomputed_neighbors.nbytes + self.precomputed_scores.nbytes)
+
+    def score(self, rows, n):
+        """
+        Computes the n best recommendations of the users at rows (in libraries), all at once.
+
+        Returns:
+        --------
+        tuple
+            (ndarray of row positions in df2, ndarray of scores), both of shape len(rows) x n, best first, padded
+            with -1 (and a score of 0) if fewer games are neighbors of the library
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        library = self.libraries.playtime[rows].tocoo()
+        n_games = self.neighbor_matrix.shape[1]
+
+        # The neighbors of each played game are gathered as ranges of the neighbor matrix and summed per
+        # (user, game) with a sparse conversion, so the cost depends on the libraries and not on the number
+        # of games (a sparse product allocates a dense accumulator of N per user)
+        indptr = self.neighbor_matrix.indptr
+        counts = indptr[library.col + 1] - indptr[library.col]
+        positions = np.repeat(indptr[library.col] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        user_rows, games = np.repeat(library.row, counts).astype(np.int64), self.neighbor_matrix.indices[positions]
+        weights = np.repeat(np.log1p(library.data), counts) * self.neighbor_matrix.data[positions]
+
+        # The games the user already plays are not recommended
+        new = ~np.isin(user_rows * n_games + games, library.row.astype(np.int64) * n_games + library.col)
+        scores = sp.csr_matrix((weights[new], (user_rows[new], games[new])), shape=(len(rows), n_games))
+        scores.sum_duplicates()
+        return top_k_from_sparse_block(scores, np.full(len(rows), -1), n)
+
+    def recommend_batch(self, rows, n=5):
+        """
+        Returns the n best recommendations of each of the users at rows (in libraries), taken from the
+        precomputed ones when available, and computed at once for the other users.
+
+        Returns:
+        --------
+        tuple
+            (ndarray of row positions in df2, ndarray of scores), both of shape len(rows) x n, as in score
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        neighbors = np.full((len(rows), n), -1, dtype=np.int32)
+        scores = np.zeros((len(rows), n), dtype=np.float32)
+
+        positions = np.minimum(np.searchsorted(self.precomputed_rows, rows), max(len(self.precomputed_rows) - 1, 0))
+        precomputed = ((self.precomputed_rows[positions] == rows) if len(self.precomputed_rows) and n <= self.top_n
+                       else np.zeros(len(rows), dtype=bool))
+        # More recommendations than precomputed (n > top_n): all the users are scored online
+        if precomputed.any():
+            neighbors[precomputed] = self.precomputed_neighbors[positions[precomputed], :n]
+            scores[precomputed] = self.precomputed_scores[positions[precomputed], :n]
+        if not precomputed.all():
+            neighbors[~precomputed], scores[~precomputed] = self.score(rows[~precomputed], n)
+        return neighbors, scores
+
+    def recommend(self, user_id, n=5):
+        """
+        Returns the row positions (in df2) and scores of the (at most) n best recommendations of the user.
+        Raises a ValueError if the user has no played games.
+        """
+        neighbors, scores = self.recommend_batch([self.libraries.row(user_id)], n)
+        found = neighbors[0] >= 0
+        return neighbors[0][found], scores[0][found]
+
+
+def build_user_recommender(libraries, index, n_users=USER_RECOMMENDATIONS_PRECOMPUTED_USERS, top_n=USER_RECOMMENDATIONS_TOP_N,
+                           block_size=USER_RECOMMENDATIONS_BLOCK_SIZE):
+    """
+    Builds a UserRecommender over a game similarity index, precomputing the top_n recommendations of the
+    n_users users with the most played games.
+
+    Parameters:
+    -----------
+    libraries : UserLibraries
+        Games played by each user
+    index : TopKSimilarityIndex
+        Neighbors of each game (content-based or collaborative)
+    n_users : int
+        Number of users whose recommendations are precomputed (0: none)
+    top_n : int
+        Number of recommendations precomputed per user
+    block_size : int
+        Number of users scored at once while precomputing
+
+    Returns:
+    --------
+    UserRecommender
+    """
+    recommender = UserRecommender(libraries, index.sparse_matrix())
+
+    # The most active users, by number of played games (ties by row)
+    n_played = np.diff(libraries.playtime.indptr)
+    active = np.argsort(-n_played, kind='stable')[:n_users]
+    rows = np.sort(active[n_played[active] > 0]).astype(np.int64)
+
+    neighbors = np.empty((len(rows), top_n), dtype=np.int32)
+    scores = np.empty((len(rows), top_n), dtype=np.float32)
+    for start in range(0, len(rows), block_size):
+        block = slice(start, start + block_size)
+        neighbors[block], scores[block] = recommender.score(rows[block], top_n)
+    return UserRecommender(libraries, recommender.neighbor_matrix, rows, neighbors, scores)
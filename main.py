@@ -1,16 +1,86 @@
 import pandas as pd
 import numpy as np
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+import multiprocessing
+import threading
+import atexit
+import shutil
 import sys
-from datasets.data_loader import df1, df2, df3, cosine_sim
+import os
+from datasets.data_loader import get_data, reloader
+from datasets.shared_data import publish_shared_data
+from datasets.similarity import exact_top_n
+from datasets.ann import evaluate_recall
+from datasets.collaborative import hybrid_most_similar
 from utils.helpers import trace, logger
+from utils.cache import ResponseCache
+from utils.executor import ExecutionLayer, PoolSaturatedError
+from utils.serialization import fast_response, check_format, columnar
+from utils.profiling import EndpointMetrics, EndpointTimingMiddleware, memory_report, process_memory
+from config import DATA_WARM_UP, DATA_RELOAD_INTERVAL, SHARED_DATA_ATTACH_DIR, SHARED_DATA_DIR, RESPONSE_CACHE, RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_DIR, EXECUTION_POOLS, ENDPOINT_POOLS, RECOMMENDATION_MODE, ANN_INDEX, COLLABORATIVE_CONTENT_WEIGHT, SEARCH_RESULTS
 import uvicorn
 
 sys.stdout.reconfigure(encoding='utf-8') 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Tables and models are loaded lazily on first access. Optionally, start loading all of them in a
+    # background thread when the app starts, so the server accepts connections right away
+    if DATA_WARM_UP:
+        threading.Thread(target=get_data().warm_up, name="data-warm-up", daemon=True).start()
+    # Reload the data when its Parquet files change (workers attached to shared data can't reload it)
+    if DATA_RELOAD_INTERVAL > 0 and not SHARED_DATA_ATTACH_DIR:
+        reloader.watch(DATA_RELOAD_INTERVAL)
+    yield
+    reloader.stop()
+
+app = FastAPI(lifespan=lifespan)
+
+# Latency and errors of every endpoint, recorded by a middleware and served by /metrics
+endpoint_metrics = EndpointMetrics()
+app.add_middleware(EndpointTimingMiddleware, metrics=endpoint_metrics)
+
+# Cache of the endpoint responses. Every endpoint is a pure function of its argument and of the data,
+# so responses are cached per dataset version (they are dropped when the data changes)
+response_cache = ResponseCache(RESPONSE_CACHE, version=lambda: get_data().version,
+                               backend=RESPONSE_CACHE_BACKEND, directory=RESPONSE_CACHE_DIR)
+
+# Endpoints run in bounded thread pools, separate for heavy endpoints and cheap lookups, instead of the
+# shared default threadpool. Concurrent identical requests are computed once, and requests beyond the
+# queue limit of a pool are rejected right away
+execution = ExecutionLayer(EXECUTION_POOLS, ENDPOINT_POOLS)
+
+@app.exception_handler(PoolSaturatedError)
+async def pool_saturated_handler(request, exc):
+    # Fast rejection: tell the client to retry instead of queueing the request without bound
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+def _resolve_name(data, field, value, known):
+    # Names that exist as given are used as is. Otherwise, the known name of the field the value refers to in
+    # the search index (ignoring case, accents and punctuation, or with a few typos), or the value itself if
+    # there is none, so the endpoint reports it as not found. A name of the catalog is never resolved to
+    # another one (e.g. a developer without reviews to one whose name only differs in punctuation)
+    if known(value) or data.search_index.contains(field, value):
+        return value
+    resolved = data.search_index.resolve(field, value, accept=known)
+    return value if resolved is None else resolved
+
+def _game_row(data, id):
+    # Row of the game in df2, from its id (id -> row hash index) or else from its name (search index)
+    if id in data.game_rows.index:
+        return data.game_rows[id]
+    idx = data.search_index.resolve('game', id)
+    if idx is None:
+        raise ValueError(f"The game id '{id}' is not found in the dataset")
+    return idx
 
 # End-point 1
 @app.get("/PlayTimeGenre/{genero}")
+@fast_response
+@execution.run("PlayTimeGenre")
+@response_cache.cached("PlayTimeGenre")
 def PlayTimeGenre(genero: str):
     """
     Returns the year with the most hours played for a specific game genre.
@@ -18,7 +88,8 @@ def PlayTimeGenre(genero: str):
     Parameters:
     -----------
     genero : str
-        The game genre to analyze (e.g., "Action", "Adventure", "Strategy")
+        The game genre to analyze (e.g., "Action", "Adventure", "Strategy"). Case insensitive, and a few
+        typos are tolerated
     
     Returns:
     --------
@@ -32,31 +103,12 @@ def PlayTimeGenre(genero: str):
         If the genre doesn't exist or if there's an error processing the data
     """
     try:
-        # Remove records where 'release_date' is null
-        df_aux = df2.dropna(subset=['release_date'])
-        
-        # Convert 'release_date' to datetime type
-        df_aux['release_date'] = pd.to_datetime(df_aux['release_date'], errors='coerce')
-        
-        # Remove records where datetime conversion failed
-        df_aux = df_aux.dropna(subset=['release_date'])
-        
-        # Extract the year from 'release_date' and put it in 'release_year' column
-        df_aux['release_year'] = df_aux['release_date'].dt.year
-        
-        # Filter by the genre received as argument
-        df_aux = df_aux[df_aux['genres'].apply(lambda x: genero in x)]
-        
-        # Merge df_aux with df3
-        df_aux = df_aux.merge(df3, left_on='id', right_on='item_id')
+        # Look up the year with most hours played in the precomputed (genre, release_year) aggregates
+        data = get_data()
+        genre = _resolve_name(data, 'genre', genero, lambda genre: genre in data.playtime_aggregates.genres)
+        max_playtime_year = data.playtime_aggregates.year_with_most_playtime(genre)
         
-        # Group by year and sum the hours played
-        df_aux = df_aux.groupby(df_aux['release_year'])['playtime_forever'].sum().reset_index()
-        
-        # Find the year with most hours played
-        max_playtime_year = df_aux.loc[df_aux['playtime_forever'].idxmax()]['release_year']
-        
-        return {f"Year of release with most hours played for Genre {genero}" : str(max_playtime_year)}
+        return {f"Year of release with most hours played for Genre {genre}" : str(max_playtime_year)}
     except Exception as e:
         logger.exception(f"Argument: genero = {genero}") #Joyuela: Log the exception
         raise e
@@ -64,7 +116,10 @@ def PlayTimeGenre(genero: str):
 
 # End-point 2
 @app.get("/UserForGenre/{genero}")
-def UserForGenre(genero: str):
+@fast_response
+@execution.run("UserForGenre")
+@response_cache.cached("UserForGenre")
+def UserForGenre(genero: str, format: str = 'json'):
         """
         Returns the user who has accumulated the most hours played for a specific genre,
         along with a breakdown of hours played by year.
@@ -72,7 +127,11 @@ def UserForGenre(genero: str):
         Parameters:
         -----------
         genero : str
-            The game genre to analyze (e.g., "Action", "Adventure", "Strategy")
+            The game genre to analyze (e.g., "Action", "Adventure", "Strategy"). Case insensitive, and a
+            few typos are tolerated
+        format : str
+            'json' (default format below), 'columnar' or 'arrow': the hours played per year as columns
+            ("User", "Year", "Hours"), as a JSON object of arrays or an Arrow IPC stream (query parameter)
     
         Returns:
         --------
@@ -95,44 +154,33 @@ def UserForGenre(genero: str):
             If the genre doesn't exist or if there's an error processing the data
         """
         try:
-            # Remove records where 'release_date' is null
-            df_aux = df2.dropna(subset=['release_date'])
-
-            # Convert 'release_date' to datetime type
-            df_aux['release_date'] = pd.to_datetime(df_aux['release_date'], errors='coerce')
-
-            # Remove records where datetime conversion failed
-            df_aux = df_aux.dropna(subset=['release_date'])
-
-            # Extract the year from 'release_date' and put it in 'release_year' column
-            df_aux['release_year'] = df_aux['release_date'].dt.year
-
-            # Filter by the genre received as argument
-            df_aux = df_aux[df_aux['genres'].apply(lambda x: genero in x)]
+            # Look up the user with most hours played for the given genre, and the minutes played by that user
+            # per release year, in the precomputed (genre, user_id, release_year) aggregates
+            data = get_data()
+            genre = _resolve_name(data, 'genre', genero, lambda genre: genre in data.playtime_aggregates.genres)
+            max_playtime_user, playtime_by_year = data.playtime_aggregates.user_with_most_playtime(genre)
 
-            # Merge df_aux with df3
-            df_aux = df_aux.merge(df3, left_on='id', right_on='item_id')
+            check_format(format)
 
-            # Find the user with most hours played for the given genre. To do this...
-            # Group df_aux by user, sum the hours played, sort by these in descending order, to take from the 1st row the max_playtime_user
-            max_playtime_user = df_aux.groupby(['user_id'])['playtime_forever'].sum().reset_index().sort_values(by='playtime_forever', ascending=False).iloc[0]['user_id']
-
-            # Filter by the user with most hours played for the genre received as argument
-            df_aux = df_aux[df_aux['user_id'] == max_playtime_user]
-
-            # Generate the list of hours played accumulated by year for the user and genre
+            # Generate the hours played accumulated by year for the user and genre, as columns
             # Need to convert the statistic in 'playtime_forever' to hours, as it's in minutes. https://steamcommunity.com/discussions/forum/1/3814039097896647393/
-            playtime_by_year = df_aux.groupby(['release_year'])['playtime_forever'].sum().reset_index().sort_values(by='release_year', ascending=False)
-            playtime_by_year['playtime_forever_Hrs'] = round(playtime_by_year['playtime_forever'] / 60, 0)
-            playtimeHrs_by_year_list = [{"Year": int(row['release_year']), "Hours": int(row['playtime_forever_Hrs'])} for index, row in playtime_by_year.iterrows()]
+            years = playtime_by_year.index.to_numpy().astype(np.int64)
+            hours = np.round(playtime_by_year.to_numpy() / 60, 0).astype(np.int64)
+            if format != 'json':
+                return columnar({"User": [max_playtime_user] * len(years), "Year": years, "Hours": hours}, format)
+
+            playtimeHrs_by_year_list = [{"Year": year, "Hours": hour} for year, hour in zip(years.tolist(), hours.tolist())]
     
-            return {f"User with most hours played for Genre {genero}": max_playtime_user, "Hours played": playtimeHrs_by_year_list}
+            return {f"User with most hours played for Genre {genre}": max_playtime_user, "Hours played": playtimeHrs_by_year_list}
         except Exception as e:
-            logger.exception(f"Argument: genero = {genero}") #Joyuela: Log the exception
+            logger.exception(f"Argument: genero = {genero}, format = {format}") #Joyuela: Log the exception
             raise e
 
 # End-point 3
 @app.get("/UsersRecommend/{annio}")
+@fast_response
+@execution.run("UsersRecommend")
+@response_cache.cached("UsersRecommend")
 def UsersRecommend(annio: int):
         """
         Returns the top 3 most recommended games by users for a specific year.
@@ -162,24 +210,11 @@ def UsersRecommend(annio: int):
             # Returns the top 3 MOST recommended games by users for the given year. (reviews.recommend = True and positive/neutral comments)
             # Return example: [{"Position 1" : X}, {"Position 2" : Y},{"Position 3" : Z}]
 
-            # Filter recommendations by the provided year
-            df_aux = df1[df1['posted'].str.contains(str(annio))].copy()
-
-            # Add 'good_review' column. Values True if 'recommend' is True and 'sentiment_analysis' is 1 or 2
-            df_aux['good_review'] = np.where((df_aux['recommend'] == True) & (df_aux['sentiment_analysis'].isin([1, 2])), True, False)
-
-        
-            # Group by game (item_id) and sum the positive recommendations, then sort leaving the most recommended at the top
-            # NOTE: if you sum a column with True/False, the result is similar to counting the True values, since each True is added as 1 and each False as 0
-            df_aux = df_aux.groupby(['item_id'])['good_review'].sum().reset_index().sort_values(by='good_review', ascending=False)
+            # Look up the top 3 games of the year in the precomputed per-year review rollups
+            top3_games = get_data().review_rollups.most_recommended_games(annio, 3)
 
-            # Merge df_aux with df2 through the game id in both DataFrames. It's necessary to get the game name
-            df_aux = df_aux.merge(df2, left_on='item_id', right_on='id')
-        
             # Create the list with the top 3 most recommended games
-            top3_most_recommended = [{"Position 1" : df_aux.iloc[0]['app_name']}, 
-                                    {"Position 2" : df_aux.iloc[1]['app_name']}, 
-                                    {"Position 3" : df_aux.iloc[2]['app_name']}]
+            top3_most_recommended = [{f"Position {position}" : app_name} for position, app_name in enumerate(top3_games, start=1)]
     
             return top3_most_recommended
         except Exception as e:
@@ -188,6 +223,9 @@ def UsersRecommend(annio: int):
 
 # End-point 4
 @app.get("/UsersWorstDeveloper/{annio}")
+@fast_response
+@execution.run("UsersWorstDeveloper")
+@response_cache.cached("UsersWorstDeveloper")
 def UsersWorstDeveloper(annio: int):
         """
         Returns the top 3 developers with the least recommended games by users for a specific year.
@@ -217,23 +255,12 @@ def UsersWorstDeveloper(annio: int):
             # Returns the top 3 developers with LEAST recommended games by users for the given year. (reviews.recommend = False and negative comments)
             # Return example: [{"Position 1" : X}, {"Position 2" : Y},{"Position 3" : Z}]
 
-            # Filter recommendations by the provided year
-            df_aux = df1[df1['posted'].str.contains(str(annio))].copy()
-        
-            # Add 'bad_review' column. Values True if 'recommend' is False and 'sentiment_analysis' is 0
-            df_aux['bad_review'] = np.where((df_aux['recommend'] == False) & (df_aux['sentiment_analysis'] == 0), True, False)
-
-            # Group by game (item_id) and sum the negative recommendations, then sort leaving the worst recommended at the top
-            # NOTE: if you sum a column with True/False, the result is similar to counting the True values, since each True is added as 1 and each False as 0
-            df_aux = df_aux.groupby(['item_id'])['bad_review'].sum().reset_index().sort_values(by='bad_review', ascending=False)
+            # Look up the top 3 developers of the year in the precomputed per-year review rollups,
+            # where bad reviews are counted per developer (across all of their games)
+            top3_developers = get_data().review_rollups.least_recommended_developers(annio, 3)
 
-            # Merge df_aux with df2 through the game id in both DataFrames. It's necessary to get the developer name
-            df_aux = df_aux.merge(df2, left_on='item_id', right_on='id')
-        
             # Create the list with the top 3 developers with least recommended games
-            top3_least_recommended_dev = [{"Position 1" : df_aux.iloc[0]['developer']}, 
-                                        {"Position 2" : df_aux.iloc[1]['developer']}, 
-                                        {"Position 3" : df_aux.iloc[2]['developer']}]
+            top3_least_recommended_dev = [{f"Position {position}" : developer} for position, developer in enumerate(top3_developers, start=1)]
         
             return top3_least_recommended_dev
         except Exception as e:
@@ -242,6 +269,9 @@ def UsersWorstDeveloper(annio: int):
 
 # End-point 5
 @app.get("/sentiment_analysis/{empresa_desarrolladora}")
+@fast_response
+@execution.run("sentiment_analysis")
+@response_cache.cached("sentiment_analysis")
 def sentiment_analysis(empresa_desarrolladora: str):
         """
         Returns sentiment analysis statistics for all games from a specific developer.
@@ -249,12 +279,13 @@ def sentiment_analysis(empresa_desarrolladora: str):
         Parameters:
         -----------
         empresa_desarrolladora : str
-            The name of the developer company (e.g., "Valve", "Ubisoft")
+            The name of the developer company (e.g., "Valve", "Ubisoft"). Case insensitive, and a few typos
+            are tolerated
     
         Returns:
         --------
         dict
-            A dictionary containing the developer name as key and a list of sentiment counts as value
+            A dictionary containing the developer name (as in the dataset) as key and a list of sentiment counts as value
             Format: {
                 "Developer Name": [
                     "Negative = X",
@@ -275,37 +306,98 @@ def sentiment_analysis(empresa_desarrolladora: str):
             # with the total number of user review records that are categorized with a sentiment analysis as value.
             # Return example: {'Valve' : [Negative = 182, Neutral = 120, Positive = 278]}
 
-            # Merge df1 with df2 through the game id in both DataFrames.
-            df_aux = df1.merge(df2, left_on='item_id', right_on='id')
-
-            # Filter records in df_aux where the 'developer' column matches the 'empresa_desarrolladora' passed as argument
-            df_aux = df_aux[df_aux['developer'] == empresa_desarrolladora]
-
-            # Check if the developer company exists in the dataset
-            if df_aux.empty:
-                raise ValueError(f"The developer company '{empresa_desarrolladora}' is not found in the dataset")
+            # Look up the review counts per sentiment of the developer company in the precomputed sentiment index.
+            # A ValueError is raised if the developer company doesn't exist in the dataset
+            data = get_data()
+            developer = _resolve_name(data, 'developer', empresa_desarrolladora, lambda developer: developer in data.sentiment_index.counts.index)
+            negative, neutral, positive = data.sentiment_index.sentiment_counts(developer)
 
-            # Count the unique values in the 'sentiment_analysis' column and store the counts in separate variables
-            Negative = "Negative = " + str(df_aux['sentiment_analysis'].value_counts().get(0, 0))
-            Neutral = "Neutral = " + str(df_aux['sentiment_analysis'].value_counts().get(1, 0))
-            Positive = "Positive = " + str(df_aux['sentiment_analysis'].value_counts().get(2, 0))
+            Negative = "Negative = " + str(negative)
+            Neutral = "Neutral = " + str(neutral)
+            Positive = "Positive = " + str(positive)
         
-            return {empresa_desarrolladora: [Negative, Neutral, Positive]} 
+            return {developer: [Negative, Neutral, Positive]} 
         except Exception as e:
             logger.exception(f"Argument: empresa_desarrolladora = {empresa_desarrolladora}") #Joyuela: Log the exception
             raise e
     
+# End-point 5 (bulk variant)
+@app.post("/sentiment_analysis")
+@fast_response
+@execution.run("sentiment_analysis_bulk")
+def sentiment_analysis_bulk(empresas_desarrolladoras: list[str], format: str = 'json'):
+        """
+        Returns sentiment analysis statistics for all games of each of the developers received, in one call.
+    
+        Parameters:
+        -----------
+        empresas_desarrolladoras : list[str]
+            JSON array with the names of the developer companies (e.g., ["Valve", "Ubisoft"]). Case insensitive,
+            and a few typos are tolerated
+        format : str
+            'json' (default format below), 'columnar' or 'arrow': the counts as columns ("Developer",
+            "Negative", "Neutral", "Positive"), as a JSON object of arrays or an Arrow IPC stream (query parameter)
+    
+        Returns:
+        --------
+        dict
+            A dictionary with the same format as sentiment_analysis, with one key per developer
+            Format: {
+                "Developer Name 1": ["Negative = X", "Neutral = Y", "Positive = Z"],
+                "Developer Name 2": ["Negative = X", "Neutral = Y", "Positive = Z"],
+                ...
+            }
+    
+        Raises:
+        -------
+        ValueError
+            If any of the developer companies doesn't exist in the dataset
+        """
+        try:
+            check_format(format)
+            data = get_data()
+            developers = [_resolve_name(data, 'developer', developer, lambda developer: developer in data.sentiment_index.counts.index)
+                          for developer in empresas_desarrolladoras]
+
+            # Look up the review counts of all the developer companies at once in the precomputed sentiment index
+            if format != 'json':
+                counts = data.sentiment_index.bulk_sentiment_count_columns(developers)
+                return columnar({"Developer": developers, "Negative": counts[:, 0],
+                                 "Neutral": counts[:, 1], "Positive": counts[:, 2]}, format)
+            counts = data.sentiment_index.bulk_sentiment_counts(developers)
+
+            return {developer: ["Negative = " + str(negative), "Neutral = " + str(neutral), "Positive = " + str(positive)]
+                    for developer, (negative, neutral, positive) in counts.items()}
+        except Exception as e:
+            logger.exception(f"Argument: empresas_desarrolladoras = {empresas_desarrolladoras}, format = {format}")
+            raise e
+    
+def _similarity_index(data, mode):
+    # Neighbor index of the recommendation mode: the exact top-k index or the approximate (ANN) one
+    if mode == 'exact':
+        return data.cosine_sim
+    if mode == 'approximate':
+        return data.ann_index
+    raise ValueError(f"Unknown recommendation mode '{mode}', expected 'exact' or 'approximate'")
+
 # End-point 6
 @app.get("/recomendacion_juego/{id}")
-def recomendacion_juego(id: str):
+@fast_response
+@execution.run("recomendacion_juego")
+@response_cache.cached("recomendacion_juego")
+def recomendacion_juego(id: str, mode: str = RECOMMENDATION_MODE):
     """
     Returns a list of 5 game recommendations based on similarity to the provided game ID.
-    Uses cosine similarity on game features to determine the most similar games.
+    Uses the precomputed top-k cosine similarity index on game features to determine the most similar games,
+    or an approximate nearest-neighbor index for very large catalogs.
     
     Parameters:
     -----------
     id : str
-        The ID of the game to use as a basis for recommendations
+        The ID of the game to use as a basis for recommendations, or its name (case insensitive, a few typos
+        are tolerated)
+    mode : str
+        'exact' (precomputed top-k index) or 'approximate' (ANN index). Query parameter, RECOMMENDATION_MODE by default
     
     Returns:
     --------
@@ -323,30 +415,413 @@ def recomendacion_juego(id: str):
         If the game ID doesn't exist or if there's an error processing the data
     """
     try:
-        # Get the index of the provided game id
-        idx = df2[df2['id'] == id].index[0]
-        
-        # Get the similarity scores of the game in question with other games
-        sim_scores = list(enumerate(cosine_sim[idx]))
-        
-        # Sort the games according to similarity scores
-        sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
+        data = get_data()
+        df2 = data.df2
+
+        # Get the index of the provided game id from the id -> row hash index (or the game name from the search index)
+        idx = _game_row(data, id)
         
-        # Get the indices of the most similar games (excluding the game itself)
-        similar_games_indices = [i[0] for i in sim_scores[1:6]]  # Recommend the 5 most similar games
+        # Get the indices of the most similar games from the top-k neighbor index, or the approximate one
+        # (the game itself is excluded)
+        similar_games_indices, _ = _similarity_index(data, mode).most_similar(idx, 5)  # Recommend the 5 most similar games
         
         # Return the names of the recommended games
         #return df['app_name'].iloc[similar_games_indices]
 
         # Create a list of dictionaries with 'id' as key and 'app_name' as value
-        recommended_games = [{df2['id'].iloc[ind] : df2['app_name'].iloc[ind]} for ind in similar_games_indices]
+        game_ids = df2['id'].iloc[similar_games_indices].to_numpy()
+        app_names = df2['app_name'].iloc[similar_games_indices].to_numpy()
+        recommended_games = [{game_id : app_name} for game_id, app_name in zip(game_ids, app_names)]
     
         return recommended_games
     except Exception as e:
-        logger.exception(f"Argument: id = {id}") #Joyuela: Log the exception
+        logger.exception(f"Argument: id = {id}, mode = {mode}") #Joyuela: Log the exception
         raise e
 
+# End-point 6 (batch variant)
+@app.post("/recomendacion_juego")
+@fast_response
+@execution.run("recomendacion_juego_batch")
+def recomendacion_juego_batch(ids: list[str], n: int = 5, mode: str = RECOMMENDATION_MODE, format: str = 'json'):
+    """
+    Returns game recommendations for many games at once, computed in one batched operation.
+    
+    Parameters:
+    -----------
+    ids : list[str]
+        JSON array with the IDs of the games to use as a basis for recommendations, or their names (case
+        insensitive, a few typos are tolerated)
+    n : int
+        Number of recommendations per game (query parameter, 5 by default)
+    mode : str
+        'exact' or 'approximate', as in recomendacion_juego (query parameter, RECOMMENDATION_MODE by default)
+    format : str
+        'json' (default format below), 'columnar' or 'arrow': one row per recommendation, as columns ("id",
+        "Position", "Recommended id", "Name"), as a JSON object of arrays or an Arrow IPC stream (query parameter)
+    
+    Returns:
+    --------
+    dict
+        A dictionary with one key per game ID, whose value has the same format as recomendacion_juego
+        Format: {
+            "game_id": [{"game_id_1": "Game Name 1"}, {"game_id_2": "Game Name 2"}, ...],
+            ...
+        }
+    
+    Raises:
+    -------
+    ValueError
+        If any of the game IDs doesn't exist in the dataset, or n is lower than 1
+    """
+    try:
+        check_format(format)
+        if n < 1:
+            raise ValueError(f"n must be at least 1, got {n}")
+        data = get_data()
+
+        # Get the rows of all the games at once from the id -> row hash index (and the ids not found, which may
+        # be game names, from the search index)
+        rows = data.game_rows.reindex(ids).to_numpy(dtype=np.float64, copy=True)
+        for i in np.flatnonzero(np.isnan(rows)):
+            idx = data.search_index.resolve('game', ids[i])
+            rows[i] = np.nan if idx is None else idx
+        if np.isnan(rows).any():
+            raise ValueError(f"The game ids {[ids[i] for i in np.flatnonzero(np.isnan(rows))]} are not found in the dataset")
+        rows = rows.astype(np.int64)
+
+        # Gather the neighbors of all the games from the top-k index. If more neighbors are requested than
+        # the index keeps, compute them exactly from the TF-IDF matrix in one batched matrix product
+        index = _similarity_index(data, mode)
+        if mode == 'approximate' or n <= index.k:
+            similar_games_indices, _ = index.most_similar_batch(rows, n)
+        else:
+            _, tfidf_matrix = data.tfidf
+            similar_games_indices, _ = exact_top_n(tfidf_matrix, rows, n)
+
+        # Map the neighbor rows to game ids and names with one positional take per column (no per-row lookups)
+        game_ids = data.df2['id'].iloc[similar_games_indices.ravel()].to_numpy().reshape(similar_games_indices.shape)
+        app_names = data.df2['app_name'].iloc[similar_games_indices.ravel()].to_numpy().reshape(similar_games_indices.shape)
+        if format != 'json':
+            n_recommended = similar_games_indices.shape[1]
+            return columnar({"id": np.repeat(np.asarray(ids, dtype=object), n_recommended).tolist(),
+                             "Position": np.tile(np.arange(1, n_recommended + 1), len(ids)),
+                             "Recommended id": game_ids.ravel().tolist(), "Name": app_names.ravel().tolist()}, format)
+
+        return {game_id: [{recommended_id: app_name} for recommended_id, app_name in zip(game_ids[i], app_names[i])]
+                for i, game_id in enumerate(ids)}
+    except Exception as e:
+        logger.exception(f"Argument: ids = {ids}, n = {n}, mode = {mode}, format = {format}")
+        raise e
+
+# End-point 7
+@app.get("/recomendacion_juego_colaborativa/{id}")
+@fast_response
+@execution.run("recomendacion_juego_colaborativa")
+@response_cache.cached("recomendacion_juego_colaborativa")
+def recomendacion_juego_colaborativa(id: str, n: int = 5, content_weight: float = COLLABORATIVE_CONTENT_WEIGHT,
+                                     mode: str = RECOMMENDATION_MODE):
+    """
+    Returns game recommendations based on the games played by the same users as the provided game ID
+    (item-item collaborative filtering over the playtime of the users), optionally blended with the
+    content-based similarity used by recomendacion_juego.
+    
+    Parameters:
+    -----------
+    id : str
+        The ID of the game to use as a basis for recommendations, or its name (case insensitive, a few typos
+        are tolerated)
+    n : int
+        Number of recommendations (query parameter, 5 by default, at most COLLABORATIVE_TOP_K)
+    content_weight : float
+        Weight of the content-based similarity in the blend, between 0 (collaborative only) and 1 (content
+        only). Query parameter, COLLABORATIVE_CONTENT_WEIGHT by default
+    mode : str
+        'exact' or 'approximate': content neighbor index used as candidates of the blend, as in
+        recomendacion_juego (query parameter, RECOMMENDATION_MODE by default; unused if content_weight is 0)
+    
+    Returns:
+    --------
+    list
+        A list of dictionaries containing at most n recommended games, most similar first (fewer if fewer
+        games share players with the game and content_weight is 0)
+        Format: [
+            {"game_id_1": "Game Name 1"},
+            {"game_id_2": "Game Name 2"},
+            ...
+        ]
+    
+    Raises:
+    -------
+    ValueError
+        If the game ID doesn't exist in the dataset, or n / content_weight are out of range
+    """
+    try:
+        data = get_data()
+        recommender = data.collaborative
+        if not 0 < n <= recommender.k:
+            raise ValueError(f"n must be between 1 and {recommender.k}, got {n}")
+
+        # Get the index of the provided game id from the id -> row hash index (or the game name from the search index)
+        idx = _game_row(data, id)
+
+        if content_weight == 0:
+            # Precomputed collaborative neighbors
+            similar_games_indices, _ = recommender.most_similar(idx, n)
+        else:
+            # Blend: both similarities are computed for the collaborative and content neighbors of the game
+            content_neighbors, _ = _similarity_index(data, mode).most_similar(idx, n)
+            _, tfidf_matrix = data.tfidf
+            similar_games_indices, _ = hybrid_most_similar(recommender, tfidf_matrix, content_neighbors, idx, n, content_weight)
+
+        game_ids = data.df2['id'].iloc[similar_games_indices].to_numpy()
+        app_names = data.df2['app_name'].iloc[similar_games_indices].to_numpy()
+        return [{game_id: app_name} for game_id, app_name in zip(game_ids, app_names)]
+    except Exception as e:
+        logger.exception(f"Argument: id = {id}, n = {n}, content_weight = {content_weight}, mode = {mode}")
+        raise e
+
+# End-point 8
+@app.get("/recomendacion_usuario/{user_id}")
+@fast_response
+@execution.run("recomendacion_usuario")
+@response_cache.cached("recomendacion_usuario")
+def recomendacion_usuario(user_id: str, n: int = 5, model: str = 'content'):
+    """
+    Returns game recommendations for a user: the games most similar to the games the user plays (weighted
+    by the hours played), excluding the games the user already plays.
+    
+    Parameters:
+    -----------
+    user_id : str
+        The ID of the user to recommend games to
+    n : int
+        Number of recommendations (query parameter, 5 by default)
+    model : str
+        Similarity between games: 'content' (the model of recomendacion_juego) or 'collaborative' (the model
+        of recomendacion_juego_colaborativa). Query parameter, 'content' by default
+    
+    Returns:
+    --------
+    list
+        A list of dictionaries containing at most n recommended games, best first
+        Format: [
+            {"game_id_1": "Game Name 1"},
+            {"game_id_2": "Game Name 2"},
+            ...
+        ]
+    
+    Raises:
+    -------
+    ValueError
+        If the user has no played games in the dataset, or n / model are invalid
+    """
+    try:
+        if n <= 0:
+            raise ValueError(f"n must be positive, got {n}")
+        data = get_data()
+        if model == 'content':
+            recommender = data.user_recommender
+        elif model == 'collaborative':
+            recommender = data.user_recommender_collaborative
+        else:
+            raise ValueError(f"Unknown model '{model}', expected 'content' or 'collaborative'")
+
+        # Scores of the neighbors of the games of the user (precomputed for the most active users)
+        recommended_games_indices, _ = recommender.recommend(user_id, n)
+
+        game_ids = data.df2['id'].iloc[recommended_games_indices].to_numpy()
+        app_names = data.df2['app_name'].iloc[recommended_games_indices].to_numpy()
+        return [{game_id: app_name} for game_id, app_name in zip(game_ids, app_names)]
+    except Exception as e:
+        logger.exception(f"Argument: user_id = {user_id}, n = {n}, model = {model}")
+        raise e
+
+# End-point 9
+@app.get("/search/{query}")
+@fast_response
+@execution.run("search")
+@response_cache.cached("search")
+def search(query: str, n: int = SEARCH_RESULTS, fields: str = 'game,developer,genre'):
+    """
+    Searches games (by name), developers and genres by name or prefix, for autocompletion and to find the
+    ids / names the other endpoints take. Matching ignores case, accents and punctuation, and names with a
+    few typos are returned when nothing else matches.
+
+    Parameters:
+    -----------
+    query : str
+        Text to search: a full name, its first letters, or the first letters of some of its words (e.g. "counter str")
+    n : int
+        Maximum number of results (query parameter, SEARCH_RESULTS by default)
+    fields : str
+        Comma-separated fields to search, among 'game', 'developer' and 'genre' (query parameter, all by default)
+
+    Returns:
+    --------
+    list
+        A list of dictionaries with the matches, best first: equal names, then names starting with the
+        query, then names with words starting with the words of the query (then similar names)
+        Format: [
+            {"type": "game", "id": "220", "name": "Half-Life 2", "match": "prefix"},
+            {"type": "developer", "name": "Valve", "match": "exact"},
+            ...
+        ]
+
+    Raises:
+    -------
+    ValueError
+        If n is not positive or a field is unknown
+    """
+    try:
+        if n <= 0:
+            raise ValueError(f"n must be positive, got {n}")
+        data = get_data()
+
+        # Matches of the query in the precomputed inverted / prefix index of each field
+        matches = data.search_index.search(query, n, [field.strip() for field in fields.split(',')])
+
+        game_ids = data.df2['id'].iloc[[row for field, _, _, row in matches if field == 'game']].to_numpy()
+        results, games = [], iter(game_ids)
+        for field, match, name, row in matches:
+            result = {"type": field, "id": next(games), "name": name} if field == 'game' else {"type": field, "name": name}
+            results.append({**result, "match": match})
+        return results
+    except Exception as e:
+        logger.exception(f"Argument: query = {query}, n = {n}, fields = {fields}")
+        raise e
+
+@app.get("/metrics")
+def metrics(include_memory: bool = False):
+    """
+    Returns runtime metrics of the API process.
+    
+    Parameters:
+    -----------
+    include_memory : bool
+        If true, also returns the deep memory usage of each loaded table / model, per DataFrame column
+        (query parameter, false by default as it walks all the loaded data)
+    
+    Returns:
+    --------
+    dict
+        - "process": current and peak RSS in MB
+        - "endpoints": count, errors and mean / p50 / p99 / max latency (ms) of each endpoint
+        - "loader": seconds spent loading each table / model (and when, and by which thread)
+        - "loader_pipeline": workers, wall time and summed stage time of the last parallel warm up
+        - "data": version of the data snapshot in use, and reloads done
+        - "response_cache": hit / miss counters of the response cache
+        - "execution": pending / completed / rejected tasks of each compute pool, and coalesced requests
+        - "memory" (optional): deep memory usage of each loaded table / model
+    """
+    data = get_data()
+    result = {'process': process_memory(), 'endpoints': endpoint_metrics.snapshot(),
+              'loader': data.timings, 'loader_pipeline': data.pipeline, 'data': reloader.stats(), 'response_cache': response_cache.stats(), 'execution': execution.stats()}
+    if include_memory:
+        result['memory'] = memory_report(data.loaded_objects())
+    return result
+
+@app.get("/cache/stats")
+def cache_stats():
+    """
+    Returns the hit / miss counters, evictions and number of entries of the response cache of each endpoint.
+    """
+    return response_cache.stats()
+
+@app.get("/admin/ann_recall")
+def admin_ann_recall(n: int = 5, sample_size: int = 200):
+    """
+    Evaluates the approximate recommendation mode against the exact one for a random sample of games, to
+    tune the ANN_INDEX parameters (recall vs latency).
+    
+    Parameters:
+    -----------
+    n : int
+        Number of recommendations per game (query parameter, 5 by default)
+    sample_size : int
+        Number of games evaluated (query parameter, 200 by default)
+    
+    Returns:
+    --------
+    dict
+        - "recall": fraction of the approximate recommendations that are among the exact ones (ties included)
+        - "approximate_ms" / "exact_ms": mean milliseconds per game of each mode, computed on demand
+        - "ann_index": parameters of the approximate index
+    """
+    try:
+        data = get_data()
+        _, tfidf_matrix = data.tfidf
+        return {**evaluate_recall(data.ann_index, tfidf_matrix, n, sample_size), 'ann_index': ANN_INDEX}
+    except Exception as e:
+        logger.exception(f"Argument: n = {n}, sample_size = {sample_size}")
+        raise e
+
+@app.post("/admin/reload")
+def admin_reload(wait: bool = False):
+    """
+    Reloads the tables whose Parquet files changed (and the models built from them) without restarting
+    the API. The new data is built in the background and replaces the current data once complete,
+    requests in progress finish with the data they started with.
+    
+    Parameters:
+    -----------
+    wait : bool
+        If true, responds once the reload finished (query parameter, false by default: the reload runs
+        in the background)
+    
+    Returns:
+    --------
+    dict
+        - "started" (or "reloaded" if wait): whether a reload was started (false if one is already running)
+          or the data was reloaded (false if the files didn't change)
+        - "data": version of the data snapshot in use, and reloads done
+    """
+    try:
+        if wait:
+            result = {'reloaded': reloader.reload()}
+        else:
+            result = {'started': reloader.trigger()}
+        return {**result, 'data': reloader.stats()}
+    except Exception as e:
+        logger.exception(f"Argument: wait = {wait}")
+        raise e
+
+def _publish_shared_data(shared_dir):
+    # Runs in the loader process: loads all tables and models, and publishes them to shared memory
+    get_data().warm_up()
+    publish_shared_data(get_data(), shared_dir)
+
+def run_shared_workers(workers):
+    """
+    Runs the API with several uvicorn workers that share a single copy of the data.
+
+    A separate loader process loads all tables and models and publishes them as memory-mapped
+    buffers in SHARED_DATA_DIR. The workers then attach to those buffers without copying them, so
+    RAM doesn't grow with the number of workers.
+
+    Parameters:
+    -----------
+    workers : int
+        Number of uvicorn worker processes
+    """
+    shared_dir = os.path.join(SHARED_DATA_DIR, str(os.getpid()))
+
+    loader = multiprocessing.get_context("spawn").Process(target=_publish_shared_data, args=(shared_dir,), name="data-loader")
+    loader.start()
+    loader.join()
+    if loader.exitcode != 0:
+        raise RuntimeError(f"The data loader process failed with exit code {loader.exitcode}")
+    atexit.register(shutil.rmtree, shared_dir, ignore_errors=True)  # Release the shared memory on exit
+
+    # The workers inherit the environment: they attach to the shared data, and have nothing to warm up
+    os.environ['SHARED_DATA_ATTACH_DIR'] = shared_dir
+    os.environ['DATA_WARM_UP'] = 'false'
+    uvicorn.run("main:app", workers=workers)
+
 if __name__ == "__main__":
     if "--trace" in sys.argv:  #Only execute trace() when script is run with "trace" argument (e.g., python main.py trace)
-        trace()  # Call the trace function to log memory usage and DataFrame contents
-    uvicorn.run("main:app", reload=True) #Run the FastAPI application
\ No newline at end of file
+        get_data().warm_up()  # Load all tables and models, as they are otherwise loaded on first access
+        trace(get_data().loaded_objects(), get_data().timings)  # Call the trace function to log memory usage, loading times and DataFrame contents
+    if "--workers" in sys.argv:  #Run N workers sharing the data in memory (e.g., python main.py --workers 4)
+        run_shared_workers(int(sys.argv[sys.argv.index("--workers") + 1]))
+    else:
+        uvicorn.run("main:app", reload=True) #Run the FastAPI application
\ No newline at end of file
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+from datasets.aggregates import build_playtime_aggregates, build_playtime_aggregates_streaming, build_review_rollups
+from datasets.encoding import encode_column, parse_year
+
+GAMES = pd.DataFrame({'id': ['1', '2', '3', '4'],
+                      'genres': ['Action, Indie', 'Action', 'Strategy', 'Indie'],
+                      'release_date': ['2015-03-01', '2016-07-20', '2016-01-10', 'SOON'],
+                      'app_name': ['Game 1', 'Game 2', 'Game 3', 'Game 4'],
+                      'developer': ['Dev A', 'Dev A', 'Dev B', 'Dev C']})
+GAMES['release_year'] = parse_year(GAMES['release_date'], '%Y-%m-%d')  # As normalized by the loader
+
+PLAYTIME = pd.DataFrame({'item_id': ['1', '2', '2', '3', '1', '4'],
+                         'user_id': ['a', 'a', 'b', 'b', 'b', 'a'],
+                         'playtime_forever': [100.0, 50.0, 300.0, 40.0, 10.0, 999.0]})
+
+# Test: build_playtime_aggregates
+# Purpose: Exploded genre aggregates give the same answers as filtering and merging per request
+def test_playtime_aggregates():
+    aggregates = build_playtime_aggregates(GAMES, PLAYTIME)
+    assert aggregates.year_with_most_playtime('Action') == 2016  # 350 minutes in 2016 vs 110 in 2015
+    assert aggregates.year_with_most_playtime('Indie') == 2015  # Game '4' has no valid release date
+    user_id, playtime_by_year = aggregates.user_with_most_playtime('Action')
+    assert user_id == 'b'  # 310 minutes vs 150 for user 'a'
+    assert playtime_by_year.to_dict() == {2016: 300.0, 2015: 10.0}  # Validates per-year breakdown, latest first
+    with pytest.raises(ValueError):  # Validates exception is raised for an unknown genre
+        aggregates.year_with_most_playtime('InvalidGenre')
+
+# Test: build_playtime_aggregates_streaming
+# Purpose: Folding user_items batch by batch gives the same aggregates as the whole table, with string ids
+# and with ids encoded with shared categories
+def test_playtime_aggregates_streaming():
+    expected = build_playtime_aggregates(GAMES, PLAYTIME).by_genre_user_year.to_dict()
+    batches = [PLAYTIME.iloc[start:start + 2] for start in range(0, len(PLAYTIME), 2)]
+    aggregates = build_playtime_aggregates_streaming(GAMES, batches)
+    assert aggregates.by_genre_user_year.to_dict() == expected
+
+    game_ids, user_ids = pd.CategoricalDtype(['1', '2', '3', '4', '5']), pd.CategoricalDtype(['a', 'b'])
+    games = GAMES.assign(id=encode_column(GAMES['id'], game_ids))
+    encoded = [batch.assign(item_id=encode_column(batch['item_id'], game_ids), user_id=encode_column(batch['user_id'], user_ids))
+               for batch in batches]
+    aggregates = build_playtime_aggregates_streaming(games, encoded)
+    assert aggregates.by_genre_user_year.to_dict() == expected
+    assert aggregates.user_with_most_playtime('Action')[0] == 'b'
+
+REVIEWS = pd.DataFrame({'posted': ['Posted May 1, 2015.', 'Posted June 2, 2015.', 'Posted July 3, 2015.',
+                                   'Posted May 4, 2015.', 'Posted March 3.', 'Posted May 9, 2015.'],
+                        'item_id': ['2', '2', '1', '3', '3', '4'],
+                        'recommend': [True, True, False, False, True, True],
+                        'sentiment_analysis': [2, 1, 0, 0, 2, 1]})
+REVIEWS['posted_year'] = parse_year(REVIEWS['posted'], 'Posted %B %d, %Y.')
+
+# Test: build_review_rollups
+# Purpose: Per-year rollups rank games by good reviews and developers by bad reviews
+def test_review_rollups():
+    rollups = build_review_rollups(REVIEWS, GAMES)
+    assert rollups.years == [2015]  # Validates reviews without a year are left out
+    assert rollups.most_recommended_games(2015, 3) == ['Game 2', 'Game 4', 'Game 1']  # 2, 1 and 0 good reviews
+    assert rollups.least_recommended_developers(2015, 3) == ['Dev A', 'Dev B', 'Dev C']  # 1, 1 and 0 bad reviews
+    with pytest.raises(ValueError):  # Validates exception is raised for a year without reviews
+        rollups.most_recommended_games(9999, 3)
+
+# Test: ReviewRollups.add_reviews
+# Purpose: New reviews update only their own year, without recomputing the rollups
+def test_review_rollups_add_reviews():
+    rollups = build_review_rollups(REVIEWS, GAMES)
+    new_reviews = REVIEWS.assign(posted_year=REVIEWS['posted_year'] + 1)
+    rollups.add_reviews(new_reviews, GAMES)
+    assert rollups.years == [2015, 2016]  # Validates the new year is ranked
+    assert rollups.most_recommended_games(2016, 3) == rollups.most_recommended_games(2015, 3)  # Same reviews, same ranking
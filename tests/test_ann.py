@@ -0,0 +1,22 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from datasets.ann import build_ivf_index, evaluate_recall
+from datasets.similarity import build_topk_index
+
+# Small catalog of games described by genres and developer, in a few groups of similar games
+DOCS = [f"{genres} {developer} game{i}" for i, (genres, developer) in
+        enumerate([("Action Indie", "Valve"), ("Action RPG", "Ubisoft"), ("Strategy", "Paradox"), ("Racing Sports", "Codemasters")] * 10)]
+
+# Test: build_ivf_index
+# Purpose: Probing all the lists the approximate index returns the exact neighbors, and fewer lists still return n neighbors
+def test_ivf_index_matches_exact_when_probing_all_lists():
+    tfidf_matrix = TfidfVectorizer().fit_transform(DOCS)
+    exact = build_topk_index(tfidf_matrix, k=5)
+    index = build_ivf_index(tfidf_matrix, dimensions=4, n_lists=4, n_probe=4)
+    neighbors, scores = index.most_similar_batch(np.arange(len(DOCS)), 5)
+    assert np.array_equal(neighbors, exact.neighbors) and np.allclose(scores, exact.scores)  # Validates neighbors and tie order
+    assert evaluate_recall(index, tfidf_matrix, n=5, sample_size=10)['recall'] == 1.0
+
+    index.n_probe = 1
+    assert len(index.most_similar(0, 5)[0]) == 5  # Validates the size of the result with a single probed list
+    assert 0 not in index.most_similar(0, 5)[0]  # Validates the game itself is excluded
@@ -0,0 +1,71 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from datasets.artifact_cache import ArtifactCache, artifact_key
+from datasets.similarity import build_topk_index
+
+DOCS = ["Action Indie Valve", "Action RPG Ubisoft", "Strategy Indie Paradox", "Racing Sports Codemasters"]
+
+# Test: artifact_key
+# Purpose: The key changes when either the input file content or the feature configuration changes
+def test_artifact_key(tmp_path):
+    input_file = tmp_path / 'games.parquet'
+    input_file.write_bytes(b'games v1')
+    key = artifact_key([input_file], {'top_k': 20})
+    assert key == artifact_key([input_file], {'top_k': 20})  # Validates the key is deterministic
+    assert key != artifact_key([input_file], {'top_k': 10})  # Validates config changes are detected
+    input_file.write_bytes(b'games v2')
+    assert key != artifact_key([input_file], {'top_k': 20})  # Validates content changes are detected
+
+# Test: ArtifactCache round trip
+# Purpose: Cached TF-IDF artifacts and neighbor index behave like the freshly built ones
+def test_artifact_cache_round_trip(tmp_path):
+    cache = ArtifactCache(tmp_path)
+    assert cache.load_tfidf('key') is None  # Validates a miss before anything is stored
+
+    tfidf_vectorizer = TfidfVectorizer()
+    tfidf_matrix = tfidf_vectorizer.fit_transform(DOCS)
+    index = build_topk_index(tfidf_matrix, k=2)
+    cache.save_tfidf('key', tfidf_vectorizer, tfidf_matrix)
+    cache.save_similarity_index('key', index)
+
+    cached_vectorizer, cached_matrix = cache.load_tfidf('key')
+    assert (cached_matrix != tfidf_matrix).nnz == 0  # Validates the TF-IDF matrix is unchanged
+    assert np.allclose(cached_vectorizer.transform(["Indie Valve"]).toarray(),
+                       tfidf_vectorizer.transform(["Indie Valve"]).toarray())  # Validates the vectorizer is still fitted
+    cached_index = cache.load_similarity_index('key')
+    assert isinstance(cached_index.neighbors, np.memmap)  # Validates the index is memory-mapped
+    assert np.array_equal(cached_index.neighbors, index.neighbors)
+
+# Test: ArtifactCache pruning
+# Purpose: Storing an artifact under a new key deletes the least recently used keys beyond max_keys
+def test_artifact_cache_prune(tmp_path):
+    import os
+    cache = ArtifactCache(tmp_path, max_keys=2)
+    for used, key in enumerate(['v1', 'v2'], start=1000):
+        cache.save_arrays(key, 'index', {'values': np.arange(3)})
+        os.utime(tmp_path / key, (used, used))  # v1 is the least recently used
+    cache.save_arrays('v3', 'index', {'values': np.arange(3)})
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['v2', 'v3']  # Validates only the max_keys most recent keys are kept
+
+    os.utime(tmp_path / 'v3', (1002, 1002))
+    assert cache.load_arrays('v2', 'index') is not None  # A load marks v2 as used
+    cache.save_arrays('v4', 'index', {'values': np.arange(3)})
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['v2', 'v4']  # Validates the least recently used key is deleted
+
+# Test: ArtifactCache ANN index
+# Purpose: n_probe only applies to the queries, so a cached index is reused with a new n_probe, and an index
+# built with another configuration replaces the previous one
+def test_artifact_cache_ann_index(tmp_path):
+    from datasets.ann import build_ivf_index
+    cache = ArtifactCache(tmp_path)
+    tfidf_matrix = TfidfVectorizer().fit_transform(DOCS)
+    config = {'backend': 'ivf', 'dimensions': 2, 'n_lists': 2, 'n_probe': 2}
+    cache.save_ann_index('key', build_ivf_index(tfidf_matrix, dimensions=2, n_lists=2, n_probe=2), config)
+
+    cached = cache.load_ann_index('key', tfidf_matrix, {**config, 'n_probe': 1})
+    assert cached is not None and cached.n_probe == 1  # Validates a new n_probe reuses the index and is applied to it
+
+    config = {**config, 'n_lists': 1}
+    cache.save_ann_index('key', build_ivf_index(tfidf_matrix, dimensions=2, n_lists=1, n_probe=2), config)
+    assert len(list((tmp_path / 'key').glob('ann_index-*'))) == 1  # Validates the index of the previous configuration is deleted
+    assert cache.load_ann_index('key', tfidf_matrix, config).centroids.shape[0] == 1
@@ -0,0 +1,43 @@
+import time
+from utils.cache import MemoryCache, FileCache, ResponseCache
+
+# Test: MemoryCache
+# Purpose: Entries are evicted in least recently used order and expire after their TTL
+def test_memory_cache_lru_and_ttl():
+    cache = MemoryCache(max_entries=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == (True, 1)  # 'a' becomes the most recently used entry
+    cache.set('c', 3)
+    assert cache.get('b') == (False, None)  # Validates the least recently used entry was evicted
+    assert cache.stats()['evictions'] == 1 and cache.stats()['hits'] == 1
+
+    expiring = MemoryCache(max_entries=2, ttl=0.01)
+    expiring.set('a', 1)
+    time.sleep(0.02)
+    assert expiring.get('a') == (False, None)  # Validates expired entries are not served
+    assert expiring.stats()['expirations'] == 1
+
+# Test: FileCache
+# Purpose: The local stand-in for a shared cache is visible from another cache instance on the same directory
+def test_file_cache_shared_between_instances(tmp_path):
+    FileCache(tmp_path, max_entries=2, ttl=60).set('key', {'Valve': [1, 2, 3]})
+    assert FileCache(tmp_path, max_entries=2, ttl=60).get('key') == (True, {'Valve': [1, 2, 3]})
+
+# Test: ResponseCache
+# Purpose: Responses are computed once per argument, and recomputed when the dataset version changes
+def test_response_cache_invalidated_on_version_change():
+    version = ['v1']
+    calls = []
+    response_cache = ResponseCache({'endpoint': {'max_entries': 8, 'ttl': 60}}, version=lambda: version[0])
+
+    @response_cache.cached('endpoint')
+    def endpoint(genero: str):
+        calls.append(genero)
+        return {genero: version[0]}
+
+    assert endpoint('Action') == endpoint('Action') == {'Action': 'v1'}
+    assert calls == ['Action']  # Validates the second call was served from the cache
+    version[0] = 'v2'
+    assert endpoint('Action') == {'Action': 'v2'}  # Validates the new dataset version is used
+    assert response_cache.stats()['endpoint']['misses'] == 2
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from datasets.collaborative import build_user_libraries, build_item_item_recommender, build_item_similarity_index, build_item_vectors, hybrid_most_similar
+
+# Small catalog and the playtime of a few users, with games played by the same users (and one nobody played)
+GAME_IDS = pd.Series(['1', '2', '3', '4', '5', '6'])
+PLAYTIME = pd.DataFrame({'item_id': ['1', '2', '1', '2', '3', '4', '3', '4', '1', '2', '3', '5', '9'],
+                         'user_id': ['a', 'a', 'b', 'b', 'b', 'c', 'c', 'd', 'd', 'd', 'e', 'e', 'e'],
+                         'playtime_forever': [100.0, 90.0, 20.0, 30.0, 5.0, 60.0, 60.0, 10.0, 10.0, 10.0, 1.0, 1.0, 50.0]})
+
+# Test: build_item_item_recommender
+# Purpose: The blocked, multi-process top-k index matches a stable sort of the dense cosine matrix of the playtime vectors
+def test_item_item_recommender_matches_dense():
+    batches = [PLAYTIME.iloc[start:start + 4] for start in range(0, len(PLAYTIME), 4)]
+    recommender = build_item_item_recommender(build_user_libraries(GAME_IDS, batches), k=3, block_size=2, workers=2)
+    dense = cosine_similarity(recommender.item_vectors)
+    assert recommender.item_vectors.shape[0] == len(GAME_IDS)  # Validates games outside the catalog ('9') are left out
+    for idx in range(len(GAME_IDS)):
+        expected = [i for i in np.argsort(-dense[idx], kind='stable') if i != idx and dense[idx, i] > 0][:3]
+        neighbors, scores = recommender.most_similar(idx, 3)
+        assert list(neighbors) == expected  # Validates neighbors and tie order
+        assert np.allclose(scores, dense[idx][expected], atol=1e-6)  # Validates scores
+    assert len(recommender.most_similar(5, 3)[0]) == 0  # Validates a game nobody played has no neighbors
+
+# Test: build_item_similarity_index with worker processes
+# Purpose: Blocks computed by a pool of processes over shared memory give the same index as in a single process
+def test_item_similarity_index_parallel_matches_sequential():
+    item_vectors = build_item_vectors(build_user_libraries(GAME_IDS, [PLAYTIME]))
+    sequential = build_item_similarity_index(item_vectors, k=3, block_size=2, workers=1)
+    parallel = build_item_similarity_index(item_vectors, k=3, block_size=2, workers=2)
+    assert np.array_equal(parallel.neighbors, sequential.neighbors)  # Validates neighbors and tie order
+    assert np.array_equal(parallel.scores, sequential.scores)  # Validates scores
+    assert not isinstance(parallel.neighbors, np.memmap)  # Validates results don't reference the removed shared memory
+
+# Test: hybrid_most_similar
+# Purpose: The blend ranks by the weighted sum of both similarities, and its ends match each model alone
+def test_hybrid_most_similar():
+    recommender = build_item_item_recommender(build_user_libraries(GAME_IDS, [PLAYTIME]), k=3)
+    tfidf_matrix = TfidfVectorizer().fit_transform(["Action Valve", "Action Valve", "Strategy", "Strategy Paradox", "Action", "Action Valve"])
+    content = cosine_similarity(tfidf_matrix)
+    assert list(hybrid_most_similar(recommender, tfidf_matrix, [1, 5], 0, 3, 0)[0]) == list(recommender.most_similar(0, 3)[0])
+    assert list(hybrid_most_similar(recommender, tfidf_matrix, [1, 5], 0, 2, 1)[0]) == [1, 5]  # Validates content only
+    neighbors, scores = hybrid_most_similar(recommender, tfidf_matrix, [1, 5], 0, 5, 0.5)
+    expected = 0.5 * recommender.scores(0, neighbors) + 0.5 * content[0, neighbors]
+    assert np.allclose(scores, expected) and list(scores) == sorted(scores, reverse=True)  # Validates blended scores, best first
+    assert 5 in neighbors  # Validates a game nobody played can be recommended by its content
+    with pytest.raises(ValueError):  # Validates exception is raised for a weight out of range
+        hybrid_most_similar(recommender, tfidf_matrix, [1, 5], 0, 3, 2)
@@ -0,0 +1,98 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from datasets.data_loader import DataRegistry, _update_tfidf
+
+# Test: DataRegistry
+# Purpose: Tables / models are loaded on first access only, once, and their dependencies on demand
+def test_data_registry_loads_lazily():
+    calls = []
+    def _load_table(data):
+        calls.append('table')
+        return [1, 2, 3]
+    def _build_model(data):
+        calls.append('model')
+        return sum(data.table)
+
+    registry = DataRegistry({'table': _load_table, 'model': _build_model})
+    assert calls == []  # Validates nothing is loaded when the registry is created
+    assert registry.model == 6  # Validates the model is built from its dependency
+    assert registry.get('model') == 6 and registry.table == [1, 2, 3]
+    assert calls == ['model', 'table']  # Validates each loader runs exactly once
+    with pytest.raises(AttributeError):  # Validates unknown names are rejected
+        registry.unknown
+
+# Test: DataRegistry
+# Purpose: A new snapshot reuses the tables / models of the previous one that don't depend on changed files
+def test_data_registry_reuses_unchanged_tables():
+    calls = []
+    def _loader(name, value):
+        def _load(data):
+            calls.append(name)
+            return value(data)
+        return _load
+    loaders = {'games': _loader('games', lambda data: ['g1', 'g2']), 'items': _loader('items', lambda data: [1, 2]),
+               'index': _loader('index', lambda data: list(data.games)),
+               'aggregates': _loader('aggregates', lambda data: (data.games, sum(data.items)))}
+    sources = {'games': {'steam_games'}, 'items': {'user_items'}}
+
+    previous = DataRegistry(loaders, sources=sources, table_versions={'steam_games': 'v1', 'user_items': 'v1'})
+    previous.warm_up()
+    calls.clear()
+    snapshot = DataRegistry(loaders, sources=sources, table_versions={'steam_games': 'v1', 'user_items': 'v2'}, previous=previous)
+    snapshot.warm_up()
+    snapshot.release_previous()
+    assert snapshot.changed_tables == {'user_items'} and snapshot.version != previous.version
+    assert sorted(calls) == ['aggregates', 'items']  # Validates only what depends on the changed table is rebuilt
+    assert snapshot.index is previous.index and snapshot.reused == {'games', 'index'}  # Validates the rest is reused
+    assert snapshot.aggregates[0] is previous.games  # Validates rebuilt models use the reused tables
+
+# Test: DataRegistry.warm_up
+# Purpose: The parallel pipeline loads each stage once, after its declared dependencies, and reports the stage timings
+def test_data_registry_parallel_warm_up():
+    events, lock = [], threading.Lock()
+    def _loader(name, value):
+        def _load(data):
+            with lock:
+                events.append(('start', name))
+            time.sleep(0.05)
+            result = value(data)
+            with lock:
+                events.append(('end', name))
+            return result
+        return _load
+    loaders = {'games': _loader('games', lambda data: 2), 'reviews': _loader('reviews', lambda data: 3),
+               'index': _loader('index', lambda data: data.games * 10),
+               'rollups': _loader('rollups', lambda data: data.games + data.reviews)}
+    stage_dependencies = {'index': {'games'}, 'rollups': {'games', 'reviews'}}
+
+    registry = DataRegistry(loaders, table_versions={}, stage_dependencies=stage_dependencies)
+    registry.warm_up(workers=4)
+    assert (registry.index, registry.rollups) == (20, 5)
+    assert sorted(name for event, name in events if event == 'start') == sorted(loaders)  # Validates each stage runs once
+    for name, dependencies in stage_dependencies.items():  # Validates stages start after their dependencies end
+        assert all(events.index(('end', dependency)) < events.index(('start', name)) for dependency in dependencies)
+    assert registry.timings['games']['end'] > registry.timings['reviews']['start']  # Validates independent stages overlap
+    assert registry.timings['index']['thread'].startswith('data-load')  # Validates stages run on the pipeline threads
+    assert registry.pipeline['workers'] == 4 and registry.pipeline['stages'] == 4
+    assert registry.pipeline['wall_seconds'] < registry.pipeline['stage_seconds']  # Validates the wall time is below the summed stage time
+
+# Test: _update_tfidf
+# Purpose: Only the new / changed games are transformed with the previous vocabulary, until the catalog drifts too much
+def test_update_tfidf_incremental_and_refit():
+    features = pd.Series(["Action Indie Valve", "Action RPG Ubisoft", "Strategy Indie Paradox", "Racing Sports Codemasters"] * 5)
+    tfidf_vectorizer = TfidfVectorizer()
+    tfidf_matrix = tfidf_vectorizer.fit_transform(features)
+
+    # Game 0 removed and one game added: 2 of 20 rows updated
+    new_features = pd.concat([features.iloc[1:], pd.Series(["Action Indie Paradox"])], ignore_index=True)
+    previous_rows = np.append(np.arange(1, 20), -1)
+    updated_vectorizer, updated_matrix = _update_tfidf((tfidf_vectorizer, tfidf_matrix), previous_rows, new_features)
+    assert updated_vectorizer.vocabulary_ is tfidf_vectorizer.vocabulary_ and updated_vectorizer.n_updated_rows_ == 2
+    assert (updated_matrix != tfidf_vectorizer.transform(new_features)).nnz == 0  # Validates the rows are in the current order
+
+    # Replacing half of the games exceeds the drift threshold: the vectorizer must be fit again
+    assert _update_tfidf((tfidf_vectorizer, tfidf_matrix), np.where(np.arange(20) < 10, -1, np.arange(20)), features) is None
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from datasets.encoding import encode_column, decoded, map_values, parse_year, build_multi_hot
+
+# Test: encode_column
+# Purpose: Columns encoded with the same categories share integer codes, and decode back to the same strings
+def test_shared_codes_for_join_keys():
+    ids = pd.Index(['10', '20', '30'])
+    games = encode_column(pd.Series(['30', '10']), ids)
+    reviews = encode_column(pd.Series(['10', '10', '30']).astype('category'), ids)
+    assert games.cat.codes.tolist() == [2, 0] and reviews.cat.codes.tolist() == [0, 0, 2]  # Validates the codes are shared
+    assert len(reviews.to_frame('id').merge(games.to_frame('id'))) == 3  # Validates joins on the encoded columns
+    assert decoded(games).tolist() == ['30', '10']
+
+    # Without categories, the distinct values are sorted (regardless of the dictionary order of the input)
+    developers = encode_column(pd.Series(['Valve', 'Ubisoft', 'Valve']).astype(pd.CategoricalDtype(['Valve', 'Ubisoft', 'Sega'])))
+    assert developers.cat.categories.tolist() == ['Ubisoft', 'Valve']
+
+# Test: map_values
+# Purpose: A function applied to a dictionary-encoded column gives the same result as applied to the strings
+def test_map_values_on_distinct_values():
+    posted = pd.Series(['Posted November 5, 2011.', 'Posted July 15.', None, 'Posted November 5, 2011.'])
+    extract_year = lambda values: values.str.extract(r'(\d{4})', expand=False).astype('Int32')
+    assert map_values(posted.astype('category'), extract_year).equals(extract_year(posted))
+
+# Test: parse_year
+# Purpose: Dates are parsed with their explicit format into nullable years, for strings and encoded columns
+def test_parse_year():
+    release_date = pd.Series(['2015-03-01', 'SOON', None, 'Oct 2010', '2015-03-01'])
+    years = parse_year(release_date, '%Y-%m-%d')
+    assert str(years.dtype) == 'Int16'  # Validates the compact nullable dtype
+    assert years.tolist() == [2015, pd.NA, pd.NA, pd.NA, 2015]  # Validates values not matching the format are missing
+    assert parse_year(release_date.astype('category'), '%Y-%m-%d').equals(years)
+    posted = pd.Series(['Posted November 5, 2011.', 'Posted July 15.'])
+    assert parse_year(posted, 'Posted %B %d, %Y.').tolist() == [2011, pd.NA]
+
+# Test: build_multi_hot
+# Purpose: Comma separated tokens are stored as a rows x tokens matrix, with empty rows for missing values
+def test_multi_hot_genres():
+    genres = build_multi_hot(pd.Series(['Action, Indie', None, 'Indie', 'Action, Indie']).astype('category'))
+    assert genres.vocabulary.tolist() == ['Action', 'Indie']
+    assert genres.matrix.toarray().tolist() == [[1, 1], [0, 0], [0, 1], [1, 1]]
+    assert genres.rows_with('Indie').tolist() == [0, 2, 3]
+    assert genres.rows_with('Racing').tolist() == []  # Validates unknown tokens match no rows
+    assert genres.tokens(0) == ['Action', 'Indie']
+    rows, tokens = genres.pairs()
+    assert np.array_equal(rows, [0, 0, 2, 3, 3]) and np.array_equal(tokens, [0, 1, 1, 0, 1])
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import pytest
+from utils.executor import ExecutionLayer, PoolSaturatedError
+
+POOLS = {'heavy': {'max_workers': 1, 'max_queue': 0}, 'light': {'max_workers': 2, 'max_queue': 0}}
+
+# Test: ExecutionLayer coalescing
+# Purpose: Concurrent identical requests are computed once and all of them get the result
+def test_identical_requests_are_coalesced():
+    execution = ExecutionLayer(POOLS, {'endpoint': 'heavy'})
+    release = threading.Event()
+    calls = []
+
+    @execution.run('endpoint')
+    def endpoint(genre):
+        calls.append(genre)
+        release.wait(5)
+        return {'genre': genre}
+
+    async def requests():
+        tasks = [asyncio.ensure_future(endpoint('Action')) for _ in range(100)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(requests())
+    assert calls == ['Action']  # Validates the function ran once for the 100 requests
+    assert all(result == {'genre': 'Action'} for result in results)
+    assert execution.stats()['coalesced'] == 99
+
+# Test: ExecutionLayer admission control
+# Purpose: Requests beyond the capacity of a pool are rejected right away, without affecting other pools
+def test_saturated_pool_rejects_requests():
+    execution = ExecutionLayer(POOLS, {'heavy_endpoint': 'heavy', 'light_endpoint': 'light'})
+    release = threading.Event()
+
+    @execution.run('heavy_endpoint')
+    def heavy_endpoint(argument):
+        release.wait(5)
+        return argument
+
+    @execution.run('light_endpoint')
+    def light_endpoint(argument):
+        return argument
+
+    async def requests():
+        running = asyncio.ensure_future(heavy_endpoint(1))
+        await asyncio.sleep(0.01)
+        with pytest.raises(PoolSaturatedError):
+            await heavy_endpoint(2)  # The heavy pool is full: rejected instead of queued
+        assert await light_endpoint(3) == 3  # Validates cheap lookups still run while the heavy pool is busy
+        release.set()
+        return await running
+
+    assert asyncio.run(requests()) == 1
+    assert execution.stats()['pools']['heavy']['rejected'] == 1
+
+# Test: ExecutionLayer errors
+# Purpose: Exceptions of the endpoint function are raised to the caller, and are not kept for later requests
+def test_exceptions_are_propagated():
+    execution = ExecutionLayer(POOLS, {'endpoint': 'light'})
+    calls = []
+
+    @execution.run('endpoint')
+    def endpoint(genre):
+        calls.append(genre)
+        raise ValueError(genre)
+
+    with pytest.raises(ValueError):
+        asyncio.run(endpoint('Unknown'))
+    with pytest.raises(ValueError):
+        asyncio.run(endpoint('Unknown'))
+    assert len(calls) == 2  # Validates the failed computation was not coalesced with the next request
@@ -1,6 +1,9 @@
 import pytest
+import numpy as np
+import pyarrow as pa
 from fastapi.testclient import TestClient
 from main import app
+from datasets import data_loader
 
 client = TestClient(app)
 
@@ -70,6 +73,17 @@ def test_sentiment_analysis():
     assert len(list(response.json().values())[0]) == 3  # Validates sentiment has 3 categories
     assert response.json()["Valve"][0].startswith("Negative = ")  # Validates negative sentiment format
 
+# Test: sentiment_analysis_bulk (endpoint #5, bulk variant)
+# Purpose: This test checks if we can get sentiment analysis results for many developers in one call
+# Input: A JSON array of developer names like ['Valve', 'Ubisoft']
+# Expected output: Dictionary with one key per developer, in the same format as endpoint #5
+# Example response: {'Valve' : ['Negative = 182', 'Neutral = 120', 'Positive = 278'], 'Ubisoft' : [...]}
+def test_sentiment_analysis_bulk():
+    response = client.post("/sentiment_analysis", json=["Valve", "Ubisoft"])
+    assert response.status_code == 200  # Validates successful API response
+    assert list(response.json().keys()) == ["Valve", "Ubisoft"]  # Validates one key per requested developer
+    assert response.json()["Valve"] == client.get("/sentiment_analysis/Valve").json()["Valve"]  # Validates same counts as endpoint #5
+
 # Test: recomendacion_juego (endpoint #6)
 # Purpose: This test validates if we can get game recommendations based on a game ID
 # Input: A game ID (string)
@@ -82,6 +96,197 @@ def test_recomendacion_juego():
     assert len(response.json()) == 5  # Validates list contains exactly 5 recommendations
     assert len(set(game.values() for game in response.json())) == len(response.json())  # Validates all recommendations are unique
 
+# Test: recomendacion_juego_batch (endpoint #6, batch variant)
+# Purpose: This test validates if we can get recommendations for many games in one call
+# Input: A JSON array of game IDs
+# Expected output: Dictionary with one key per game ID, each with the same list as endpoint #6
+# Example response: {"222621": [{"game_id1": "game_name1"}, ..., {"game_id5": "game_name5"}], ...}
+def test_recomendacion_juego_batch():
+    response = client.post("/recomendacion_juego", json=["222621", "761140"])
+    assert response.status_code == 200  # Validates successful API response
+    assert list(response.json().keys()) == ["222621", "761140"]  # Validates one key per requested game
+    assert response.json()["222621"] == client.get("/recomendacion_juego/222621").json()  # Validates same result as endpoint #6
+    response = client.post("/recomendacion_juego?n=30", json=["222621"])
+    assert len(response.json()["222621"]) == 30  # Validates more neighbors than the index keeps can be requested
+    assert response.json()["222621"][:5] == client.get("/recomendacion_juego/222621").json()  # Validates exact path agrees with the index
+
+# Test: recomendacion_juego in approximate mode (endpoint #6)
+# Purpose: This test checks that recommendations can be served from the approximate nearest-neighbor index
+# Input: A game ID like '222621' and mode=approximate
+# Expected output: List of 5 dictionaries, as in exact mode
+def test_recomendacion_juego_approximate():
+    response = client.get("/recomendacion_juego/222621?mode=approximate")
+    assert response.status_code == 200  # Validates successful API response
+    assert len(response.json()) == 5  # Validates exactly 5 recommendations are returned
+    assert "222621" not in [list(item)[0] for item in response.json()]  # Validates the game itself is not recommended
+    recall = client.get("/admin/ann_recall?sample_size=20").json()
+    assert 0 <= recall["recall"] <= 1  # Validates the recall against the exact mode is evaluated
+
+# Test: recomendacion_juego_colaborativa (endpoint #7)
+# Purpose: This test checks that recommendations can be based on the games played by the same users, alone or blended with content
+# Input: A game ID like '222621', optionally n and content_weight
+# Expected output: List of at most n dictionaries with the recommended games
+def test_recomendacion_juego_colaborativa():
+    response = client.get("/recomendacion_juego_colaborativa/222621")
+    assert response.status_code == 200  # Validates successful API response
+    assert 0 < len(response.json()) <= 5  # Validates at most 5 recommendations are returned
+    assert "222621" not in [list(item)[0] for item in response.json()]  # Validates the game itself is not recommended
+    content_only = client.get("/recomendacion_juego_colaborativa/222621?content_weight=1").json()
+    assert content_only == client.get("/recomendacion_juego/222621").json()  # Validates content only matches endpoint #6
+    assert len(client.get("/recomendacion_juego_colaborativa/222621?content_weight=0.5&n=10").json()) == 10
+
+# Test: recomendacion_juego_colaborativa with an invalid argument (endpoint #7)
+# Purpose: This test checks that a weight out of range raises an error
+# Input: content_weight=2
+# Expected output: Exception should be raised
+def test_recomendacion_juego_colaborativa_InvalidWeight():
+    with pytest.raises(Exception):
+        client.get("/recomendacion_juego_colaborativa/222621?content_weight=2")
+
+# Test: recomendacion_usuario (endpoint #8)
+# Purpose: This test checks that games can be recommended to a user from the games the user plays
+# Input: A user ID (the most active one, whose recommendations are precomputed, and another one), optionally n and model
+# Expected output: List of at most n dictionaries with recommended games the user doesn't play
+def test_recomendacion_usuario():
+    recommender = data_loader.get_data().user_recommender
+    libraries = recommender.libraries
+    for row in [recommender.precomputed_rows[0], int(np.argmin(np.diff(libraries.playtime.indptr) == 0))]:
+        user_id = libraries.user_ids[row]
+        response = client.get(f"/recomendacion_usuario/{user_id}")
+        assert response.status_code == 200  # Validates successful API response
+        assert 0 < len(response.json()) <= 5  # Validates at most 5 recommendations are returned
+        played = set(data_loader.get_data().df2['id'].iloc[libraries.playtime[row].indices].astype(str))
+        assert not played & {list(item)[0] for item in response.json()}  # Validates played games are not recommended
+    assert len(client.get(f"/recomendacion_usuario/{user_id}?model=collaborative&n=3").json()) <= 3
+
+# Test: recomendacion_usuario with an invalid argument (endpoint #8)
+# Purpose: This test checks that an unknown user raises an error
+# Input: A user ID that doesn't exist
+# Expected output: Exception should be raised
+def test_recomendacion_usuario_InvalidUser():
+    with pytest.raises(Exception):
+        client.get("/recomendacion_usuario/InvalidUser")
+
+# Test: search (endpoint #9)
+# Purpose: This test checks that games, developers and genres can be found by name or prefix, ignoring case
+# Input: A full name, a prefix of some of its words, or a misspelled name
+# Expected output: A list of matches with their type, name (and id for games) and kind of match, best first
+# Example response: [{"type": "game", "id": "70", "name": "Half-Life", "match": "exact"}, ...]
+def test_search():
+    response = client.get("/search/half life?n=3")
+    assert response.status_code == 200  # Validates successful API response
+    assert response.json()[0] == {"type": "game", "id": "70", "name": "Half-Life", "match": "exact"}  # Validates case / punctuation are ignored
+    assert len(response.json()) == 3 and all(match["name"].startswith("Half-Life") for match in response.json())
+    assert client.get("/search/valv?fields=developer&n=1").json() == [{"type": "developer", "name": "Valve", "match": "prefix"}]
+    assert client.get("/search/ubisfot?fields=developer").json()[0]["name"] == "Ubisoft"  # Validates typos are tolerated
+
+# Test: name lookups of the existing endpoints (endpoints #1, #5 and #6)
+# Purpose: This test checks that genres, developers and games can be given by name, in any case and with typos
+# Input: 'action', 'valve' and 'ubisfot', and the game name 'portal 2' instead of its id
+# Expected output: The same responses as with the exact names / id, keyed by the name as in the dataset
+def test_fuzzy_name_lookups():
+    assert client.get("/PlayTimeGenre/action").json() == client.get("/PlayTimeGenre/Action").json()
+    assert client.get("/sentiment_analysis/valve").json() == client.get("/sentiment_analysis/Valve").json()
+    assert list(client.get("/sentiment_analysis/ubisfot").json()) == ["Ubisoft"]  # Validates the developer name is resolved
+    assert client.get("/recomendacion_juego/portal 2").json() == client.get("/recomendacion_juego/620").json()
+
+# Test: name lookups of developers whose names only differ in punctuation (endpoint #5)
+# Purpose: A developer of the catalog without reviews is not answered with the counts of a developer with a similar name
+# Input: 'Desert Owl Games, LLC' (no reviews) and 'Desert Owl Games LLC' (with reviews), both developers in the dataset
+# Expected output: The counts of 'Desert Owl Games LLC', and an error for 'Desert Owl Games, LLC'
+def test_sentiment_analysis_similar_developer_names():
+    assert list(client.get("/sentiment_analysis/Desert Owl Games LLC").json()) == ["Desert Owl Games LLC"]
+    with pytest.raises(Exception):  # Validates the developer without reviews is not resolved to the other one
+        client.get("/sentiment_analysis/Desert Owl Games, LLC")
+    with pytest.raises(Exception):  # Validates the same in the bulk variant
+        client.post("/sentiment_analysis", json=["Desert Owl Games LLC", "Desert Owl Games, LLC"])
+    assert list(client.get("/sentiment_analysis/desert owl games llc").json()) == ["Desert Owl Games LLC"]  # Validates other spellings still resolve
+
+# Test: name lookups of the bulk endpoints (endpoints #5 and #6, bulk / batch variants)
+# Purpose: This test checks that the bulk endpoints resolve names as the single-item endpoints do
+# Input: ['valve', 'ubisfot'] and ['portal 2', '222621']
+# Expected output: Developers keyed by their name in the dataset, games keyed by the value sent
+def test_fuzzy_name_lookups_bulk():
+    response = client.post("/sentiment_analysis", json=["valve", "ubisfot"])
+    assert response.status_code == 200 and list(response.json()) == ["Valve", "Ubisoft"]  # Validates the developer names are resolved
+    assert response.json()["Valve"] == client.get("/sentiment_analysis/Valve").json()["Valve"]
+    response = client.post("/recomendacion_juego", json=["portal 2", "222621"])
+    assert response.status_code == 200 and list(response.json()) == ["portal 2", "222621"]  # Validates one key per requested game
+    assert response.json()["portal 2"] == client.get("/recomendacion_juego/620").json()  # Validates the game name is resolved
+
+# Test: search with an invalid argument (endpoint #9)
+# Purpose: This test checks that an unknown field raises an error
+def test_search_InvalidField():
+    with pytest.raises(Exception):
+        client.get("/search/portal?fields=publisher")
+
+# Test: compact response formats (endpoints #2, #5 and #6)
+# Purpose: This test checks that bulk consumers can get the responses as columns, in columnar JSON or as an Arrow IPC stream
+# Input: format=columnar / format=arrow
+# Expected output: The same data as the default JSON format, one array per column
+def test_compact_response_formats():
+    default = client.get("/UserForGenre/Action").json()
+    columns = client.get("/UserForGenre/Action?format=columnar").json()
+    assert [{"Year": year, "Hours": hours} for year, hours in zip(columns["Year"], columns["Hours"])] == default["Hours played"]  # Validates same data
+
+    response = client.post("/recomendacion_juego?format=arrow", json=["222621", "761140"])
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 10 and table.column("Position").to_pylist()[:5] == [1, 2, 3, 4, 5]  # Validates one row per recommendation
+
+    counts = client.post("/sentiment_analysis?format=columnar", json=["Valve"]).json()
+    assert ["Negative = " + str(counts["Negative"][0]), "Neutral = " + str(counts["Neutral"][0]), "Positive = " + str(counts["Positive"][0])] == \
+        client.get("/sentiment_analysis/Valve").json()["Valve"]
+
+# Test: metrics
+# Purpose: This test checks that endpoint timings, loader timings and memory usage can be queried at runtime
+# Input: Optional 'include_memory' query parameter
+# Expected output: Dictionary with process, endpoints, loader and response cache metrics
+def test_metrics():
+    client.get("/PlayTimeGenre/Action")
+    response = client.get("/metrics?include_memory=true")
+    assert response.status_code == 200  # Validates successful API response
+    assert response.json()["endpoints"]["GET /PlayTimeGenre/{genero}"]["count"] >= 1  # Validates requests are timed per route
+    assert "playtime_aggregates" in response.json()["loader"]  # Validates loader phases are timed
+    assert "columns" in response.json()["memory"]["df2"]  # Validates per-column memory of DataFrames
+
+# Test: admin_reload
+# Purpose: This test checks that the data is reloaded without restarting the API, rebuilding only what depends on the changed files
+# Input: The version of the user_items files changes, then POST /admin/reload?wait=true
+# Expected output: A new data snapshot, where the recommender index is reused and the playtime aggregates are rebuilt
+def test_admin_reload(monkeypatch):
+    client.get("/recomendacion_juego/222621")
+    assert client.post("/admin/reload?wait=true").json()["reloaded"] is False  # Validates nothing is reloaded if the files didn't change
+
+    table_versions = data_loader._table_versions()
+    monkeypatch.setattr(data_loader, '_table_versions', lambda: {**table_versions, 'user_items': 'changed'})
+    previous = data_loader.get_data()
+    response = client.post("/admin/reload?wait=true")
+    assert response.status_code == 200 and response.json()["reloaded"] is True  # Validates a new snapshot is published
+    assert data_loader.get_data() is not previous and data_loader.get_data().version == response.json()["data"]["version"]
+    assert data_loader.get_data().cosine_sim is previous.cosine_sim  # Validates the recommender index is reused
+    assert "playtime_aggregates" in response.json()["data"]["last_reload"]["rebuilt"]  # Validates the changed table is rebuilt
+    assert client.get("/PlayTimeGenre/Action").status_code == 200
+
+# Test: admin_reload (concurrent trigger)
+# Purpose: This test checks that a reload requested while another one is running reports it without waiting for it
+# Input: POST /admin/reload?wait=false during a background reload, and during a foreground one
+# Expected output: {"started": false} right away
+def test_admin_reload_already_running(monkeypatch):
+    import threading
+    import time
+    release = threading.Event()
+    monkeypatch.setattr(data_loader.reloader, 'reload', lambda: release.wait(10))
+    assert client.post("/admin/reload").json()["started"] is True
+    start = time.perf_counter()
+    assert client.post("/admin/reload").json()["started"] is False  # Validates a running background reload is reported
+    release.set()
+    data_loader.reloader._thread.join()
+
+    with data_loader.reloader._lock:  # A reload building a snapshot in the foreground
+        assert client.post("/admin/reload").json()["started"] is False  # Validates the build lock is not waited on
+    assert time.perf_counter() - start < 5  # Validates the requests didn't block on the running reload
+
 # ======================================================================================
 # Error Handling Tests
 # These tests verify that the API properly handles invalid inputs
@@ -111,7 +316,34 @@ def test_sentiment_analysis_InvalidDeveloper():
     with pytest.raises(Exception):  # Validates exception is raised for invalid developer
         client.get("/sentiment_analysis/InvalidDeveloper")
 
+# Test: Invalid mode handling for recomendacion_juego (endpoint #6)
+def test_recomendacion_juego_InvalidMode():
+    with pytest.raises(Exception):  # Validates exception is raised for an unknown recommendation mode
+        client.get("/recomendacion_juego/222621?mode=fuzzy")
+
+# Test: Invalid format handling for UserForGenre (endpoint #2)
+def test_UserForGenre_InvalidFormat():
+    with pytest.raises(Exception):  # Validates exception is raised for an unknown response format
+        client.get("/UserForGenre/Action?format=xml")
+
 # Test: Invalid game ID handling for recomendacion_juego (endpoint #6)
 def test_recomendacion_juego_InvalidGameID():
     with pytest.raises(Exception):  # Validates exception is raised for invalid game ID
         client.get("/recomendacion_juego/999999999")
+
+# Test: Invalid developer handling for sentiment_analysis_bulk (endpoint #5, bulk variant)
+def test_sentiment_analysis_bulk_InvalidDeveloper():
+    with pytest.raises(Exception):  # Validates exception is raised when any developer is invalid
+        client.post("/sentiment_analysis", json=["Valve", "InvalidDeveloper"])
+
+# Test: Invalid game ID handling for recomendacion_juego_batch (endpoint #6, batch variant)
+def test_recomendacion_juego_batch_InvalidGameID():
+    with pytest.raises(Exception):  # Validates exception is raised when any game ID is invalid
+        client.post("/recomendacion_juego", json=["222621", "999999999"])
+
+# Test: Invalid number of recommendations handling for recomendacion_juego_batch (endpoint #6, batch variant)
+def test_recomendacion_juego_batch_InvalidN():
+    with pytest.raises(Exception):  # Validates exception is raised when n is 0
+        client.post("/recomendacion_juego?n=0", json=["222621"])
+    with pytest.raises(Exception):  # Validates exception is raised when n is negative
+        client.post("/recomendacion_juego?n=-3", json=["222621"])
@@ -0,0 +1,39 @@
+import pandas as pd
+import pyarrow.parquet as pq
+from datasets.parquet_reader import parquet_files, parquet_dataset, read_parquet_table
+
+def _write_partitioned(directory):
+    # Two partitions, each with two row groups ordered by playtime
+    for part in range(2):
+        df = pd.DataFrame({'user_id': [f'u{part}'] * 4, 'item_id': ['10', '20', '30', '40'],
+                           'playtime_forever': [0.0, 0.0, 5.0, 7.0], 'user_url': ['x'] * 4})
+        (directory / f'part={part}').mkdir(parents=True)
+        df.to_parquet(directory / f'part={part}' / 'items.parquet', index=False, row_group_size=2)
+
+# Test: read_parquet_table
+# Purpose: A partitioned directory is read as one table, with only the requested columns and rows
+def test_read_partitioned_directory_with_pushdown(tmp_path):
+    _write_partitioned(tmp_path / 'user_items')
+    assert len(parquet_files(tmp_path / 'user_items')) == 2
+
+    df = read_parquet_table(tmp_path / 'user_items', ['user_id', 'item_id', 'playtime_forever', 'part'],
+                            filters=[('playtime_forever', '>', 0)], dictionary_columns=['user_id'])
+    assert list(df.columns) == ['user_id', 'item_id', 'playtime_forever', 'part']  # Validates 'user_url' is not read
+    assert sorted(zip(df['user_id'], df['item_id'])) == [('u0', '30'), ('u0', '40'), ('u1', '30'), ('u1', '40')]
+    assert isinstance(df['user_id'].dtype, pd.CategoricalDtype)  # Validates dictionary columns are categorical
+
+# Test: parquet_dataset
+# Purpose: Row groups whose statistics can't match the filters are pruned
+def test_row_group_pruning(tmp_path):
+    _write_partitioned(tmp_path / 'user_items')
+    filter = pq.filters_to_expression([('playtime_forever', '>', 0)])
+    row_groups = [row_group for fragment in parquet_dataset(tmp_path / 'user_items').get_fragments(filter)
+                  for row_group in fragment.split_by_row_group(filter)]
+    assert len(row_groups) == 2  # Validates only the row group with playtime > 0 of each file is kept (out of 4)
+
+# Test: parquet_files
+# Purpose: A single file or a missing input are supported too
+def test_parquet_files_single_and_missing(tmp_path):
+    pd.DataFrame({'id': ['1']}).to_parquet(tmp_path / 'games.parquet')
+    assert parquet_files(tmp_path / 'games.parquet') == [tmp_path / 'games.parquet']
+    assert parquet_files(tmp_path / 'missing.parquet') == []
@@ -0,0 +1,29 @@
+import sys
+import numpy as np
+import pandas as pd
+from utils.profiling import deep_memory_usage, memory_report, EndpointMetrics
+from datasets.similarity import TopKSimilarityIndex
+
+# Test: deep_memory_usage / memory_report
+# Purpose: Memory is measured including the data of DataFrame columns and arrays, not only object headers
+def test_deep_memory_usage():
+    df = pd.DataFrame({'user_id': ['76561197970982479'] * 1000, 'playtime_forever': np.arange(1000.0)})
+    array = np.zeros((100, 100))
+    assert deep_memory_usage(df) == df.memory_usage(deep=True).sum()  # Validates column data (strings included) is counted
+    assert deep_memory_usage(array) == array.nbytes
+    index = TopKSimilarityIndex(np.zeros((1000, 20), dtype=np.int32), np.zeros((1000, 20), dtype=np.float32))
+    assert deep_memory_usage(index) >= index.nbytes > sys.getsizeof(index)  # Validates arrays held by objects are counted
+    report = memory_report({'df': df, 'array': array})
+    assert set(report['df']['columns']) == {'Index', 'user_id', 'playtime_forever'}  # Validates per column breakdown
+    assert report['array']['shape'] == [100, 100]
+
+# Test: EndpointMetrics
+# Purpose: Latencies and errors are aggregated per endpoint
+def test_endpoint_metrics():
+    metrics = EndpointMetrics(window=10)
+    for latency in [0.001, 0.002, 0.003]:
+        metrics.record('GET /PlayTimeGenre/{genero}', latency, 200)
+    metrics.record('GET /PlayTimeGenre/{genero}', 0.5, 500)
+    snapshot = metrics.snapshot()['GET /PlayTimeGenre/{genero}']
+    assert snapshot['count'] == 4 and snapshot['errors'] == 1
+    assert snapshot['max_ms'] == 500.0
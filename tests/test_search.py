@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datasets.encoding import build_multi_hot
+from datasets.search import FieldIndex, build_search_index, normalize_text
+
+# Small catalog with names that share prefixes and words, in different cases / punctuation
+GAMES = pd.DataFrame({'app_name': ['Half-Life 2', 'Half-Life', 'Portal 2', 'Portal', 'The Portal Story', 'Half-Life 2: Episode One', None],
+                      'developer': ['Valve', 'Valve', 'Valve', 'Valve', 'Indie Studio', 'Valve', 'Ubisoft'],
+                      'genres': ['Action', 'Action', 'Action, Puzzle', 'Puzzle', 'Adventure, Indie', 'Action', 'Strategy']})
+
+# Test: normalize_text
+# Purpose: Search keys ignore case, accents and punctuation
+def test_normalize_text():
+    assert normalize_text("Half-Life 2: Episode One") == "half life 2 episode one"
+    assert normalize_text("  Pokémon_ÉDITION ") == normalize_text("pokemon edition") == "pokemon edition"
+
+# Test: FieldIndex.search
+# Purpose: Equal names rank first, then names starting with the query, then names with words starting with its words
+def test_field_index_search_ranking():
+    index = FieldIndex(GAMES['app_name'].iloc[:6].to_numpy())
+    entries, match_types = index.search("portal", 10)
+    assert list(index.names[entries]) == ['Portal', 'Portal 2', 'The Portal Story']  # Validates the ranking
+    assert list(match_types) == [0, 1, 2]  # Validates exact, prefix and word prefix matches
+    assert list(index.rows[entries]) == [3, 2, 4]  # Validates entries keep the position of their name
+    entries, _ = index.search("half-life 2", 10)
+    assert list(index.names[entries]) == ['Half-Life 2', 'Half-Life 2: Episode One']  # Validates punctuation is ignored
+    assert list(index.names[index.search("hal ep", 10)[0]]) == ['Half-Life 2: Episode One']  # Validates all words must match
+    assert len(index.search("portal", 2)[0]) == 2  # Validates at most n entries are returned
+
+# Test: FieldIndex.search with typos
+# Purpose: Names with a few typos are found only when nothing else matches, and unrelated names are not
+def test_field_index_fuzzy():
+    index = FieldIndex(GAMES['app_name'].iloc[:6].to_numpy())
+    entries, match_types = index.search("half lfe 2", 10)
+    assert index.names[entries[0]] == 'Half-Life 2' and set(match_types) == {3}  # Validates fuzzy matches
+    assert len(index.search("zzzz qqqq", 10)[0]) == 0  # Validates unrelated names are not returned
+    assert index.resolve("PORTAL") == index.search("portal", 1)[0][0]  # Validates case insensitive resolution
+    assert index.names[index.resolve("Protal 2")] == 'Portal 2'  # Validates typos are resolved
+    assert index.resolve("Counter-Strike") is None  # Validates unknown names are not resolved
+
+# Test: FieldIndex.resolve with names that only differ in punctuation
+# Purpose: An exact name resolves to itself, and accept restricts the names a value can resolve to
+def test_field_index_resolve_exact_first():
+    index = FieldIndex(['Marvelous, Inc.', 'Marvelous Inc.', 'Valve'])
+    assert index.names[index.resolve("Marvelous Inc.")] == 'Marvelous Inc.'  # Validates the exact name wins over a same key
+    assert index.names[index.resolve("Marvelous, Inc.")] == 'Marvelous, Inc.'
+    assert index.find("marvelous inc") is None  # Validates find only matches exact names
+    with_reviews = {'Marvelous, Inc.', 'Valve'}
+    assert index.names[index.resolve("marvelous inc", accept=with_reviews.__contains__)] == 'Marvelous, Inc.'  # Validates accept
+    assert index.resolve("Marvelous Inc.", accept=lambda name: False) is None
+
+# Test: SearchIndex
+# Purpose: Games, developers and genres are searched together, and names are resolved per field
+def test_search_index():
+    index = build_search_index(GAMES, build_multi_hot(GAMES['genres']))
+    results = index.search("p", 10)
+    assert ('genre', 'prefix', 'Puzzle', None) in results  # Validates genres are searched
+    assert [name for field, _, name, _ in results if field == 'game'] == ['Portal', 'Portal 2', 'The Portal Story']
+    assert index.search("valve", 10) == [('developer', 'exact', 'Valve', None)]  # Validates developers are searched
+    assert index.search("portal", 10, ['developer']) == []  # Validates only the given fields are searched
+    assert index.resolve('game', "portal 2") == 2  # Validates games resolve to their row in df2
+    assert index.resolve('developer', "ubisoft") == 'Ubisoft' and index.resolve('genre', "Strategi") == 'Strategy'
+    with pytest.raises(ValueError):  # Validates unknown fields are rejected
+        index.search("portal", 10, ['publisher'])
@@ -0,0 +1,19 @@
+import numpy as np
+import pyarrow as pa
+from utils.serialization import json_dumps, columnar, ArrowResponse
+
+# Test: json_dumps
+# Purpose: NumPy arrays and scalars are encoded as plain JSON values, without converting them first
+def test_json_dumps_numpy():
+    content = {"Year": np.array([2013, 2012], dtype=np.int32), "Hours": np.arange(2.0), "Total": np.int64(5), 1: "a"}
+    assert json_dumps(content) == b'{"Year":[2013,2012],"Hours":[0.0,1.0],"Total":5,"1":"a"}'
+    assert json_dumps({"Name": "Café"}).decode('utf-8') == '{"Name":"Café"}'  # Validates non ASCII text is kept as is
+
+# Test: columnar / ArrowResponse
+# Purpose: Compact responses keep the columns, as a JSON object of arrays or as an Arrow IPC stream
+def test_columnar_formats():
+    columns = {"Developer": ["Valve", "Ubisoft"], "Negative": np.array([1, 2])}
+    assert columnar(columns, 'columnar') is columns
+    body = ArrowResponse(columnar(columns, 'arrow')).body
+    table = pa.ipc.open_stream(body).read_all()
+    assert table.column_names == ["Developer", "Negative"] and table.to_pydict() == {"Developer": ["Valve", "Ubisoft"], "Negative": [1, 2]}
@@ -0,0 +1,18 @@
+import numpy as np
+import pandas as pd
+from datasets.data_loader import DataRegistry
+from datasets.shared_data import publish_shared_data, shared_data_loaders
+
+# Test: publish_shared_data / shared_data_loaders
+# Purpose: Tables published by the loader process are attached by the workers as zero-copy, read-only views
+def test_shared_data_round_trip(tmp_path):
+    table = pd.DataFrame({'id': ['10', '20', '30'], 'playtime_forever': [1.5, 2.5, 3.5]})
+    neighbors = np.arange(12, dtype=np.int32).reshape(4, 3)
+    loader_registry = DataRegistry({'table': lambda data: table, 'neighbors': lambda data: neighbors})
+    loader_registry.warm_up()
+    assert sorted(publish_shared_data(loader_registry, tmp_path)) == ['neighbors', 'table']
+
+    worker_registry = DataRegistry(shared_data_loaders(tmp_path))
+    pd.testing.assert_frame_equal(worker_registry.table, table)  # Validates the table is unchanged
+    assert np.array_equal(worker_registry.neighbors, neighbors)  # Validates the array is unchanged
+    assert not worker_registry.neighbors.flags.writeable  # Validates the array is a view over the shared memory
@@ -0,0 +1,52 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from datasets.similarity import build_topk_index, update_topk_index
+
+# Small catalog with repeated feature strings, so several games tie on similarity
+DOCS = ["Action Indie Valve", "Action Indie Valve", "Action RPG Ubisoft", "Strategy Indie Paradox",
+        "Action Indie Ubisoft", "Racing Sports Codemasters", "Strategy RPG Paradox", "Action Indie Valve"]
+
+# Test: build_topk_index
+# Purpose: The blocked top-k index must return the same neighbors as a stable sort of the dense cosine matrix
+def test_build_topk_index_matches_dense():
+    tfidf_matrix = TfidfVectorizer().fit_transform(DOCS)
+    dense = cosine_similarity(tfidf_matrix, tfidf_matrix)
+    index = build_topk_index(tfidf_matrix, k=3, block_size=3)  # Block size smaller than the catalog
+    for idx in range(len(DOCS)):
+        expected = [i for i in np.argsort(-dense[idx], kind='stable') if i != idx][:3]
+        assert list(index.most_similar(idx, 3)[0]) == expected  # Validates neighbors and tie order
+        assert np.allclose(index.most_similar(idx, 3)[1], dense[idx][expected])  # Validates scores
+
+# Test: build_topk_index with a process pool
+# Purpose: Blocks computed by worker processes over shared memory give the same index as the sequential build
+def test_build_topk_index_parallel_matches_sequential():
+    tfidf_matrix = TfidfVectorizer().fit_transform(DOCS)
+    sequential = build_topk_index(tfidf_matrix, k=3, block_size=3, workers=1)
+    parallel = build_topk_index(tfidf_matrix, k=3, block_size=3, workers=2)
+    assert np.array_equal(parallel.neighbors, sequential.neighbors)  # Validates neighbors and tie order
+    assert np.array_equal(parallel.scores, sequential.scores)  # Validates scores
+    assert not isinstance(parallel.neighbors, np.memmap)  # Validates results don't reference the removed shared memory
+
+# Test: TopKSimilarityIndex row access
+# Purpose: cosine_sim[idx] keeps working for code written against the dense matrix
+def test_topk_index_row_access():
+    index = build_topk_index(TfidfVectorizer().fit_transform(DOCS), k=2)
+    assert index.shape == (len(DOCS), len(DOCS))  # Validates logical shape
+    assert index[0][0] == 1.0  # Validates self-similarity
+    assert np.count_nonzero(index[0]) <= 3  # Validates only the top-k neighbors are kept
+
+# Test: update_topk_index
+# Purpose: Updating the index after games are added, changed and removed gives the same neighbors as rebuilding it
+def test_update_topk_index_matches_rebuild():
+    tfidf_vectorizer = TfidfVectorizer().fit(DOCS)
+    index = build_topk_index(tfidf_vectorizer.transform(DOCS), k=3, block_size=3)
+
+    # Game 5 removed, game 2 changed and two games added (one of them a better neighbor of game 0)
+    docs = DOCS[:2] + ["Action RPG Paradox"] + DOCS[3:5] + DOCS[6:] + ["Action Indie Valve Indie", "Racing Sports"]
+    previous_rows = np.array([0, 1, -1, 3, 4, 6, 7, -1, -1])
+    tfidf_matrix = tfidf_vectorizer.transform(docs)  # Same vocabulary as the index
+    updated = update_topk_index(index, tfidf_matrix, previous_rows, k=3, block_size=2)
+    rebuilt = build_topk_index(tfidf_matrix, k=3)
+    assert np.array_equal(updated.neighbors, rebuilt.neighbors)  # Validates neighbors and tie order
+    assert np.allclose(updated.scores, rebuilt.scores)  # Validates scores
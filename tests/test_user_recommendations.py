@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from datasets.collaborative import build_user_libraries
+from datasets.similarity import build_topk_index
+from datasets.user_recommendations import build_user_recommender
+
+# Small catalog, and the games played by a few users (user 'c' plays the same game twice)
+GAME_IDS = pd.Series(['1', '2', '3', '4', '5', '6'])
+DOCS = ["Action Indie Valve", "Action Indie Valve", "Action RPG Ubisoft", "Strategy Indie Paradox", "Strategy RPG Paradox", "Racing Sports"]
+PLAYTIME = pd.DataFrame({'item_id': ['1', '3', '4', '5', '2', '2', '9'],
+                         'user_id': ['a', 'a', 'b', 'b', 'c', 'c', 'd'],
+                         'playtime_forever': [100.0, 10.0, 30.0, 30.0, 5.0, 5.0, 60.0]})
+
+# Test: build_user_recommender
+# Purpose: Recommendations aggregate the neighbor scores of the library of the user, without its games, and the
+# precomputed recommendations of the most active users are the same as the ones computed per request
+def test_user_recommender():
+    libraries = build_user_libraries(GAME_IDS, [PLAYTIME])
+    index = build_topk_index(TfidfVectorizer().fit_transform(DOCS), k=2)
+    recommender = build_user_recommender(libraries, index, n_users=2, top_n=3)
+
+    # Dense reference: log playtime weights of the library times the neighbor scores, played games excluded
+    weights = np.log1p(libraries.playtime.toarray())
+    expected_scores = weights @ index.sparse_matrix().toarray()
+    expected_scores[weights > 0] = 0
+    for user_id in ['a', 'b', 'c']:
+        row = libraries.row(user_id)
+        neighbors, scores = recommender.recommend(user_id, 3)
+        expected = [i for i in np.argsort(-expected_scores[row], kind='stable') if expected_scores[row, i] > 0][:3]
+        assert list(neighbors) == expected  # Validates the ranking (ties by game row)
+        assert np.allclose(scores, expected_scores[row, expected])  # Validates the aggregated scores
+        assert not set(neighbors) & set(libraries.playtime[row].indices)  # Validates played games are not recommended
+
+    assert list(recommender.precomputed_rows) == sorted([libraries.row('a'), libraries.row('b')])  # Validates the most active users are precomputed
+    computed = recommender.score(recommender.precomputed_rows, 3)
+    assert np.array_equal(recommender.recommend_batch(recommender.precomputed_rows, 3)[0], computed[0])  # Validates same result
+    with pytest.raises(ValueError):  # Validates exception is raised for a user without played games in the catalog
+        recommender.recommend('d')
+
+
+# Test: UserRecommender.recommend_batch
+# Purpose: More recommendations than precomputed per user are scored online instead of failing
+def test_user_recommender_more_than_precomputed():
+    libraries = build_user_libraries(GAME_IDS, [PLAYTIME])
+    index = build_topk_index(TfidfVectorizer().fit_transform(DOCS), k=2)
+    recommender = build_user_recommender(libraries, index, n_users=2, top_n=2)
+
+    neighbors, scores = recommender.recommend_batch(recommender.precomputed_rows, 5)
+    computed = recommender.score(recommender.precomputed_rows, 5)
+    assert neighbors.shape == (2, 5)  # Validates n > top_n returns n columns
+    assert np.array_equal(neighbors, computed[0]) and np.allclose(scores, computed[1])  # Validates online scoring
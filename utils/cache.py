@@ -0,0 +1,199 @@
+import functools
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class MemoryCache:
+    """
+    In-process cache with least recently used (LRU) eviction and a time to live (TTL) per entry.
+
+    Parameters:
+    -----------
+    max_entries : int
+        Maximum number of entries kept. When full, the least recently used entry is evicted
+    ttl : float
+        Seconds an entry stays valid after being stored
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        """Returns (True, value) if key is cached and not expired, (False, None) otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {'backend': 'memory', 'entries': len(self), 'max_entries': self.max_entries, 'ttl': self.ttl,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'expirations': self.expirations}
+
+
+class FileCache:
+    """
+    Cache stored as one pickle file per entry in a local directory. It is a stand-in for a shared cache
+    backend (e.g. Redis): several worker processes on the same host see each other's entries.
+    Eviction is LRU by file modification time, which is refreshed on every hit.
+
+    Parameters:
+    -----------
+    directory : str or Path
+        Directory where the entries are stored
+    max_entries : int
+        Maximum number of entries kept
+    ttl : float
+        Seconds an entry stays valid after being stored
+    """
+
+    def __init__(self, directory, max_entries, ttl):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def _path(self, key):
+        return self.directory / (hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pkl')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires_at, stored_key, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return False, None
+        if stored_key != key or expires_at < time.time():
+            if stored_key == key:
+                path.unlink(missing_ok=True)
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+        os.utime(path)  # Mark the entry as recently used
+        self.hits += 1
+        return True, value
+
+    def set(self, key, value):
+        # Write to a temporary file and rename it, so other processes never read a partial entry
+        path = self._path(key)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((time.time() + self.ttl, key, value), f)
+        os.replace(tmp_path, path)
+
+        entries = sorted(self.directory.glob('*.pkl'), key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:max(0, len(entries) - self.max_entries)]:
+            entry.unlink(missing_ok=True)
+            self.evictions += 1
+
+    def clear(self):
+        for entry in self.directory.glob('*.pkl'):
+            entry.unlink(missing_ok=True)
+
+    def __len__(self):
+        return sum(1 for _ in self.directory.glob('*.pkl'))
+
+    def stats(self):
+        return {'backend': 'file', 'entries': len(self), 'max_entries': self.max_entries, 'ttl': self.ttl,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'expirations': self.expirations}
+
+
+class ResponseCache:
+    """
+    Caches endpoint responses, with one cache (and configuration) per endpoint.
+
+    The version of the dataset is part of every key, and a cache is cleared as soon as the version
+    changes, so responses computed from old data are never served.
+
+    Parameters:
+    -----------
+    config : dict
+        Configuration per endpoint name: {"max_entries": int, "ttl": seconds}. Endpoints not in the
+        configuration are not cached
+    version : callable
+        Returns the version of the dataset the endpoints currently read from
+    backend : str
+        'memory' (in-process LRU), 'file' (local stand-in for a shared cache) or 'none' (disabled)
+    directory : str or Path
+        Base directory of the 'file' backend
+    """
+
+    def __init__(self, config, version, backend='memory', directory=None):
+        self._version = version
+        self._versions = {}
+        self._caches = {}
+        if backend == 'none':
+            return
+        for endpoint, options in config.items():
+            if backend == 'file':
+                self._caches[endpoint] = FileCache(Path(directory) / endpoint, options['max_entries'], options['ttl'])
+            else:
+                self._caches[endpoint] = MemoryCache(options['max_entries'], options['ttl'])
+
+    def cached(self, endpoint):
+        """
+        Decorator that caches the responses of the endpoint function, keyed by its arguments.
+        Exceptions are not cached.
+        """
+        def decorator(func):
+            cache = self._caches.get(endpoint)
+            if cache is None:
+                return func
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                version = self._version()
+                if self._versions.get(endpoint) != version:
+                    # The dataset changed: drop the responses computed from the previous version
+                    cache.clear()
+                    self._versions[endpoint] = version
+
+                key = repr((version, args, sorted(kwargs.items())))
+                found, response = cache.get(key)
+                if not found:
+                    response = func(*args, **kwargs)
+                    cache.set(key, response)
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """Returns the hit / miss counters and size of the cache of each endpoint."""
+        return {endpoint: cache.stats() for endpoint, cache in self._caches.items()}
+
+    def clear(self):
+        for cache in self._caches.values():
+            cache.clear()
@@ -0,0 +1,99 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a request is rejected because its compute pool and queue are full."""
+
+    def __init__(self, pool):
+        super().__init__(f"The '{pool}' compute pool is saturated, try again later")
+        self.pool = pool
+
+
+class _BoundedPool:
+    """
+    Thread pool that admits at most max_workers running + max_queue waiting tasks. Beyond that,
+    submissions are rejected immediately instead of queueing without bound.
+    """
+
+    def __init__(self, name, max_workers, max_queue):
+        self.name = name
+        self.capacity = max_workers + max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = self.rejected = 0
+
+    def submit(self, func):
+        with self._lock:
+            if self.pending >= self.capacity:
+                self.rejected += 1
+                raise PoolSaturatedError(self.name)
+            self.pending += 1
+        future = self._executor.submit(func)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+
+class ExecutionLayer:
+    """
+    Runs the endpoints in separate bounded thread pools, so expensive calls can't take all the threads
+    and starve cheap lookups, with admission control and request coalescing.
+
+    Parameters:
+    -----------
+    pools : dict
+        Configuration of each pool: {"pool name": {"max_workers": int, "max_queue": int}}
+    endpoint_pools : dict
+        Pool each endpoint runs in: {"endpoint name": "pool name"}
+    """
+
+    def __init__(self, pools, endpoint_pools):
+        self._pools = {name: _BoundedPool(name, options['max_workers'], options['max_queue']) for name, options in pools.items()}
+        self._endpoint_pools = endpoint_pools
+        # Futures of the computations running or queued, by endpoint and arguments
+        self._in_flight = {}
+        self._lock = threading.RLock()  # Reentrant: the done callback runs inline if the task already finished
+        self.coalesced = 0
+
+    def _forget(self, key):
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def run(self, endpoint):
+        """
+        Decorator that turns a blocking endpoint function into a coroutine that runs it in the pool
+        of the endpoint. Concurrent calls with the same arguments are computed once: the later ones
+        wait for the result of the first. Raises PoolSaturatedError when the pool is full.
+        """
+        pool = self._pools[self._endpoint_pools[endpoint]]
+
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = (endpoint, repr(args), repr(sorted(kwargs.items())))
+                with self._lock:
+                    future = self._in_flight.get(key)
+                    if future is not None:
+                        self.coalesced += 1
+                    else:
+                        future = self._in_flight[key] = pool.submit(functools.partial(func, *args, **kwargs))
+                        future.add_done_callback(lambda _: self._forget(key))
+                # shield: a cancelled request (e.g. client disconnected) doesn't cancel the computation
+                # the other coalesced requests are waiting for
+                return await asyncio.shield(asyncio.wrap_future(future))
+            return wrapper
+        return decorator
+
+    def stats(self):
+        """Returns the pending (running + queued), completed and rejected tasks of each pool."""
+        pools = {name: {'pending': pool.pending, 'capacity': pool.capacity, 'completed': pool.completed, 'rejected': pool.rejected}
+                 for name, pool in self._pools.items()}
+        return {'pools': pools, 'coalesced': self.coalesced}
@@ -1,37 +1,62 @@
-import sys
+import time
 import pandas as pd
 import logging
 from logging.handlers import RotatingFileHandler
-from config import TEMP_DIR, TEMP_OUTPUT, LOG_DIR, LOG_FILE
+from pathlib import Path
+from config import TEMP_DIR, LOG_DIR, LOG_FILE
+from utils.profiling import memory_report, process_memory
 import os
 
-def trace():
+def trace(objects=None, timings=None):
     """
-    Comprehensive tracing function that writes memory usage statistics
-    and DataFrame contents to tmp/output.tmp file for debugging purposes.
+    Comprehensive tracing function that writes deep memory usage statistics (per DataFrame column and
+    per array), loading times and DataFrame contents to a timestamped tmp/trace-<date>-<time>.txt file
+    for debugging purposes.
+
+    Parameters:
+    -----------
+    objects : dict, optional
+        Objects to report, by name. Defaults to the caller's global namespace
+    timings : dict, optional
+        Loading time of each table / model (e.g. DataRegistry.timings)
+
+    Returns:
+    --------
+    Path
+        The file the trace was written to
     """
     # Get 'objects' from the caller's global namespace
-    import inspect
-    frame = inspect.currentframe().f_back
-    objects = frame.f_globals
+    if objects is None:
+        import inspect
+        frame = inspect.currentframe().f_back
+        objects = {name: obj for name, obj in frame.f_globals.items()
+                   if not name.startswith('__') and not (inspect.ismodule(obj) or inspect.isroutine(obj) or inspect.isclass(obj))}
     
     # Create temporary directory if it doesn't exist
     if not os.path.exists(TEMP_DIR):
         os.makedirs(TEMP_DIR)
     
-    # Open the output file in the tmp directory with UTF-8 encoding
-    with open(TEMP_OUTPUT, "w", encoding="utf-8") as output_file:
+    # Each trace goes to its own file, so previous traces are kept for comparison
+    output_path = Path(TEMP_DIR) / f"trace-{time.strftime('%Y%m%d-%H%M%S')}.txt"
+    with open(output_path, "w", encoding="utf-8") as output_file:
         # The encapsulated inner functions... 
         def _write_memory_usage(objs):
-            """Inner function to write memory usage information"""
+            """Inner function to write deep memory usage information"""
             output_file.write("\n===== MEMORY USAGE STATISTICS =====\n")
-            total_memory = 0
-            
-            for obj_name, obj in objs.items():
-                memory = sys.getsizeof(obj) / (1024 * 1024)
-                output_file.write(f"Object '{obj_name}' size: {memory:.2f} MB\n")
-                total_memory += memory
-            output_file.write(f"Total memory consumption: {total_memory:.2f} MB\n")
+            report = memory_report(objs)
+            for obj_name, entry in report.items():
+                output_file.write(f"Object '{obj_name}' ({entry['type']}) size: {entry['total_mb']:.2f} MB\n")
+                for column, memory in entry.get('columns', {}).items():
+                    output_file.write(f"    Column '{column}': {memory:.2f} MB\n")
+            output_file.write(f"Total memory consumption: {sum(entry['total_mb'] for entry in report.values()):.2f} MB\n")
+            output_file.write(f"Process memory: {process_memory()}\n")
+
+        def _write_timings(phases):
+            """Inner function to write the loading time of each table / model"""
+            output_file.write("\n===== LOADING TIMES =====\n")
+            for phase, timing in phases.items():
+                output_file.write(f"{phase}: {timing['seconds']:.3f} s (with dependencies: {timing['total_seconds']:.3f} s)"
+                                  f" [{timing.get('start', 0):.3f} s - {timing.get('end', 0):.3f} s, {timing.get('thread', '')}]\n")
         
         def _write_df_head_and_tail(objs):
             """Inner function to write DataFrame head and tail"""
@@ -64,8 +89,12 @@ def trace():
         
         # Call the inner functions
         _write_memory_usage(objects)
+        if timings:
+            _write_timings(timings)
         _write_df_head_and_tail(objects)
 
+    return output_path
+
 
 def _setup_logger():
     # Joyuela: Logger configuration with file rotation
@@ -0,0 +1,156 @@
+import resource
+import sys
+import threading
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+_MB = 1024 * 1024
+
+
+def deep_memory_usage(obj, _seen=None, _depth=0):
+    """
+    Returns the memory, in bytes, used by obj including the data it references: the values of every
+    DataFrame / Series column (strings included), NumPy arrays, sparse matrices, containers and the
+    attributes of plain objects (e.g. the precomputed indexes). Unlike sys.getsizeof, it doesn't stop at
+    the object header. Memory-mapped / shared arrays are counted with their full size.
+    """
+    _seen = set() if _seen is None else _seen
+    if id(obj) in _seen or _depth > 4:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True, index=True)
+        return int(usage.sum()) if isinstance(obj, pd.DataFrame) else int(usage)
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if sp.issparse(obj):
+        return int(sum(getattr(obj, name).nbytes for name in ('data', 'indices', 'indptr', 'row', 'col') if hasattr(obj, name)))
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(deep_memory_usage(key, _seen, _depth + 1) + deep_memory_usage(value, _seen, _depth + 1)
+                                        for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset, deque)):
+        return sys.getsizeof(obj) + sum(deep_memory_usage(item, _seen, _depth + 1) for item in obj)
+    if hasattr(obj, '__dict__') and not isinstance(obj, type):
+        return sys.getsizeof(obj) + deep_memory_usage(vars(obj), _seen, _depth + 1)
+    return sys.getsizeof(obj)
+
+
+def memory_report(objects):
+    """
+    Returns the deep memory usage (in MB) of each object, with the breakdown per column for DataFrames.
+
+    Parameters:
+    -----------
+    objects : dict
+        Objects to report, by name
+
+    Returns:
+    --------
+    dict
+        {name: {"type": str, "total_mb": float, "columns": {column: MB}}}, "columns" only for DataFrames
+    """
+    report = {}
+    for name, obj in objects.items():
+        entry = {'type': type(obj).__name__, 'total_mb': round(deep_memory_usage(obj) / _MB, 3)}
+        if isinstance(obj, pd.DataFrame):
+            usage = obj.memory_usage(deep=True, index=True)
+            entry['columns'] = {str(column): round(int(size) / _MB, 3) for column, size in usage.items()}
+        elif isinstance(obj, np.ndarray):
+            entry['shape'] = list(obj.shape)
+            entry['dtype'] = str(obj.dtype)
+        report[name] = entry
+    return report
+
+
+def process_memory():
+    """Returns the current and peak resident set size (RSS) of the process, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (_MB if sys.platform == 'darwin' else 1024)
+    current = None
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[1]) * resource.getpagesize() / _MB
+    except OSError:
+        pass  # Only available on Linux
+    return {'rss_mb': round(current, 1) if current is not None else None, 'peak_rss_mb': round(peak, 1)}
+
+
+class EndpointMetrics:
+    """
+    Request counters and latencies per endpoint. Latency percentiles are computed over the last
+    window requests of each endpoint, so the cost of recording a request stays constant.
+
+    Parameters:
+    -----------
+    window : int
+        Number of most recent latencies kept per endpoint
+    """
+
+    def __init__(self, window=1024):
+        self.window = window
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, seconds, status_code):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {'count': 0, 'errors': 0, 'total_s': 0.0, 'max_s': 0.0,
+                                                     'latencies': deque(maxlen=self.window)}
+            stats['count'] += 1
+            stats['errors'] += status_code >= 500
+            stats['total_s'] += seconds
+            stats['max_s'] = max(stats['max_s'], seconds)
+            stats['latencies'].append(seconds)
+
+    def snapshot(self):
+        """Returns count, errors, mean / p50 / p99 / max latency (ms) of each endpoint."""
+        with self._lock:
+            endpoints = {endpoint: (dict(stats), np.array(stats['latencies'])) for endpoint, stats in self._endpoints.items()}
+        return {endpoint: {'count': stats['count'], 'errors': stats['errors'],
+                           'mean_ms': round(stats['total_s'] / stats['count'] * 1000, 3),
+                           'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 3),
+                           'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 3),
+                           'max_ms': round(stats['max_s'] * 1000, 3)}
+                for endpoint, (stats, latencies) in endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+class EndpointTimingMiddleware:
+    """
+    ASGI middleware that records the latency and status of every HTTP request in an EndpointMetrics,
+    keyed by method and route template (e.g. "GET /PlayTimeGenre/{genero}").
+    """
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        status_code = 500  # Kept if the app raises before sending a response
+        async def send_with_status(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope. Unmatched paths are grouped together,
+            # so arbitrary URLs can't grow the metrics without bound
+            route = scope.get('route')
+            endpoint = f"{scope['method']} {route.path if route is not None else '<unmatched>'}"
+            self.metrics.record(endpoint, time.perf_counter() - start, status_code)
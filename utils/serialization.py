@@ -0,0 +1,95 @@
+import functools
+import inspect
+import json
+import numpy as np
+import pyarrow as pa
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library encoder is used instead
+    orjson = None
+
+# Formats of the endpoints with a compact variant: 'json' (the default response shape), 'columnar' (JSON
+# object with one array per column) and 'arrow' (Arrow IPC stream, for bulk consumers)
+RESPONSE_FORMATS = ('json', 'columnar', 'arrow')
+
+
+def _default(obj):
+    # NumPy arrays and scalars for the standard library encoder (orjson serializes them natively)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_dumps(content):
+    """
+    Encodes content as JSON bytes. With orjson, NumPy arrays are encoded straight from their buffer,
+    without creating a Python object per element.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with json_dumps (no jsonable_encoder pass over the content)."""
+
+    def render(self, content):
+        return json_dumps(content)
+
+
+class ArrowResponse(Response):
+    """Arrow IPC stream response, rendered from a pyarrow Table."""
+
+    media_type = 'application/vnd.apache.arrow.stream'
+
+    def render(self, content):
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, content.schema) as writer:
+            writer.write_table(content)
+        return sink.getvalue().to_pybytes()
+
+
+def check_format(format):
+    """Raises a ValueError if format is not one of RESPONSE_FORMATS."""
+    if format not in RESPONSE_FORMATS:
+        raise ValueError(f"Unknown response format '{format}', expected one of {list(RESPONSE_FORMATS)}")
+
+
+def columnar(columns, format):
+    """
+    Returns the compact response of a table given as columns (name -> NumPy array or list): a JSON object
+    with one array per column, or a pyarrow Table (sent as an Arrow IPC stream by fast_response).
+    """
+    if format == 'arrow':
+        return pa.table({name: np.asarray(values) if isinstance(values, np.ndarray) else pa.array(values)
+                         for name, values in columns.items()})
+    return columns
+
+
+def fast_response(func):
+    """
+    Decorator of an endpoint that sends its return value as a FastJSONResponse (or an ArrowResponse for a
+    pyarrow Table), so FastAPI doesn't walk the content with jsonable_encoder. The endpoint (sync or async)
+    keeps returning plain data, which is what the response cache stores.
+    """
+    def _response(content):
+        if isinstance(content, Response):
+            return content
+        if isinstance(content, pa.Table):
+            return ArrowResponse(content)
+        return FastJSONResponse(content)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            return _response(await func(*args, **kwargs))
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return _response(func(*args, **kwargs))
+    return wrapper